@@ -0,0 +1,178 @@
+import time
+import random
+import datetime
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+def parse_interval_overrides(spec):
+    """'postgres:master=120,mysql=300' -> {("postgres", "master"): 120.0, ("mysql", None): 300.0}"""
+    overrides = {}
+    for item in filter(None, (part.strip() for part in (spec or "").split(","))):
+        try:
+            target, seconds = item.split("=", 1)
+            db_type, _, role = target.strip().partition(":")
+            overrides[(db_type, role or None)] = float(seconds)
+        except ValueError:
+            logger.warning(f"Ignoring malformed poll interval override {item!r}")
+    return overrides
+
+
+class _NodeState:
+    def __init__(self, base_interval, due_at):
+        self.base_interval = base_interval
+        self.interval = base_interval
+        self.state = "pending"          # pending, healthy, degraded, down
+        self.due_at = due_at            # monotonic clock
+        self.next_run_at = None         # wall clock, reported to clients
+        self.last_run_at = None
+        self.last_status = None
+        self.last_lag = None
+        self.consecutive_failures = 0
+        self.running = False
+
+
+class AdaptiveScheduler:
+    """Decides when each node is probed next.
+
+    Every node has its own base interval. A node that is lagging, or whose
+    cluster is degraded, is polled at the fast interval until it recovers; a
+    node that is down is re-checked at the fast interval once and then backs
+    off exponentially up to ``max_backoff``. Each interval is jittered by
+    ``±jitter`` so nodes (and collectors) drift apart instead of probing in
+    lockstep. A node is handed out by ``claim_due`` only once per run: it is
+    not due again until its result is recorded or released.
+    """
+
+    def __init__(self, nodes, base_interval=600, fast_interval=60, backoff_factor=2, max_backoff=1800,
+                 lag_threshold=30, jitter=0.1, overrides=None, clock=time.monotonic):
+        self.fast_interval = fast_interval
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.lag_threshold = lag_threshold
+        self.jitter = jitter
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.base_interval = base_interval
+        self.overrides = overrides or {}
+        self._nodes = {}
+        self.sync(nodes)
+
+    def _base_interval(self, node, interval):
+        db_type, role = node
+        if interval is not None:
+            return float(interval)
+        return self.overrides.get((db_type, role), self.overrides.get((db_type, None), self.base_interval))
+
+    def sync(self, nodes, intervals=None):
+        """Follow the topology: add new nodes (due straight away), drop removed ones.
+
+        ``intervals`` maps a node to its own base interval (e.g. from the
+        topology file); the env overrides and the default cover the rest.
+        """
+        intervals = intervals or {}
+        now = self._clock()
+        with self._lock:
+            nodes = list(nodes)
+            for node in set(self._nodes) - set(nodes):
+                del self._nodes[node]
+            for node in nodes:
+                base = self._base_interval(node, intervals.get(node))
+                if node in self._nodes:
+                    self._nodes[node].base_interval = base
+                else:
+                    # A new node is due straight away so the first cycle sees the whole topology
+                    self._nodes[node] = _NodeState(base, now)
+
+    def claim_due(self):
+        """Nodes whose next run has come, marked as running"""
+        now = self._clock()
+        with self._lock:
+            due = [node for node, state in self._nodes.items() if not state.running and state.due_at <= now]
+            for node in due:
+                self._nodes[node].running = True
+            return due
+
+    def claim_all(self):
+        """Every node not already running, for an out-of-band (manual) collection"""
+        with self._lock:
+            nodes = [node for node, state in self._nodes.items() if not state.running]
+            for node in nodes:
+                self._nodes[node].running = True
+            return nodes
+
+    def record(self, node, status, lag_seconds, cluster_status):
+        """Store a probe result and schedule the node's next run"""
+        with self._lock:
+            state = self._nodes.get(node)
+            if state is None:   # removed from the topology while it was being probed
+                return
+            state.running = False
+            state.last_run_at = datetime.datetime.now()
+            state.last_status = status
+            state.last_lag = lag_seconds
+            if status != "up":
+                state.consecutive_failures += 1
+                state.state = "down"
+                # Confirm an outage quickly, then back off while the node stays down
+                interval = min(self.fast_interval * self.backoff_factor ** (state.consecutive_failures - 1),
+                               max(self.max_backoff, self.fast_interval))
+            else:
+                if state.consecutive_failures:
+                    logger.info(f"{node[0]} {node[1]} is back up after {state.consecutive_failures} failed probes")
+                state.consecutive_failures = 0
+                lagging = lag_seconds is not None and lag_seconds > self.lag_threshold
+                if lagging or cluster_status not in ("healthy", None):
+                    state.state = "degraded"
+                    interval = min(self.fast_interval, state.base_interval)
+                else:
+                    state.state = "healthy"
+                    interval = state.base_interval
+            self._schedule(state, interval)
+
+    def release(self, nodes):
+        """Return claimed nodes whose run failed before a result was recorded; retried at the fast interval"""
+        with self._lock:
+            for node in nodes:
+                state = self._nodes.get(node)
+                if state is not None and state.running:
+                    state.running = False
+                    self._schedule(state, min(self.fast_interval, state.base_interval))
+
+    def _schedule(self, state, interval):
+        interval *= 1 + random.uniform(-self.jitter, self.jitter)
+        state.interval = interval
+        state.due_at = self._clock() + interval
+        state.next_run_at = datetime.datetime.now() + datetime.timedelta(seconds=interval)
+
+    def schedule(self):
+        """The effective per-node schedule, soonest first"""
+        now = self._clock()
+        with self._lock:
+            rows = [{
+                "db_type": db_type,
+                "role": role,
+                "state": state.state,
+                "running": state.running,
+                "base_interval_seconds": state.base_interval,
+                "effective_interval_seconds": round(state.interval, 1),
+                "next_run_in_seconds": round(max(state.due_at - now, 0), 1),
+                "next_run_at": state.next_run_at.strftime("%Y-%m-%d %H:%M:%S") if state.next_run_at else None,
+                "last_run_at": state.last_run_at.strftime("%Y-%m-%d %H:%M:%S") if state.last_run_at else None,
+                "last_status": state.last_status,
+                "last_replication_lag_seconds": state.last_lag,
+                "consecutive_failures": state.consecutive_failures,
+            } for (db_type, role), state in self._nodes.items()]
+        return sorted(rows, key=lambda row: row["next_run_in_seconds"])
+
+    def settings(self):
+        return {
+            "base_interval_seconds": self.base_interval,
+            "fast_interval_seconds": self.fast_interval,
+            "backoff_factor": self.backoff_factor,
+            "max_backoff_seconds": self.max_backoff,
+            "lag_threshold_seconds": self.lag_threshold,
+            "jitter": self.jitter,
+        }
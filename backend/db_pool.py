@@ -0,0 +1,187 @@
+import time
+import logging
+import threading
+
+import psycopg2
+import mysql.connector
+
+logger = logging.getLogger(__name__)
+
+
+class NodeUnavailable(Exception):
+    """Raised while a node is inside its reconnect backoff window"""
+
+
+class NodeConnectionPool:
+    """Persistent connections to monitored nodes, keyed by (db_type, role).
+
+    The driver is picked from ``params["engine"]`` (postgres or mysql), which
+    defaults to the db_type, so clusters may carry any name.
+
+    Connections are opened lazily, reused across probes and recycled once they
+    have been idle for longer than ``max_idle_seconds``; an idle connection is
+    checked before reuse (closed flag for psycopg2, a ping for MySQL). After a failed connect
+    the node is not retried until an exponential backoff window has passed, so
+    an unreachable node fails fast instead of costing a full connect timeout.
+
+    Each new session gets a server-side statement timeout of
+    ``statement_timeout_ms`` (0 disables it), so a probe never runs longer on
+    a loaded node than that.
+    """
+
+    def __init__(self, max_idle=2, max_idle_seconds=300, connect_timeout=5,
+                 backoff_base=5, backoff_max=300, statement_timeout_ms=0):
+        self.max_idle = max_idle
+        self.max_idle_seconds = max_idle_seconds
+        self.connect_timeout = connect_timeout
+        self.statement_timeout_ms = statement_timeout_ms
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._lock = threading.Lock()
+        self._idle = {}       # (db_type, role) -> [(conn, params, last_used)]
+        self._failures = {}   # (db_type, role) -> consecutive connect failures
+        self._retry_at = {}   # (db_type, role) -> monotonic time of next connect attempt
+
+    def run(self, db_type, role, params, func):
+        """Call func(conn) on a pooled connection to the node.
+
+        A reused connection that fails (e.g. the server restarted) is discarded
+        and func is retried once on a fresh connection.
+        """
+        key = (db_type, role)
+        conn, reused = self._acquire(key, params)
+        try:
+            result = func(conn)
+        except Exception as e:
+            self._close(conn)
+            if not reused:
+                raise
+            logger.info(f"Pooled connection to {db_type} {role} failed ({e}), reconnecting")
+            conn, _ = self._acquire(key, params, fresh=True)
+            try:
+                result = func(conn)
+            except Exception:
+                self._close(conn)
+                raise
+        self._release(key, conn, params)
+        return result
+
+    def discard(self, db_type, role):
+        """Close a node's idle connections and forget its backoff, e.g. once it leaves the topology"""
+        with self._lock:
+            entries = self._idle.pop((db_type, role), [])
+            self._failures.pop((db_type, role), None)
+            self._retry_at.pop((db_type, role), None)
+        for conn, _, _ in entries:
+            self._close(conn)
+
+    def close_all(self):
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for entries in idle.values():
+            for conn, _, _ in entries:
+                self._close(conn)
+
+    def status(self):
+        """Pool state per node, for diagnostics"""
+        now = time.monotonic()
+        with self._lock:
+            keys = set(self._idle) | set(self._failures)
+            return {
+                f"{db_type}_{role}": {
+                    "idle_connections": len(self._idle.get((db_type, role), [])),
+                    "consecutive_failures": self._failures.get((db_type, role), 0),
+                    "retry_in_seconds": round(max(self._retry_at.get((db_type, role), now) - now, 0), 2),
+                }
+                for db_type, role in sorted(keys)
+            }
+
+    # ----------------------- internals -----------------------
+
+    def _acquire(self, key, params, fresh=False):
+        now = time.monotonic()
+        while not fresh:
+            with self._lock:
+                entries = self._idle.get(key, [])
+                if not entries:
+                    break
+                candidate, candidate_params, last_used = entries.pop()
+            # Checked outside the lock: a MySQL health check is a round trip to the server
+            if candidate_params == params and now - last_used < self.max_idle_seconds \
+                    and self._is_open(params.get("engine", key[0]), candidate):
+                return candidate, True
+            self._close(candidate)
+        with self._lock:
+            retry_at = self._retry_at.get(key, 0)
+
+        if now < retry_at:
+            raise NodeUnavailable(f"{key[0]} {key[1]} in reconnect backoff for another {retry_at - now:.1f}s")
+
+        try:
+            conn = self._connect(params.get("engine", key[0]), params)
+        except Exception:
+            with self._lock:
+                failures = self._failures.get(key, 0) + 1
+                self._failures[key] = failures
+                self._retry_at[key] = time.monotonic() + min(self.backoff_base * 2 ** (failures - 1), self.backoff_max)
+            raise
+        with self._lock:
+            self._failures.pop(key, None)
+            self._retry_at.pop(key, None)
+        return conn, False
+
+    def _release(self, key, conn, params):
+        with self._lock:
+            entries = self._idle.setdefault(key, [])
+            if len(entries) < self.max_idle:
+                entries.append((conn, params, time.monotonic()))
+                return
+        self._close(conn)
+
+    def _connect(self, db_type, params):
+        if db_type == "postgres":
+            conn = psycopg2.connect(
+                host=params["host"], port=params["port"], user=params["user"], password=params["password"],
+                dbname=params["dbname"], connect_timeout=self.connect_timeout
+            )
+            # Probes only read; autocommit keeps the session from sitting idle in a transaction
+            conn.autocommit = True
+            self._limit_statements(conn, "SET statement_timeout = {}")
+            return conn
+        elif db_type == "mysql":
+            conn = mysql.connector.connect(
+                host=params["host"], port=params["port"], user=params["user"], password=params["password"],
+                database=params["dbname"], connection_timeout=self.connect_timeout, autocommit=True
+            )
+            self._limit_statements(conn, "SET SESSION max_execution_time = {}")
+            return conn
+        raise ValueError(f"Unsupported db_type: {db_type}")
+
+    def _limit_statements(self, conn, statement):
+        if not self.statement_timeout_ms:
+            return
+        cur = conn.cursor()
+        try:
+            cur.execute(statement.format(int(self.statement_timeout_ms)))
+        except Exception as e:
+            # e.g. MariaDB, which names the setting max_statement_time; probe without the limit
+            logger.warning(f"Could not set a {self.statement_timeout_ms} ms statement timeout: {e}")
+        finally:
+            cur.close()
+
+    @staticmethod
+    def _is_open(db_type, conn):
+        if db_type == "postgres":
+            return conn.closed == 0
+        # Pings the server, so a connection it dropped is replaced before the probe runs
+        try:
+            return conn.is_connected()
+        except Exception:
+            return False
+
+    @staticmethod
+    def _close(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
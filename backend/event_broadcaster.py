@@ -0,0 +1,86 @@
+import logging
+import threading
+from collections import deque
+
+from serialization import dumps
+
+logger = logging.getLogger(__name__)
+
+
+class _Subscriber:
+    def __init__(self, max_queue):
+        self.frames = deque(maxlen=max_queue)   # oldest frames are dropped for slow clients
+        self.ready = threading.Event()
+        self.dropped = 0
+
+
+class EventBroadcaster:
+    """Fans collector events out to Server-Sent Events subscribers.
+
+    Each event is serialized into an SSE frame once, in ``publish``, and the
+    same bytes are appended to every subscriber's queue; streaming a frame to
+    a client is only a socket write. Queues are bounded, so a slow or stalled
+    client loses its oldest frames instead of holding up the collector. The
+    latest frame of each event type is replayed to new subscribers, so a
+    fresh dashboard renders immediately instead of waiting for the next cycle.
+    """
+
+    def __init__(self, max_queue=32, keepalive_seconds=15, retry_ms=5000):
+        self.max_queue = max_queue
+        self.keepalive_seconds = keepalive_seconds
+        self.retry_ms = retry_ms
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._latest = {}   # event type -> frame
+        self._next_id = 1
+        self._published = 0
+
+    def publish(self, event, data):
+        with self._lock:
+            event_id = self._next_id
+            self._next_id += 1
+        frame = f"id: {event_id}\nevent: {event}\ndata: ".encode() + dumps(data) + b"\n\n"
+
+        with self._lock:
+            self._latest[event] = frame
+            self._published += 1
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            if len(subscriber.frames) == subscriber.frames.maxlen:
+                subscriber.dropped += 1
+            subscriber.frames.append(frame)
+            subscriber.ready.set()
+
+    def stream(self):
+        """Generator of SSE frames for one client; ends when the client disconnects"""
+        subscriber = _Subscriber(self.max_queue)
+        with self._lock:
+            subscriber.frames.extend(self._latest.values())
+            self._subscribers.add(subscriber)
+        subscriber.ready.set()
+        logger.info(f"SSE client connected ({len(self._subscribers)} subscribed)")
+        try:
+            # How long EventSource waits before reconnecting after a dropped connection
+            yield f"retry: {int(self.retry_ms)}\n\n".encode()
+            while True:
+                if not subscriber.ready.wait(timeout=self.keepalive_seconds):
+                    # Comment line: keeps proxies from closing an idle connection
+                    yield b": keepalive\n\n"
+                    continue
+                subscriber.ready.clear()
+                # Publishers only append (a full deque evicts as it appends), so it never empties under us
+                while subscriber.frames:
+                    yield subscriber.frames.popleft()
+        finally:
+            with self._lock:
+                self._subscribers.discard(subscriber)
+            logger.info(f"SSE client disconnected ({len(self._subscribers)} subscribed)")
+
+    def status(self):
+        with self._lock:
+            return {
+                "subscribers": len(self._subscribers),
+                "published_events": self._published,
+                "dropped_frames": sum(s.dropped for s in self._subscribers),
+                "latest_events": sorted(self._latest),
+            }
@@ -0,0 +1,148 @@
+import csv
+import io
+import json
+import sqlite3
+import datetime
+import itertools
+from pathlib import Path
+
+from serialization import RowEncoder
+
+# Columns holding timestamps; only these are normalized, every other value passes through untouched
+TIMESTAMP_COLUMNS = {"timestamp", "cluster_creation_timestamp", "last_node_down_time"}
+
+EXPORT_FORMATS = ("json", "ndjson", "csv")
+MEDIA_TYPES = {"json": "application/json", "ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+# Rows are read, encoded and flushed to the client this many at a time
+BATCH_ROWS = 500
+
+
+def normalize_timestamp(value):
+    """'YYYY-MM-DD HH:MM:SS' for a stored timestamp; SQLite's own format is returned as is"""
+    if not isinstance(value, str) or (len(value) == 19 and value[10] == " "):
+        return value
+    try:
+        return datetime.datetime.fromisoformat(value.replace("Z", "+00:00")).strftime("%Y-%m-%d %H:%M:%S")
+    except ValueError:
+        return value
+
+
+def history_query(table, hours, filters, after_id=None, limit=None):
+    """Newest-first rows of a history table within `hours`, paged by id (keyset, no OFFSET)"""
+    sql = f"SELECT * FROM {table} WHERE timestamp >= datetime('now', ?)"
+    params = [f"-{int(hours)} hours"]
+    for column, value in filters.items():
+        if value:
+            sql += f" AND {column} = ?"
+            params.append(value)
+    if after_id is not None:
+        sql += " AND id < ?"
+        params.append(after_id)
+    sql += " ORDER BY id DESC"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+    return sql, params
+
+
+def open_rows(db_file, sql, params, batch_size=BATCH_ROWS):
+    """Run the query and return (columns, generator of row batches).
+
+    Errors such as a missing table surface here, before any response is sent.
+    The generator holds one batch in memory at a time, normalizes only the
+    timestamp columns and closes its read-only connection when exhausted or
+    closed by the server.
+    """
+    conn = sqlite3.connect(f"{Path(db_file).resolve().as_uri()}?mode=ro", uri=True, check_same_thread=False)
+    try:
+        cur = conn.execute(sql, params)
+    except Exception:
+        conn.close()
+        raise
+    columns = [desc[0] for desc in cur.description]
+    return columns, _formatted_batches(conn, cur, columns, batch_size)
+
+
+def _formatted_batches(conn, cur, columns, batch_size):
+    try:
+        timestamp_indexes = [i for i, column in enumerate(columns) if column in TIMESTAMP_COLUMNS]
+        while True:
+            batch = cur.fetchmany(batch_size)
+            if not batch:
+                return
+            if timestamp_indexes:
+                batch = [list(row) for row in batch]
+                for row in batch:
+                    for i in timestamp_indexes:
+                        row[i] = normalize_timestamp(row[i])
+            yield batch
+    finally:
+        conn.close()
+
+
+def with_packed_rows(columns, batches, packed_rows, after_id, limit, batch_size=BATCH_ROWS):
+    """Continue a newest-first raw export with packed rows older than its last row.
+
+    ``packed_rows(before_id, limit)`` yields rows in ``columns`` order. Rows
+    still in the raw table are never repeated: packed rows start below the
+    oldest id exported (or the page's after_id when the raw table had none).
+    """
+    count, before_id = 0, after_id
+    id_index = columns.index("id")
+    for batch in batches:
+        yield batch
+        count += len(batch)
+        before_id = batch[-1][id_index]
+    if limit is not None and count >= limit:
+        return
+    rows = packed_rows(before_id, None if limit is None else limit - count)
+    timestamp_indexes = [i for i, column in enumerate(columns) if column in TIMESTAMP_COLUMNS]
+    while True:
+        batch = [list(row) for row in itertools.islice(rows, batch_size)]
+        if not batch:
+            return
+        for row in batch:
+            for i in timestamp_indexes:
+                row[i] = normalize_timestamp(row[i])
+        yield batch
+
+
+def stream_json(columns, batches, records_key, envelope, limit):
+    """The classic JSON envelope, written incrementally; counts and the cursor come last"""
+    encoder = RowEncoder(columns)
+    yield json.dumps(envelope)[:-1] + f', "{records_key}": ['
+    count, last_id = 0, None
+    id_index = columns.index("id")
+    for batch in batches:
+        yield (b"," if count else b"") + encoder.objects(batch)
+        count += len(batch)
+        last_id = batch[-1][id_index]
+    next_after_id = last_id if limit is not None and count == limit else None
+    yield f'], "total_records": {count}, "next_after_id": {json.dumps(next_after_id)}}}'
+
+
+def stream_ndjson(columns, batches):
+    encoder = RowEncoder(columns)
+    for batch in batches:
+        yield encoder.lines(batch)
+
+
+def stream_csv(columns, batches):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for batch in batches:
+        writer.writerows(batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def export_stream(export_format, columns, batches, records_key, envelope, limit):
+    if export_format == "ndjson":
+        return stream_ndjson(columns, batches)
+    if export_format == "csv":
+        return stream_csv(columns, batches)
+    return stream_json(columns, batches, records_key, envelope, limit)
@@ -1,15 +1,38 @@
 import os
+import sys
+import time
+import atexit
 import datetime
 import logging
 import sqlite3
-import psycopg2
-import mysql.connector
-from flask import Flask, jsonify, request
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from flask import Flask, Response, jsonify, request, g
 from flask_cors import CORS
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.interval import IntervalTrigger
 from dotenv import load_dotenv
+# The shared/ package (instrumentation, JSON backend) sits at the repository root, next to this app
+if os.path.dirname(os.path.dirname(os.path.abspath(__file__))) not in sys.path:
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from db_config import DB_CONFIG  # Import your DB configuration
+from db_pool import NodeConnectionPool
+from probes import ProbeProcesses, probe_nodes as probe_in_threads
+from sharding import HashRing, ShardLock
+from snapshot_cache import SnapshotCache
+from uptime_tracker import UptimeTracker
+from transition_log import TransitionLog, CHANGE, START, CLUSTER_SEVERITY
+from sqlite_writer import SQLiteWriter
+from adaptive_scheduler import AdaptiveScheduler, parse_interval_overrides
+from topology import TopologyRegistry
+from rollups import record_metric_rollups, record_cluster_rollups
+from migrations import migrate, METRICS_MIGRATIONS, LOG_MIGRATIONS, PROBE_LOAD_COLUMNS
+from retention import apply_retention
+from event_broadcaster import EventBroadcaster
+from serialization import FastJSONProvider
+from shared.instrumentation import Counter, Gauge, Histogram, CONTENT_TYPE, render as render_instrumentation
+from history_export import EXPORT_FORMATS, MEDIA_TYPES, history_query, open_rows, export_stream, with_packed_rows
+from sample_store import compact_metrics, packed_history
 
 # Load environment variables from .env file
 load_dotenv()
@@ -19,6 +42,7 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
+app.json = FastJSONProvider(app)  # jsonify through orjson/msgspec when installed
 CORS(app)
 
 DB_LOG_DIR = "monitorapp/sqlite_db_data"
@@ -31,6 +55,159 @@ DB_LOG_FILE = "/home/nodetree/Pictures/monitorapp/sqlite_db_data/db_log.sqlite"
 # Global scheduler
 scheduler = BackgroundScheduler()
 
+# Clusters and nodes to monitor: TOPOLOGY_FILE (JSON, hot-reloaded every TOPOLOGY_RELOAD_SECONDS)
+# or, without one, the three-node postgres and mysql clusters of db_config.py
+TOPOLOGY_FILE = os.getenv("TOPOLOGY_FILE")
+TOPOLOGY_RELOAD_SECONDS = float(os.getenv("TOPOLOGY_RELOAD_SECONDS", 30))
+topology = TopologyRegistry(TOPOLOGY_FILE, DB_CONFIG)
+
+# Concurrent probing: every node is probed in its own worker thread and a cycle
+# waits at most PROBE_CYCLE_DEADLINE seconds, so it lasts as long as the slowest node.
+PROBE_WORKERS = int(os.getenv("PROBE_WORKERS", 16))
+PROBE_CYCLE_DEADLINE = float(os.getenv("PROBE_CYCLE_DEADLINE", 15))
+# PROBE_PROCESSES > 1 spreads the probes over that many worker processes (PROBE_WORKERS threads each)
+PROBE_PROCESSES = int(os.getenv("PROBE_PROCESSES", 1))
+
+# Sharding across collector instances: instance COLLECTOR_SHARD_INDEX of COLLECTOR_SHARD_COUNT polls
+# the clusters the consistent-hash ring assigns to it, and only while it holds its shard's lock file;
+# a second instance started for the same shard waits as a standby and takes over when the lock frees.
+COLLECTOR_SHARD_COUNT = int(os.getenv("COLLECTOR_SHARD_COUNT", 1))
+COLLECTOR_SHARD_INDEX = int(os.getenv("COLLECTOR_SHARD_INDEX", 0))
+COLLECTOR_LOCK_FILE = os.getenv("COLLECTOR_LOCK_FILE", os.path.join(
+    os.path.dirname(METRICS_DB_FILE), f"collector-shard-{COLLECTOR_SHARD_INDEX}-of-{COLLECTOR_SHARD_COUNT}.lock"))
+COLLECTOR_LOCK_RETRY_SECONDS = float(os.getenv("COLLECTOR_LOCK_RETRY_SECONDS", 10))
+
+# Window reported as uptime_percentage: one of 1h, 24h, 7d
+UPTIME_WINDOW = os.getenv("UPTIME_WINDOW", "24h")
+
+# status_logs and cluster_status store a row when a state changes, and otherwise one heartbeat
+# row every TRANSITION_HEARTBEAT_SECONDS; between rows the state is the earlier row's.
+# Changes are also written to the events table read by /api/historical-events.
+TRANSITION_HEARTBEAT_SECONDS = float(os.getenv("TRANSITION_HEARTBEAT_SECONDS", 3600))
+
+# Retention: raw rows are kept RAW_RETENTION_DAYS, rollups per resolution for longer
+RAW_RETENTION_DAYS = int(os.getenv("RAW_RETENTION_DAYS", 30))
+ROLLUP_RETENTION_DAYS = {
+    "1m": int(os.getenv("ROLLUP_1M_RETENTION_DAYS", 7)),
+    "1h": int(os.getenv("ROLLUP_1H_RETENTION_DAYS", 180)),
+    "1d": int(os.getenv("ROLLUP_1D_RETENTION_DAYS", 1825)),
+}
+# Compact storage: samples older than COMPACT_AFTER_HOURS are packed into per-node chunks
+# of COMPACT_CHUNK_HOURS (sample_store.py) before retention drops the raw rows, and the
+# chunks are kept COMPACT_RETENTION_DAYS. Lower RAW_RETENTION_DAYS to shrink metrics.db;
+# /metrics/history reads the packed samples past the raw ones.
+COMPACT_AFTER_HOURS = float(os.getenv("COMPACT_AFTER_HOURS", 24))
+COMPACT_CHUNK_HOURS = int(os.getenv("COMPACT_CHUNK_HOURS", 24))
+COMPACT_RETENTION_DAYS = int(os.getenv("COMPACT_RETENTION_DAYS", 365))
+EVENTS_RETENTION_DAYS = int(os.getenv("EVENTS_RETENTION_DAYS", 365))
+RETENTION_BATCH_SIZE = int(os.getenv("RETENTION_BATCH_SIZE", 5000))
+RETENTION_INTERVAL_HOURS = float(os.getenv("RETENTION_INTERVAL_HOURS", 24))
+
+# Seconds a live /metrics snapshot is served before it is rebuilt from the latest results
+SNAPSHOT_TTL = float(os.getenv("SNAPSHOT_TTL", 30))
+
+# Adaptive polling: each node is probed on its own interval (POLL_INTERVAL_SECONDS, or a
+# per-node override such as "postgres:master=120,mysql=300"), at POLL_FAST_INTERVAL_SECONDS
+# while it lags or its cluster is degraded, and with exponential backoff while it is down.
+# The scheduler checks for due nodes every POLL_TICK_SECONDS.
+POLL_INTERVAL_SECONDS = float(os.getenv("POLL_INTERVAL_SECONDS", 600))
+POLL_FAST_INTERVAL_SECONDS = float(os.getenv("POLL_FAST_INTERVAL_SECONDS", 60))
+POLL_BACKOFF_FACTOR = float(os.getenv("POLL_BACKOFF_FACTOR", 2))
+POLL_MAX_BACKOFF_SECONDS = float(os.getenv("POLL_MAX_BACKOFF_SECONDS", 1800))
+POLL_LAG_THRESHOLD_SECONDS = float(os.getenv("POLL_LAG_THRESHOLD_SECONDS", 30))
+POLL_JITTER = float(os.getenv("POLL_JITTER", 0.1))
+POLL_TICK_SECONDS = float(os.getenv("POLL_TICK_SECONDS", 5))
+
+probe_executor = ThreadPoolExecutor(max_workers=PROBE_WORKERS, thread_name_prefix="probe")
+
+NODE_POOL_SETTINGS = {
+    "max_idle": int(os.getenv("NODE_POOL_MAX_IDLE", 2)),
+    "max_idle_seconds": float(os.getenv("NODE_POOL_MAX_IDLE_SECONDS", 300)),
+    "connect_timeout": 5,
+    "backoff_base": float(os.getenv("NODE_POOL_BACKOFF_BASE", 5)),
+    "backoff_max": float(os.getenv("NODE_POOL_BACKOFF_MAX", 300)),
+    # Server-side limit on every probe statement, so a loaded node cannot stall a probe
+    "statement_timeout_ms": int(os.getenv("PROBE_STATEMENT_TIMEOUT_MS", 5000)),
+}
+
+# Persistent connections to the monitored nodes, shared by the scheduler job and the Flask routes
+node_pool = NodeConnectionPool(**NODE_POOL_SETTINGS)
+atexit.register(node_pool.close_all)
+
+# Worker processes probe with their own pools; results come back here, to the single SQLite writer
+probe_processes = ProbeProcesses(PROBE_PROCESSES, NODE_POOL_SETTINGS, PROBE_WORKERS) if PROBE_PROCESSES > 1 else None
+if probe_processes:
+    atexit.register(probe_processes.shutdown)
+
+shard_ring = HashRing([f"shard-{i}" for i in range(COLLECTOR_SHARD_COUNT)])
+shard_lock = ShardLock(COLLECTOR_LOCK_FILE)
+atexit.register(shard_lock.release)
+
+# Every collector write goes through this one writer; a poll cycle is one transaction per file
+sqlite_writer = SQLiteWriter(synchronous=os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"))
+atexit.register(sqlite_writer.close)
+
+node_scheduler = AdaptiveScheduler(
+    [],
+    base_interval=POLL_INTERVAL_SECONDS,
+    fast_interval=POLL_FAST_INTERVAL_SECONDS,
+    backoff_factor=POLL_BACKOFF_FACTOR,
+    max_backoff=POLL_MAX_BACKOFF_SECONDS,
+    lag_threshold=POLL_LAG_THRESHOLD_SECONDS,
+    jitter=POLL_JITTER,
+    overrides=parse_interval_overrides(os.getenv("POLL_INTERVAL_OVERRIDES")),
+)
+
+
+def owned_topology(current=None):
+    """The part of the topology this instance polls. Whole clusters are assigned to a shard,
+    so every cluster's status is judged by the one instance that sees all of its nodes."""
+    current = current or topology.current()
+    if COLLECTOR_SHARD_COUNT == 1:
+        return current
+    return current.subset([name for name in current.clusters
+                           if shard_ring.owner(name) == f"shard-{COLLECTOR_SHARD_INDEX}"])
+
+
+def poll_intervals(current):
+    """Base intervals set per node or per cluster in the topology file"""
+    return {key: current.node(key).poll_interval for key in current.keys()
+            if current.node(key).poll_interval is not None}
+
+
+node_scheduler.sync(owned_topology().keys(), poll_intervals(owned_topology()))
+
+# Collection cycles never overlap: scheduled and manual runs take this lock
+collection_lock = threading.Lock()
+
+# Latest probe result and uptime figures per node, so a cycle that polls only some
+# nodes can still judge whole clusters
+latest_results = {}
+latest_uptimes = {}
+
+# Live updates pushed to dashboards over Server-Sent Events (/events/stream)
+events = EventBroadcaster(
+    max_queue=int(os.getenv("SSE_MAX_QUEUE", 32)),
+    keepalive_seconds=float(os.getenv("SSE_KEEPALIVE_SECONDS", 15)),
+)
+
+# Self-instrumentation, served in Prometheus text format at /internal/metrics
+PROBE_SECONDS = Histogram("monitor_probe_seconds", "Duration of one node probe (get_db_metrics)",
+                          ["cluster", "role", "status"])
+PROBE_PHASE_SECONDS = Histogram("monitor_probe_phase_seconds",
+                                "Probe time spent connecting (or waiting for the pool) and querying",
+                                ["engine", "phase"])
+PROBE_STATEMENTS = Counter("monitor_probe_statements_total", "Statements run by node probes", ["engine"])
+CYCLE_SECONDS = Histogram("monitor_collection_cycle_seconds", "Duration of a collection cycle",
+                          buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 15, 30, 60, 120))
+CYCLES = Counter("monitor_collection_cycles_total", "Collection cycles by outcome", ["result"])
+CYCLE_NODES = Gauge("monitor_collection_cycle_nodes", "Nodes polled by the last collection cycle")
+UPTIME_SECONDS = Histogram("monitor_calculate_uptime_seconds", "Duration of calculate_uptime for one node")
+REQUEST_SECONDS = Histogram("monitor_http_request_seconds", "Flask request latency by route",
+                            ["method", "route", "status"])
+Gauge("monitor_sse_subscribers", "Connected /events/stream clients").set_function(
+    lambda: events.status()["subscribers"])
+
 
 # ======================= Helper functions =======================
 
@@ -52,353 +229,554 @@ def format_timestamps(obj):
 
 
 def init_metrics_db():
-    conn = sqlite3.connect(METRICS_DB_FILE)
-    cur = conn.cursor()
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS metrics (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-            db_type TEXT NOT NULL,
-            role TEXT NOT NULL,
-            host TEXT,
-            port INTEGER,
-            connection_status TEXT NOT NULL,
-            cluster_version TEXT,
-            cluster_creation_timestamp TEXT,
-            replication_lag_seconds REAL,
-            replication_io_running TEXT,
-            replication_sql_running TEXT,
-            uptime_percentage REAL,
-            last_node_down_time TEXT
-        );
-    """)
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS cluster_status (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-            db_type TEXT NOT NULL,
-            status TEXT NOT NULL,
-            master_status TEXT,
-            slave1_status TEXT,
-            slave2_status TEXT
-        );
-    """)
-    cur.execute("CREATE INDEX IF NOT EXISTS idx_metrics_timestamp ON metrics(timestamp);")
-    cur.execute("CREATE INDEX IF NOT EXISTS idx_cluster_timestamp ON cluster_status(timestamp);")
-    conn.commit()
-    conn.close()
+    migrate(sqlite_writer, METRICS_DB_FILE, METRICS_MIGRATIONS)
 
 
 def init_logging_db():
-    conn = sqlite3.connect(DB_LOG_FILE)
-    cur = conn.cursor()
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS status_logs (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-            db_type TEXT,
-            role TEXT,
-            host TEXT,
-            status TEXT
-        );
-    """)
-    conn.commit()
-    conn.close()
+    migrate(sqlite_writer, DB_LOG_FILE, LOG_MIGRATIONS)
+
+
+def record_event(event, severity):
+    sqlite_writer.execute(DB_LOG_FILE, """
+        INSERT INTO events (event, severity, timestamp)
+        VALUES (?, ?, CURRENT_TIMESTAMP)
+    """, (event, severity))
 
 
 def log_status(db_type, role, host, status):
-    conn = sqlite3.connect(DB_LOG_FILE)
-    cur = conn.cursor()
-    cur.execute("""
-        INSERT INTO status_logs (db_type, role, host, status)
-        VALUES (?, ?, ?, ?)
-    """, (db_type, role, host, status))
-    conn.commit()
-    conn.close()
+    # Count the sample before inserting it, so a first-time warm-up does not see it twice
+    uptime_tracker.record(db_type, role, status)
+    kind, _ = node_transitions.check((db_type, role), status)
+    if kind is None:
+        return
+    sqlite_writer.execute(DB_LOG_FILE, """
+        INSERT INTO status_logs (db_type, role, host, status, kind)
+        VALUES (?, ?, ?, ?, ?)
+    """, (db_type, role, host, status, kind))
+    # A node already down when first seen (startup without a stored state) is an outage too
+    if status != "up" and kind in (CHANGE, START):
+        record_event(f"{db_type} {role} ({host}) is down", "critical")
+    elif kind == CHANGE:
+        record_event(f"{db_type} {role} ({host}) is up again", "info")
 
 
 def save_metrics_to_db(db_type, role, host, port, metrics, uptime_data):
-    conn = sqlite3.connect(METRICS_DB_FILE)
-    cur = conn.cursor()
-    cur.execute("""
+    uptime = float(uptime_data["uptime_percentage"].replace('%', '')) if uptime_data["uptime_percentage"] != "No data" else None
+    sqlite_writer.execute(METRICS_DB_FILE, f"""
         INSERT INTO metrics (
             db_type, role, host, port, connection_status, cluster_version,
             cluster_creation_timestamp, replication_lag_seconds, replication_io_running,
-            replication_sql_running, uptime_percentage, last_node_down_time
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            replication_sql_running, uptime_percentage, last_node_down_time, probe_latency_ms,
+            {", ".join(column for column, _ in PROBE_LOAD_COLUMNS)}
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, {", ".join("?" * len(PROBE_LOAD_COLUMNS))})
     """, (
         db_type, role, host, port, metrics["connection_status"],
         metrics["cluster_version"], metrics["cluster_creation_timestamp"],
         metrics.get("replication_lag_seconds"), metrics.get("replication_io_running"),
-        metrics.get("replication_sql_running"),
-        float(uptime_data["uptime_percentage"].replace('%', '')) if uptime_data["uptime_percentage"] != "No data" else None,
-        uptime_data["last_node_down_time"]
+        metrics.get("replication_sql_running"), uptime,
+        uptime_data["last_node_down_time"],
+        metrics.get("probe_latency_ms"),
+        *(metrics.get(column) for column, _ in PROBE_LOAD_COLUMNS)
     ))
-    conn.commit()
-    conn.close()
-
-
-def save_cluster_status_to_db(db_type, status, master_status, slave1_status, slave2_status):
-    conn = sqlite3.connect(METRICS_DB_FILE)
+    record_metric_rollups(sqlite_writer, METRICS_DB_FILE, db_type, role, metrics["connection_status"],
+                          metrics.get("replication_lag_seconds"), uptime)
+    sqlite_writer.execute(METRICS_DB_FILE, """
+        INSERT INTO node_current (db_type, role, host, port, connection_status, replication_lag_seconds, timestamp)
+        VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+        ON CONFLICT (db_type, role) DO UPDATE SET
+            host = excluded.host,
+            port = excluded.port,
+            connection_status = excluded.connection_status,
+            replication_lag_seconds = excluded.replication_lag_seconds,
+            timestamp = excluded.timestamp
+    """, (db_type, role, host, port, metrics["connection_status"], metrics.get("replication_lag_seconds")))
+
+
+def cluster_state(status, node_statuses):
+    """What a cluster_status row records, comparable with one loaded back (roles sorted)"""
+    return status, tuple(sorted(node_statuses))
+
+
+def save_cluster_status_to_db(db_type, status, node_statuses):
+    """node_statuses: [(role, status)] for every node of the cluster, primary first"""
+    # The master/slave1/slave2 columns hold the primary and the first two replicas, for older readers
+    legacy = ([node_status for _, node_status in node_statuses] + [None, None, None])[:3]
+    kind, previous = cluster_transitions.check(db_type, cluster_state(status, node_statuses))
+    if kind is not None:
+        cur = sqlite_writer.execute(METRICS_DB_FILE, """
+            INSERT INTO cluster_status (db_type, status, master_status, slave1_status, slave2_status, kind)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (db_type, status, *legacy, kind))
+        sqlite_writer.executemany(METRICS_DB_FILE, """
+            INSERT INTO cluster_status_nodes (cluster_status_id, role, status)
+            VALUES (?, ?, ?)
+        """, [(cur.lastrowid, role, node_status) for role, node_status in node_statuses])
+    # A node changing inside an already degraded cluster is a node event, not a cluster one
+    if kind == CHANGE and previous[0] != status:
+        record_event(f"{db_type} cluster is {status} (was {previous[0]})", CLUSTER_SEVERITY.get(status, "warning"))
+    # Rollups still count every sample, so trend buckets keep their per-cycle counts
+    record_cluster_rollups(sqlite_writer, METRICS_DB_FILE, db_type, status)
+    sqlite_writer.execute(METRICS_DB_FILE, """
+        INSERT INTO cluster_current (db_type, status, master_status, slave1_status, slave2_status, timestamp)
+        VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+        ON CONFLICT (db_type) DO UPDATE SET
+            status = excluded.status,
+            master_status = excluded.master_status,
+            slave1_status = excluded.slave1_status,
+            slave2_status = excluded.slave2_status,
+            timestamp = excluded.timestamp
+    """, (db_type, status, *legacy))
+
+
+def load_uptime_history():
+    """Status log rows inside the largest uptime window (and one gap before it), plus each
+    node's last outage"""
+    conn = sqlite3.connect(DB_LOG_FILE)
     cur = conn.cursor()
     cur.execute("""
-        INSERT INTO cluster_status (db_type, status, master_status, slave1_status, slave2_status)
-        VALUES (?, ?, ?, ?, ?)
-    """, (db_type, status, master_status, slave1_status, slave2_status))
-    conn.commit()
+        SELECT timestamp, db_type, role, status FROM status_logs
+        WHERE timestamp >= datetime('now', ?)
+        ORDER BY id
+    """, (f"-{int(uptime_tracker.history_seconds())} seconds",))
+    samples = cur.fetchall()
+    cur.execute("""
+        SELECT db_type, role, MAX(timestamp) FROM status_logs
+        WHERE status = 'down'
+        GROUP BY db_type, role
+    """)
+    last_down = {(db_type, role): timestamp for db_type, role, timestamp in cur.fetchall()}
     conn.close()
+    return samples, last_down
 
 
-def calculate_uptime(db_type, role):
+def load_node_states():
+    """Last stored status of every node in status_logs"""
     conn = sqlite3.connect(DB_LOG_FILE)
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT timestamp, status FROM status_logs
-        WHERE db_type = ? AND role = ?
-        ORDER BY timestamp DESC
-        LIMIT 1000
-    """, (db_type, role))
-    rows = cur.fetchall()
+    rows = conn.execute("""
+        SELECT db_type, role, status FROM status_logs
+        WHERE id IN (SELECT MAX(id) FROM status_logs GROUP BY db_type, role)
+    """).fetchall()
     conn.close()
+    return {(db_type, role): status for db_type, role, status in rows}
 
-    if not rows:
-        return {"uptime_percentage": "No data", "last_node_down_time": "No data"}
 
-    total = len(rows)
-    up = sum(1 for r in rows if r[1] == "up")
-    last_down_time = next((r[0] for r in rows if r[1] == "down"), "Never")
-    return {
-        "uptime_percentage": f"{(up / total) * 100:.2f}%",
-        "last_node_down_time": last_down_time
-    }
-
-
-def get_db_metrics(db_type, role, db_config):
-    host, port, user, password, dbname = None, None, None, None, None
-
-    # Assign DB config
-    if db_type == "postgres":
-        if role == "master":
-            host, port, user, password, dbname = db_config["PG_MASTER_IP"], db_config["PG_MASTER_PORT"], db_config["PG_USER"], db_config["PG_PASS"], db_config["PG_DB_NAME"]
-        elif role == "slave1":
-            host, port, user, password, dbname = db_config["PG_SLAVE1_IP"], db_config["PG_SLAVE1_PORT"], db_config["PG_USER"], db_config["PG_PASS"], db_config["PG_DB_NAME"]
-        elif role == "slave2":
-            host, port, user, password, dbname = db_config["PG_SLAVE2_IP"], db_config["PG_SLAVE2_PORT"], db_config["PG_SLAVE2_USER"], db_config["PG_SLAVE2_PASS"], db_config["PG_SLAVE2_DB_NAME"]
+def load_cluster_states():
+    """Last stored status and node statuses of every cluster in cluster_status"""
+    conn = sqlite3.connect(METRICS_DB_FILE)
+    rows = conn.execute("""
+        SELECT c.db_type, c.status, n.role, n.status
+        FROM cluster_status AS c
+        JOIN cluster_status_nodes AS n ON n.cluster_status_id = c.id
+        WHERE c.id IN (SELECT MAX(id) FROM cluster_status GROUP BY db_type)
+    """).fetchall()
+    conn.close()
+    nodes = {}
+    for db_type, status, role, node_status in rows:
+        nodes.setdefault((db_type, status), []).append((role, node_status))
+    return {db_type: cluster_state(status, node_statuses) for (db_type, status), node_statuses in nodes.items()}
 
-    elif db_type == "mysql":
-        if role == "master":
-            host, port, user, password, dbname = db_config["MYSQL_MASTER_IP"], db_config["MYSQL_MASTER_PORT"], db_config["MYSQL_USER"], db_config["MYSQL_PASS"], db_config["MYSQL_DB_NAME"]
-        elif role == "slave1":
-            host, port, user, password, dbname = db_config["MYSQL_SLAVE1_IP"], db_config["MYSQL_SLAVE1_PORT"], db_config["MYSQL_USER"], db_config["MYSQL_PASS"], db_config["MYSQL_DB_NAME"]
-        elif role == "slave2":
-            host, port, user, password, dbname = db_config["MYSQL_SLAVE2_IP"], db_config["MYSQL_SLAVE2_PORT"], db_config["MYSQL_SLAVE2_USER"], db_config["MYSQL_SLAVE2_PASS"], db_config["MYSQL_SLAVE2_DB_NAME"]
 
-    metrics = {"connection_status": "down", "cluster_version": "N/A", "cluster_creation_timestamp": "N/A"}
+# Running uptime counters, fed by log_status and warmed once from status_logs. A state holds
+# until the next row, at most one heartbeat plus the longest polling interval.
+uptime_tracker = UptimeTracker(load_uptime_history, max_gap=TRANSITION_HEARTBEAT_SECONDS + POLL_MAX_BACKOFF_SECONDS)
+node_transitions = TransitionLog(TRANSITION_HEARTBEAT_SECONDS, load_node_states)
+cluster_transitions = TransitionLog(TRANSITION_HEARTBEAT_SECONDS, load_cluster_states)
 
-    try:
-        if db_type == "postgres":
-            conn = psycopg2.connect(
-                host=host, port=port, user=user, password=password, dbname=dbname, connect_timeout=5
-            )
-            with conn.cursor() as cur:
-                cur.execute("SELECT version();")
-                metrics["cluster_version"] = cur.fetchone()[0]
-                cur.execute("SELECT pg_postmaster_start_time();")
-                metrics["cluster_creation_timestamp"] = cur.fetchone()[0].isoformat()
-                if role in ["slave1", "slave2"]:
-                    cur.execute("SELECT now() - pg_last_xact_replay_timestamp() AS replication_lag;")
-                    lag = cur.fetchone()[0]
-                    metrics["replication_lag_seconds"] = lag.total_seconds() if lag else None
-            conn.close()
-            metrics["connection_status"] = "up"
-
-        elif db_type == "mysql":
-            conn = mysql.connector.connect(
-                host=host, port=port, user=user, password=password, database=dbname, connection_timeout=5
-            )
-            cur = conn.cursor(dictionary=True)
-            cur.execute("SELECT VERSION() AS version;")
-            row = cur.fetchone()
-            metrics["cluster_version"] = row["version"] if row else "N/A"
-            cur.execute("SHOW GLOBAL STATUS LIKE 'Uptime';")
-            row2 = cur.fetchone()
-            if row2 and "Value" in row2:
-                uptime_seconds = int(row2["Value"])
-                start_time = datetime.datetime.now() - datetime.timedelta(seconds=uptime_seconds)
-                metrics["cluster_creation_timestamp"] = start_time.isoformat() + "Z"
-            if role in ["slave1", "slave2"]:
-                cur.execute("SHOW SLAVE STATUS;")
-                slave_status = cur.fetchone()
-                if slave_status:
-                    metrics["replication_lag_seconds"] = slave_status.get("Seconds_Behind_Master", None)
-                    metrics["replication_io_running"] = slave_status.get("Slave_IO_Running", None)
-                    metrics["replication_sql_running"] = slave_status.get("Slave_SQL_Running", None)
-            cur.close()
-            conn.close()
-            metrics["connection_status"] = "up"
 
-    except Exception as e:
-        logger.error(f"Error connecting to {db_type} at {host}:{port}: {e}")
-        metrics["connection_status"] = "down"
-
-    log_status(db_type, role, host, metrics["connection_status"])
-    return metrics, host, port
+def calculate_uptime(db_type, role):
+    with UPTIME_SECONDS.time():
+        return uptime_tracker.uptime_data(db_type, role, UPTIME_WINDOW)
 
 
-def get_status_summary(master_status, slave1_status, slave2_status):
-    if master_status == "up" and slave1_status == "up" and slave2_status == "up":
+def probe_nodes(nodes, deadline=PROBE_CYCLE_DEADLINE):
+    """Probe topology nodes in this process's threads, or in the probe worker processes"""
+    if probe_processes:
+        results = probe_processes.probe(nodes, deadline)
+    else:
+        results = probe_in_threads(nodes, probe_executor, node_pool, deadline)
+    # Timings are observed here, so probes made in worker processes are counted too
+    for node in nodes:
+        metrics = results[(node.cluster, node.role)][0]
+        PROBE_SECONDS.labels(node.cluster, node.role, metrics["connection_status"]).observe(
+            metrics["probe_latency_ms"] / 1000)
+        for phase, seconds in metrics.pop("probe_phases", {}).items():
+            PROBE_PHASE_SECONDS.labels(node.engine, phase).observe(seconds)
+        PROBE_STATEMENTS.labels(node.engine).inc(metrics.pop("probe_statements", 0))
+    return results
+
+
+def get_status_summary(primary_status, replica_statuses):
+    if primary_status == "up" and all(status == "up" for status in replica_statuses):
         return "healthy"
-    elif master_status == "down":
+    elif primary_status == "down":
         return "critical"
-    elif slave1_status == "down" or slave2_status == "down":
+    elif any(status == "down" for status in replica_statuses):
         return "degraded"
     else:
         return "unknown"
 
 
-def poll_and_save_metrics():
-    """Poll database metrics and save"""
+def build_cluster_snapshot(current, results, uptimes):
+    """Shape probe results and uptime figures into the /metrics response.
+
+    One "<cluster>_cluster" entry per cluster, holding a "<role>_node" entry
+    per node and "nodes", the roles in topology order (primary first).
+    """
+    snapshot = {}
+    for name, cluster in current.clusters.items():
+        nodes = {node.role: {**results[(name, node.role)][0], **uptimes[(name, node.role)]}
+                 for node in cluster["nodes"]}
+        primary, *replicas = nodes.values()
+        snapshot[f"{name}_cluster"] = {
+            "status": get_status_summary(primary["connection_status"],
+                                         [replica["connection_status"] for replica in replicas]),
+            "engine": cluster["engine"],
+            "nodes": list(nodes),
+            **{f"{role}_node": node for role, node in nodes.items()},
+        }
+    return format_timestamps(snapshot)
+
+
+# Shown for a node that has no probe result yet (just after startup or a topology change)
+PENDING_RESULT = ({"connection_status": "unknown", "cluster_version": "N/A",
+                   "cluster_creation_timestamp": "N/A"}, None, None)
+
+
+def load_live_snapshot():
+    """The /metrics snapshot, built from the latest result of every node.
+
+    The adaptive cycles keep those results current, each node on its own
+    interval, so a refresh probes nothing by itself: when some node has no
+    result yet, the nodes that are due are polled first, as the next tick
+    would. Probing and logging statuses is the active instance's job.
+    """
+    if not shard_lock.held:
+        raise RuntimeError("Standby collector: the live snapshot is kept by the active instance")
+    current = owned_topology()
+    if any(key not in latest_results for key in current.keys()):
+        due = node_scheduler.claim_due()
+        if due:
+            poll_and_save_metrics(due, update_snapshot=False)
+    results = {key: latest_results.get(key, PENDING_RESULT) for key in current.keys()}
+    uptimes = {key: latest_uptimes.get(key) or calculate_uptime(*key) for key in current.keys()}
+    return build_cluster_snapshot(current, results, uptimes)
+
+
+def publish_snapshot(snapshot, meta):
+    events.publish("snapshot", {**snapshot, "snapshot": meta})
+
+
+# Live /metrics responses are served from this snapshot instead of probing per request;
+# every new snapshot is also pushed to /events/stream subscribers
+live_snapshot = SnapshotCache(load_live_snapshot, ttl=SNAPSHOT_TTL, on_update=publish_snapshot)
+
+
+def cluster_status_of(current, db_type):
+    """(summary, [(role, status)]) from the latest known status of each node, primary first.
+
+    None while some node of the cluster has no result yet (just started, or
+    added by a topology reload): it has not been polled, which is not down.
+    """
+    if any((db_type, role) not in latest_results for role in current.roles(db_type)):
+        return None
+    node_statuses = [(role, latest_results[(db_type, role)][0]["connection_status"])
+                     for role in current.roles(db_type)]
+    primary_status, *replica_statuses = [status for _, status in node_statuses]
+    return get_status_summary(primary_status, replica_statuses), node_statuses
+
+
+def poll_and_save_metrics(nodes=None, update_snapshot=True):
+    """Poll database metrics for the given nodes (default: the whole topology) and save"""
+    claimed = nodes or []
+    recorded = set()
     try:
-        logger.info("Collecting metrics...")
-        init_logging_db()
-        databases = [
-            ("postgres", "master"), ("postgres", "slave1"), ("postgres", "slave2"),
-            ("mysql", "master"), ("mysql", "slave1"), ("mysql", "slave2")
-        ]
-        pg_statuses, mysql_statuses = {}, {}
-        for db_type, role in databases:
-            metrics, host, port = get_db_metrics(db_type, role, DB_CONFIG)
-            uptime_data = calculate_uptime(db_type, role)
-            save_metrics_to_db(db_type, role, host, port, metrics, uptime_data)
-            if db_type == "postgres": pg_statuses[role] = metrics["connection_status"]
-            else: mysql_statuses[role] = metrics["connection_status"]
-
-        pg_cluster_status = get_status_summary(pg_statuses.get("master", "down"),
-                                               pg_statuses.get("slave1", "down"),
-                                               pg_statuses.get("slave2", "down"))
-        save_cluster_status_to_db("postgres", pg_cluster_status,
-                                  pg_statuses.get("master", "down"),
-                                  pg_statuses.get("slave1", "down"),
-                                  pg_statuses.get("slave2", "down"))
-
-        mysql_cluster_status = get_status_summary(mysql_statuses.get("master", "down"),
-                                                  mysql_statuses.get("slave1", "down"),
-                                                  mysql_statuses.get("slave2", "down"))
-        save_cluster_status_to_db("mysql", mysql_cluster_status,
-                                  mysql_statuses.get("master", "down"),
-                                  mysql_statuses.get("slave1", "down"),
-                                  mysql_statuses.get("slave2", "down"))
-        logger.info("Metrics collection complete")
+        with collection_lock:
+            current = owned_topology()
+            # Nodes claimed before a topology reload may have been removed since
+            nodes = current.keys() if nodes is None else [key for key in nodes if key in current]
+            logger.info(f"Collecting metrics for {len(nodes)} node(s)...")
+            cycle_started = time.monotonic()
+            init_logging_db()
+            results = probe_nodes([current.node(key) for key in nodes])
+            # One transaction per database file for the whole cycle
+            with sqlite_writer.batch():
+                for db_type, role in nodes:
+                    metrics, host, port = latest_results[(db_type, role)] = results[(db_type, role)]
+                    log_status(db_type, role, host, metrics["connection_status"])
+                    uptime_data = latest_uptimes[(db_type, role)] = calculate_uptime(db_type, role)
+                    save_metrics_to_db(db_type, role, host, port, metrics, uptime_data)
+
+                cluster_statuses = {}
+                for db_type in sorted({db_type for db_type, _ in nodes}):
+                    cluster_status = cluster_status_of(current, db_type)
+                    if cluster_status is None:
+                        logger.info(f"{db_type}: cluster status is stored once every node has been polled")
+                        cluster_statuses[db_type] = None
+                        continue
+                    cluster_statuses[db_type] = cluster_status[0]
+                    save_cluster_status_to_db(db_type, *cluster_status)
+
+            for db_type, role in nodes:
+                metrics = results[(db_type, role)][0]
+                node_scheduler.record((db_type, role), metrics["connection_status"],
+                                      metrics.get("replication_lag_seconds"), cluster_statuses[db_type])
+                recorded.add((db_type, role))
+            if update_snapshot and all(key in latest_results for key in current.keys()):
+                live_snapshot.set(build_cluster_snapshot(current, latest_results, latest_uptimes))
+            duration = time.monotonic() - cycle_started
+            CYCLE_SECONDS.observe(duration)
+            CYCLE_NODES.set(len(nodes))
+            CYCLES.labels("ok").inc()
+            # Tells dashboards that new history rows are committed and can be fetched
+            events.publish("cycle", {
+                "completed_at": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                "duration_seconds": round(duration, 3),
+                "nodes": {f"{db_type}_{role}": results[(db_type, role)][0]["connection_status"]
+                          for db_type, role in nodes},
+            })
+            logger.info(f"Metrics collection complete in {duration:.2f}s")
 
     except Exception as e:
+        CYCLES.labels("error").inc()
+        # The cycle's rows may have been rolled back: store the next samples afresh and
+        # count uptime again from what the status log holds
+        node_transitions.reset()
+        cluster_transitions.reset()
+        uptime_tracker.reset()
         logger.error(f"Error during metrics collection: {e}")
+    finally:
+        node_scheduler.release([node for node in claimed if node not in recorded])
+
+
+def apply_topology_change(old, new):
+    """Bring the schedule, connection pool and latest-state tables in line with a reloaded topology"""
+    old, new = owned_topology(old), owned_topology(new)
+    removed = [key for key in old.keys() if key not in new]
+    removed_clusters = [name for name in old.clusters if name not in new.clusters]
+    with collection_lock:
+        node_scheduler.sync(new.keys(), poll_intervals(new))
+        for key in removed:
+            node_pool.discard(*key)
+            latest_results.pop(key, None)
+            latest_uptimes.pop(key, None)
+            node_transitions.discard(key)
+        for name in removed_clusters:
+            cluster_transitions.discard(name)
+        with sqlite_writer.batch():
+            sqlite_writer.executemany(METRICS_DB_FILE, "DELETE FROM node_current WHERE db_type = ? AND role = ?",
+                                      removed)
+            sqlite_writer.executemany(METRICS_DB_FILE, "DELETE FROM cluster_current WHERE db_type = ?",
+                                      [(name,) for name in removed_clusters])
+    logger.info(f"Topology applied: {len(new.keys()) - len(old.keys()) + len(removed)} node(s) added, "
+                f"{len(removed)} removed")
+
+
+topology.on_change = apply_topology_change
+
+
+def poll_due_nodes():
+    """Scheduler tick: poll only the nodes whose adaptive interval has elapsed"""
+    if not shard_lock.held:     # standby: another instance is collecting for this shard
+        return
+    nodes = node_scheduler.claim_due()
+    if nodes:
+        poll_and_save_metrics(nodes)
+
+
+def scheduled_retention():
+    """Retention touches the shared files as a whole, so only the active shard-0 instance runs it"""
+    if COLLECTOR_SHARD_INDEX == 0 and shard_lock.held:
+        run_retention()
+
+
+def run_retention():
+    """Pack samples into compact chunks, then drop rows older than the retention policy
+    and reclaim the freed pages"""
+    # Packing first: raw rows are only purged once they are in a chunk
+    compaction = compact_metrics(sqlite_writer, METRICS_DB_FILE, int(time.time() - COMPACT_AFTER_HOURS * 3600),
+                                 chunk_seconds=COMPACT_CHUNK_HOURS * 3600)
+    raw_cutoff = (f"-{RAW_RETENTION_DAYS} days",)
+    plan = [
+        (METRICS_DB_FILE, "metrics", "id", "timestamp < datetime('now', ?)", raw_cutoff),
+        (METRICS_DB_FILE, "cluster_status", "id", "timestamp < datetime('now', ?)", raw_cutoff),
+        # Node rows of the cluster_status rows purged above
+        (METRICS_DB_FILE, "cluster_status_nodes", "cluster_status_id, role",
+         "cluster_status_id < (SELECT IFNULL(MIN(id), 9223372036854775807) FROM cluster_status)", ()),
+        (DB_LOG_FILE, "status_logs", "id", "timestamp < datetime('now', ?)", raw_cutoff),
+        (DB_LOG_FILE, "events", "id", "timestamp < datetime('now', ?)", (f"-{EVENTS_RETENTION_DAYS} days",)),
+        (METRICS_DB_FILE, "metric_chunks", "db_type, role, start_ts",
+         "end_ts < CAST(strftime('%s', 'now', ?) AS INTEGER)", (f"-{COMPACT_RETENTION_DAYS} days",)),
+    ]
+    for resolution, days in ROLLUP_RETENTION_DAYS.items():
+        cutoff = (resolution, f"-{days} days")
+        plan.append((METRICS_DB_FILE, "metrics_rollup", "resolution, bucket, db_type, role",
+                     "resolution = ? AND bucket < datetime('now', ?)", cutoff))
+        plan.append((METRICS_DB_FILE, "cluster_status_rollup", "resolution, bucket, db_type, status",
+                     "resolution = ? AND bucket < datetime('now', ?)", cutoff))
+    return {**apply_retention(sqlite_writer, plan, batch_size=RETENTION_BATCH_SIZE), "compaction": compaction}
 
 
 # ======================= Flask Routes =======================
 
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def observe_request(response):
+    # Labelled by the route pattern, not the path, so the number of series stays bounded
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    REQUEST_SECONDS.labels(request.method, route, str(response.status_code)).observe(
+        time.perf_counter() - g.request_started)
+    return response
+
+
+@app.route("/internal/metrics", methods=["GET"])
+def get_internal_metrics():
+    """The collector's own timings and counters, in Prometheus text format"""
+    return Response(render_instrumentation(), content_type=CONTENT_TYPE)
+
+
 @app.route("/metrics", methods=["GET"])
 def get_metrics():
-    init_logging_db()
-    pg_master_metrics, _, _ = get_db_metrics("postgres", "master", DB_CONFIG)
-    pg_slave1_metrics, _, _ = get_db_metrics("postgres", "slave1", DB_CONFIG)
-    pg_slave2_metrics, _, _ = get_db_metrics("postgres", "slave2", DB_CONFIG)
-    mysql_master_metrics, _, _ = get_db_metrics("mysql", "master", DB_CONFIG)
-    mysql_slave1_metrics, _, _ = get_db_metrics("mysql", "slave1", DB_CONFIG)
-    mysql_slave2_metrics, _, _ = get_db_metrics("mysql", "slave2", DB_CONFIG)
-
-    pg_cluster_status = get_status_summary(pg_master_metrics["connection_status"],
-                                           pg_slave1_metrics["connection_status"],
-                                           pg_slave2_metrics["connection_status"])
-    mysql_cluster_status = get_status_summary(mysql_master_metrics["connection_status"],
-                                              mysql_slave1_metrics["connection_status"],
-                                              mysql_slave2_metrics["connection_status"])
-
-    pg_master_uptime = calculate_uptime("postgres", "master")
-    pg_slave1_uptime = calculate_uptime("postgres", "slave1")
-    pg_slave2_uptime = calculate_uptime("postgres", "slave2")
-    mysql_master_uptime = calculate_uptime("mysql", "master")
-    mysql_slave1_uptime = calculate_uptime("mysql", "slave1")
-    mysql_slave2_uptime = calculate_uptime("mysql", "slave2")
-
-    response = {
-        "postgres_cluster": {
-            "status": pg_cluster_status,
-            "master_node": {**pg_master_metrics, **pg_master_uptime},
-            "slave1_node": {**pg_slave1_metrics, **pg_slave1_uptime},
-            "slave2_node": {**pg_slave2_metrics, **pg_slave2_uptime},
-        },
-        "mysql_cluster": {
-            "status": mysql_cluster_status,
-            "master_node": {**mysql_master_metrics, **mysql_master_uptime},
-            "slave1_node": {**mysql_slave1_metrics, **mysql_slave1_uptime},
-            "slave2_node": {**mysql_slave2_metrics, **mysql_slave2_uptime},
-        }
-    }
-    return jsonify(format_timestamps(response))
+    if not shard_lock.held:
+        # A standby must not probe or log statuses: serve the last snapshot it had, if any
+        cached = live_snapshot.peek()
+        if cached is None:
+            return jsonify({"status": "error", "message": "Standby collector: no live snapshot, "
+                                                          "query the active instance"}), 503
+        snapshot, meta = cached
+        return jsonify({**snapshot, "snapshot": {**meta, "stale": True}})
+    snapshot, meta = live_snapshot.get()
+    return jsonify({**snapshot, "snapshot": meta})
+
+
+@app.route("/events/stream", methods=["GET"])
+def stream_events():
+    """Server-Sent Events: `snapshot` (live cluster status) and `cycle` (new history rows)"""
+    return Response(events.stream(), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",  # no proxy buffering, frames must flush immediately
+    })
+
+
+@app.route("/events/status", methods=["GET"])
+def get_events_status():
+    return jsonify(events.status())
+
+
+@app.route("/scheduler/schedule", methods=["GET"])
+def get_schedule():
+    job = scheduler.get_job("metrics_collection")
+    return jsonify({
+        "running": scheduler.running,
+        "tick_seconds": POLL_TICK_SECONDS,
+        "next_tick_at": job.next_run_time.strftime("%Y-%m-%d %H:%M:%S") if job and job.next_run_time else None,
+        "cycle_in_progress": collection_lock.locked(),
+        "settings": node_scheduler.settings(),
+        "nodes": node_scheduler.schedule(),
+    })
+
+
+@app.route("/topology", methods=["GET"])
+def get_topology():
+    return jsonify({**topology.status(), "clusters": topology.current().describe(),
+                    "owned_clusters": list(owned_topology().clusters)})
+
+
+@app.route("/collector/status", methods=["GET"])
+def get_collector_status():
+    owned = owned_topology()
+    return jsonify({
+        "pid": os.getpid(),
+        "shard_index": COLLECTOR_SHARD_INDEX,
+        "shard_count": COLLECTOR_SHARD_COUNT,
+        "active": shard_lock.held,
+        **shard_lock.status(),
+        "owned_clusters": list(owned.clusters),
+        "owned_nodes": len(owned),
+        "probe_processes": probe_processes.status() if probe_processes else None,
+    })
+
+
+@app.route("/topology/reload", methods=["POST"])
+def reload_topology():
+    reloaded = topology.reload()
+    if topology.last_error and not reloaded:
+        return jsonify({"status": "error", "reloaded": False, **topology.status()}), 400
+    return jsonify({"status": "success", "reloaded": reloaded, **topology.status()})
+
+
+def history_export(table, records_key, filters):
+    """Shared body of the history routes: keyset-paged, streamed as json, ndjson or csv.
+
+    ?after_id=<id> continues after the last row of the previous page (rows are newest
+    first); ?limit caps the page. JSON responses end with next_after_id, NDJSON and
+    CSV clients take the id of the last row.
+    """
+    try:
+        hours = int(request.args.get("hours", 24))
+        if hours <= 0:
+            raise ValueError("hours must be positive")
+        after_id = int(request.args["after_id"]) if "after_id" in request.args else None
+        limit = int(request.args["limit"]) if "limit" in request.args else None
+        if limit is not None and limit <= 0:
+            raise ValueError("limit must be positive")
+    except ValueError as e:
+        return jsonify({"status": "error", "message": f"Invalid parameter: {e}"}), 400
+    export_format = request.args.get("format", "json")
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({"status": "error", "message": f"format must be one of {', '.join(EXPORT_FORMATS)}"}), 400
+
+    sql, params = history_query(table, hours, filters, after_id, limit)
+    columns, batches = open_rows(METRICS_DB_FILE, sql, params)
+    if table == "metrics":
+        # Samples already dropped from the raw table continue from the compact chunks
+        since = int(time.time()) - hours * 3600
+        batches = with_packed_rows(columns, batches, lambda before_id, remaining: packed_history(
+            METRICS_DB_FILE, columns, since, filters, before_id, remaining), after_id, limit)
+    envelope = {"time_range_hours": hours, "filters": filters, "after_id": after_id, "limit": limit}
+    headers = {}
+    if export_format == "csv":
+        headers["Content-Disposition"] = f"attachment; filename={table}_history.csv"
+    return Response(export_stream(export_format, columns, batches, records_key, envelope, limit),
+                    mimetype=MEDIA_TYPES[export_format], headers=headers)
 
 
 @app.route("/metrics/history", methods=["GET"])
 def get_metrics_history():
-    hours = int(request.args.get("hours", 24))
-    db_type = request.args.get("db_type")
-    role = request.args.get("role")
-
-    conn = sqlite3.connect(METRICS_DB_FILE)
-    cur = conn.cursor()
-    query = f"SELECT * FROM metrics WHERE timestamp >= datetime('now', '-{hours} hours')"
-    params = []
-    if db_type:
-        query += " AND db_type = ?"
-        params.append(db_type)
-    if role:
-        query += " AND role = ?"
-        params.append(role)
-    query += " ORDER BY timestamp DESC"
-    cur.execute(query, params)
-    columns = [desc[0] for desc in cur.description]
-    rows = cur.fetchall()
-    conn.close()
-
-    metrics_history = [dict(zip(columns, row)) for row in rows]
-    return jsonify(format_timestamps({
-        "total_records": len(metrics_history),
-        "time_range_hours": hours,
-        "filters": {"db_type": db_type, "role": role},
-        "metrics": metrics_history
-    }))
+    return history_export("metrics", "metrics", {
+        "db_type": request.args.get("db_type"),
+        "role": request.args.get("role"),
+    })
 
 
 @app.route("/cluster/history", methods=["GET"])
 def get_cluster_history():
-    hours = int(request.args.get("hours", 24))
-    db_type = request.args.get("db_type")
+    return history_export("cluster_status", "cluster_status_history", {
+        "db_type": request.args.get("db_type"),
+    })
+
+
+@app.route("/metrics/pool", methods=["GET"])
+def get_pool_status():
+    return jsonify({"nodes": node_pool.status()})
 
-    conn = sqlite3.connect(METRICS_DB_FILE)
-    cur = conn.cursor()
-    query = f"SELECT * FROM cluster_status WHERE timestamp >= datetime('now', '-{hours} hours')"
-    params = []
-    if db_type:
-        query += " AND db_type = ?"
-        params.append(db_type)
-    query += " ORDER BY timestamp DESC"
-    cur.execute(query, params)
-    columns = [desc[0] for desc in cur.description]
-    rows = cur.fetchall()
-    conn.close()
 
-    cluster_history = [dict(zip(columns, row)) for row in rows]
-    return jsonify(format_timestamps({
-        "total_records": len(cluster_history),
-        "time_range_hours": hours,
-        "filters": {"db_type": db_type},
-        "cluster_status_history": cluster_history
-    }))
+@app.route("/maintenance/retention", methods=["POST"])
+def manual_retention():
+    try:
+        return jsonify({"status": "success", **run_retention()})
+    except Exception as e:
+        logger.error(f"Retention run failed: {e}")
+        return jsonify({"status": "error", "message": f"Retention run failed: {str(e)}"}), 500
 
 
 @app.route("/metrics/collect", methods=["POST"])
 def manual_collect_metrics():
     try:
-        poll_and_save_metrics()
+        poll_and_save_metrics(node_scheduler.claim_all())
         return jsonify({
             "status": "success",
             "message": "Metrics collection completed successfully",
@@ -415,18 +793,58 @@ def manual_collect_metrics():
 
 # ======================= Scheduler =======================
 
+def acquire_shard_lock():
+    """Become the active collector of this shard if no other instance is"""
+    if not shard_lock.held and shard_lock.acquire():
+        logger.info(f"Active collector for shard {COLLECTOR_SHARD_INDEX} of {COLLECTOR_SHARD_COUNT}: "
+                    f"{len(owned_topology())} node(s)")
+
+
 def start_scheduler():
     init_logging_db()
     init_metrics_db()
 
-    # ⬇️ POLLING INTERVAL CONFIGURATION  
-    # For testing: run every 10 minutes  
-    # For production: change minutes=10 → hours=1 (or as needed)
+    acquire_shard_lock()
+    if not shard_lock.held:
+        logger.info(f"Standby: {COLLECTOR_LOCK_FILE} is held by pid {shard_lock.holder()}, "
+                    f"retrying every {COLLECTOR_LOCK_RETRY_SECONDS}s")
     scheduler.add_job(
-        func=poll_and_save_metrics,
-        trigger=IntervalTrigger(minutes=10),  # <-- change minutes=10 to hours=1 in production
+        func=acquire_shard_lock,
+        trigger=IntervalTrigger(seconds=COLLECTOR_LOCK_RETRY_SECONDS),
+        id='shard_lock',
+        name='Take over the shard lock when it is free',
+        max_instances=1,
+        coalesce=True,
+        replace_existing=True
+    )
+
+    # Ticks are cheap: each one polls only the nodes that are due (see AdaptiveScheduler)
+    scheduler.add_job(
+        func=poll_due_nodes,
+        trigger=IntervalTrigger(seconds=POLL_TICK_SECONDS),
         id='metrics_collection',
-        name='Collect DB metrics periodically',
+        name='Collect DB metrics on adaptive per-node intervals',
+        max_instances=1,
+        coalesce=True,
+        replace_existing=True
+    )
+    if TOPOLOGY_FILE:
+        scheduler.add_job(
+            func=topology.reload,
+            trigger=IntervalTrigger(seconds=TOPOLOGY_RELOAD_SECONDS),
+            id='topology_reload',
+            name='Reload the topology file when it changes',
+            max_instances=1,
+            coalesce=True,
+            replace_existing=True
+        )
+    scheduler.add_job(
+        func=scheduled_retention,
+        trigger=IntervalTrigger(hours=RETENTION_INTERVAL_HOURS),
+        id='retention',
+        name='Apply the retention policy',
+        max_instances=1,
+        coalesce=True,
         replace_existing=True
     )
 
@@ -437,5 +855,9 @@ def start_scheduler():
 # ======================= Main =======================
 
 if __name__ == "__main__":
-    start_scheduler()
-    app.run(host="0.0.0.0", port=5000, debug=True)
+    debug = os.getenv("FLASK_DEBUG", "1") == "1"
+    # With the debug reloader this module runs twice: in a watcher process and in the serving
+    # child (WERKZEUG_RUN_MAIN=true). Only the serving process may start the scheduler.
+    if not debug or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        start_scheduler()
+    app.run(host="0.0.0.0", port=5000, debug=debug)
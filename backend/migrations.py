@@ -0,0 +1,246 @@
+import time
+import logging
+
+from rollups import init_rollups
+from sample_store import init_sample_store, add_load_columns
+
+logger = logging.getLogger(__name__)
+
+
+def migrate(writer, db_file, migrations):
+    """Apply pending migrations in order; progress is tracked in PRAGMA user_version"""
+    current = writer.query(db_file, "PRAGMA user_version;")[0][0]
+    for version, description, apply in migrations:
+        if version <= current:
+            continue
+        if getattr(apply, "outside_transaction", False):
+            apply(writer, db_file)
+            writer.execute(db_file, f"PRAGMA user_version = {int(version)};")
+        else:
+            with writer.batch():
+                apply(writer, db_file)
+                writer.execute(db_file, f"PRAGMA user_version = {int(version)};")
+        logger.info(f"Migrated {db_file} to version {version}: {description}")
+
+
+def ensure_column(writer, db_file, table, column, definition):
+    """Add a column to an existing table created by an older schema"""
+    columns = [row[1] for row in writer.query(db_file, f"PRAGMA table_info({table})")]
+    if column not in columns:
+        writer.execute(db_file, f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+
+def outside_transaction(apply):
+    """Mark a migration step SQLite refuses inside a transaction, such as VACUUM"""
+    apply.outside_transaction = True
+    return apply
+
+
+@outside_transaction
+def enable_incremental_vacuum(writer, db_file):
+    """Switch a database to auto_vacuum=INCREMENTAL, so retention can release free pages in
+    small steps. Existing files need a one-off VACUUM: it runs here, at startup, before the
+    scheduler, instead of stalling the writer during a retention run."""
+    if writer.query(db_file, "PRAGMA auto_vacuum;")[0][0] == 2:
+        return
+    started = time.monotonic()
+    writer.execute(db_file, "PRAGMA auto_vacuum=INCREMENTAL;")
+    writer.execute(db_file, "VACUUM;")
+    logger.info(f"Enabled incremental vacuum on {db_file} in {time.monotonic() - started:.2f}s")
+
+
+def execute_all(*statements):
+    def apply(writer, db_file):
+        for statement in statements:
+            writer.execute(db_file, statement)
+    return apply
+
+
+# ======================= metrics.db =======================
+
+PROBE_LOAD_COLUMNS = [
+    ("connections", "INTEGER"),
+    ("active_connections", "INTEGER"),
+    ("max_connections", "INTEGER"),
+    ("transactions_per_second", "REAL"),
+    ("queries_per_second", "REAL"),
+    ("cache_hit_ratio", "REAL"),
+    ("wal_position", "TEXT"),
+    ("replication_lag_bytes", "INTEGER"),
+    ("long_running_queries", "INTEGER"),
+    ("longest_query_seconds", "REAL"),
+]
+
+
+def add_probe_load_columns(writer, db_file):
+    for column, definition in PROBE_LOAD_COLUMNS:
+        ensure_column(writer, db_file, "metrics", column, definition)
+    add_load_columns(writer, db_file)
+
+
+METRICS_MIGRATIONS = [
+    (1, "base schema", execute_all(
+        """
+        CREATE TABLE IF NOT EXISTS metrics (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            db_type TEXT NOT NULL,
+            role TEXT NOT NULL,
+            host TEXT,
+            port INTEGER,
+            connection_status TEXT NOT NULL,
+            cluster_version TEXT,
+            cluster_creation_timestamp TEXT,
+            replication_lag_seconds REAL,
+            replication_io_running TEXT,
+            replication_sql_running TEXT,
+            uptime_percentage REAL,
+            last_node_down_time TEXT
+        );
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS cluster_status (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            db_type TEXT NOT NULL,
+            status TEXT NOT NULL,
+            master_status TEXT,
+            slave1_status TEXT,
+            slave2_status TEXT
+        );
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_metrics_timestamp ON metrics(timestamp);",
+        "CREATE INDEX IF NOT EXISTS idx_cluster_timestamp ON cluster_status(timestamp);",
+    )),
+    (2, "probe latency column",
+     lambda writer, db_file: ensure_column(writer, db_file, "metrics", "probe_latency_ms", "REAL")),
+    (3, "rollup tables", init_rollups),
+    # Access paths of the dashboard API and the history routes:
+    #   range scans over all nodes      -> (timestamp, db_type, role, status, lag), covering
+    #   per-node / per-cluster filters  -> (db_type, role, timestamp) and (db_type, timestamp)
+    #   latest row per cluster          -> (db_type, id)
+    # idx_metrics_timestamp and the ad-hoc idx_metrics_db_role are prefixes of these.
+    (4, "composite and covering indexes", execute_all(
+        "DROP INDEX IF EXISTS idx_metrics_timestamp;",
+        "DROP INDEX IF EXISTS idx_metrics_db_role;",
+        """
+        CREATE INDEX IF NOT EXISTS idx_metrics_ts_cover
+        ON metrics(timestamp, db_type, role, connection_status, replication_lag_seconds);
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_metrics_node_ts ON metrics(db_type, role, timestamp);",
+        "CREATE INDEX IF NOT EXISTS idx_cluster_db_type_ts ON cluster_status(db_type, timestamp);",
+        "CREATE INDEX IF NOT EXISTS idx_cluster_db_type_id ON cluster_status(db_type, id);",
+        "ANALYZE;",
+    )),
+    # Latest state per cluster and per node, upserted by the collector every cycle so
+    # current-status lookups never touch the history tables
+    (5, "latest-state tables", execute_all(
+        """
+        CREATE TABLE IF NOT EXISTS cluster_current (
+            db_type TEXT PRIMARY KEY,
+            status TEXT NOT NULL,
+            master_status TEXT,
+            slave1_status TEXT,
+            slave2_status TEXT,
+            timestamp DATETIME NOT NULL
+        ) WITHOUT ROWID;
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS node_current (
+            db_type TEXT NOT NULL,
+            role TEXT NOT NULL,
+            host TEXT,
+            port INTEGER,
+            connection_status TEXT NOT NULL,
+            replication_lag_seconds REAL,
+            timestamp DATETIME NOT NULL,
+            PRIMARY KEY (db_type, role)
+        ) WITHOUT ROWID;
+        """,
+        """
+        INSERT OR REPLACE INTO cluster_current (db_type, status, master_status, slave1_status, slave2_status, timestamp)
+        SELECT db_type, status, master_status, slave1_status, slave2_status, timestamp
+        FROM cluster_status
+        WHERE id IN (SELECT MAX(id) FROM cluster_status GROUP BY db_type);
+        """,
+        """
+        INSERT OR REPLACE INTO node_current (db_type, role, host, port, connection_status, replication_lag_seconds, timestamp)
+        SELECT db_type, role, host, port, connection_status, replication_lag_seconds, timestamp
+        FROM metrics
+        WHERE id IN (SELECT MAX(id) FROM metrics GROUP BY db_type, role);
+        """,
+    )),
+    # Node statuses of each cluster_status row, one row per node, so clusters may have any
+    # number of replicas. The master/slave1/slave2 columns stay for older readers and hold
+    # the primary and the first two replicas.
+    (6, "per-node cluster status", execute_all(
+        """
+        CREATE TABLE IF NOT EXISTS cluster_status_nodes (
+            cluster_status_id INTEGER NOT NULL,
+            role TEXT NOT NULL,
+            status TEXT NOT NULL,
+            PRIMARY KEY (cluster_status_id, role)
+        ) WITHOUT ROWID;
+        """,
+        """
+        INSERT OR IGNORE INTO cluster_status_nodes (cluster_status_id, role, status)
+        SELECT id, 'master', master_status FROM cluster_status WHERE master_status IS NOT NULL
+        UNION ALL
+        SELECT id, 'slave1', slave1_status FROM cluster_status WHERE slave1_status IS NOT NULL
+        UNION ALL
+        SELECT id, 'slave2', slave2_status FROM cluster_status WHERE slave2_status IS NOT NULL;
+        """,
+    )),
+    # Compact chunks of node samples (sample_store.py), filled by compaction ahead of retention
+    (7, "compact sample chunks", init_sample_store),
+    # cluster_status keeps only changes and heartbeats (transition_log.py); kind says which
+    (8, "cluster status transitions",
+     lambda writer, db_file: ensure_column(writer, db_file, "cluster_status", "kind", "TEXT")),
+    # Load and replication figures of the extended probe (probes.py), packed like the others
+    (9, "probe load columns", add_probe_load_columns),
+    (10, "incremental auto-vacuum", enable_incremental_vacuum),
+]
+
+
+# ======================= db_log.sqlite =======================
+
+def add_status_transitions(writer, db_file):
+    ensure_column(writer, db_file, "status_logs", "kind", "TEXT")
+    writer.execute(db_file, "CREATE INDEX IF NOT EXISTS idx_status_logs_node ON status_logs(db_type, role, timestamp);")
+
+
+LOG_MIGRATIONS = [
+    (1, "base schema", execute_all(
+        """
+        CREATE TABLE IF NOT EXISTS status_logs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            db_type TEXT,
+            role TEXT,
+            host TEXT,
+            status TEXT
+        );
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_status_logs_timestamp ON status_logs(timestamp);",
+    )),
+    # Last outage per node (uptime warm-up) reads status = 'down' grouped by node
+    (2, "status index", execute_all(
+        "CREATE INDEX IF NOT EXISTS idx_status_logs_status ON status_logs(status, db_type, role, timestamp);",
+    )),
+    # Read by /api/historical-events, newest first within a time range
+    (3, "events table", execute_all(
+        """
+        CREATE TABLE IF NOT EXISTS events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            event TEXT NOT NULL,
+            severity TEXT NOT NULL,
+            timestamp TEXT NOT NULL
+        );
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_events_timestamp ON events(timestamp);",
+    )),
+    # status_logs keeps only changes and heartbeats (transition_log.py); kind says which,
+    # NULL for rows of every sample written before. The last row per node is read at startup.
+    (4, "status transitions", add_status_transitions),
+    (5, "incremental auto-vacuum", enable_incremental_vacuum),
+]
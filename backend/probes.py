@@ -0,0 +1,429 @@
+import os
+import time
+import atexit
+import datetime
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+import psycopg2
+import mysql.connector
+
+from db_pool import NodeConnectionPool
+from sharding import HashRing
+
+logger = logging.getLogger(__name__)
+
+
+# Seconds a statement has to run to be reported as a long-running query
+LONG_QUERY_SECONDS = float(os.getenv("PROBE_LONG_QUERY_SECONDS", 60))
+# Seconds before a node whose server refused the extended probe is offered it again
+LEGACY_RETRY_SECONDS = float(os.getenv("PROBE_LEGACY_RETRY_SECONDS", 3600))
+
+# ======================= Extended probes =======================
+# One statement per PostgreSQL probe and two per MySQL probe (status, then replication)
+# gather versions, load and replication figures in a single round trip each. Servers
+# that refuse them (too old, or no access to the statistics views) are probed with the
+# legacy per-value queries below.
+
+POSTGRES_PROBE_SQL = """
+    SELECT version(), pg_postmaster_start_time(), pg_is_in_recovery(),
+           activity.connections, activity.active, current_setting('max_connections')::int,
+           activity.long_running, activity.longest,
+           (SELECT sum(xact_commit + xact_rollback)::bigint FROM pg_stat_database),
+           (SELECT sum(blks_hit)::bigint FROM pg_stat_database),
+           (SELECT sum(blks_read)::bigint FROM pg_stat_database),
+           CASE WHEN pg_is_in_recovery() THEN pg_last_wal_receive_lsn()
+                ELSE pg_current_wal_lsn() END::text,
+           CASE WHEN pg_is_in_recovery()
+                THEN pg_wal_lsn_diff(pg_last_wal_receive_lsn(), pg_last_wal_replay_lsn())
+                ELSE (SELECT max(pg_wal_lsn_diff(pg_current_wal_lsn(), replay_lsn)) FROM pg_stat_replication)
+           END::bigint,
+           -- Everything received is replayed: not behind, however long the primary has been idle
+           CASE WHEN NOT pg_is_in_recovery() THEN NULL
+                WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+                ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END::float8
+    FROM (
+        SELECT count(*) AS connections,
+               count(*) FILTER (WHERE state = 'active' AND pid <> pg_backend_pid()) AS active,
+               count(*) FILTER (WHERE state = 'active' AND pid <> pg_backend_pid()
+                                AND now() - query_start >= make_interval(secs => %s)) AS long_running,
+               max(EXTRACT(EPOCH FROM now() - query_start))
+                   FILTER (WHERE state = 'active' AND pid <> pg_backend_pid())::float8 AS longest
+        FROM pg_stat_activity
+        WHERE backend_type = 'client backend'
+    ) AS activity
+"""
+
+MYSQL_STATUS = ("Uptime", "Threads_connected", "Threads_running", "Questions", "Com_commit",
+                "Com_rollback", "Innodb_buffer_pool_read_requests", "Innodb_buffer_pool_reads")
+
+MYSQL_PROBE_SQL = f"""
+    SELECT VERSION(), @@max_connections,
+           {", ".join(f"MAX(IF(VARIABLE_NAME = '{name}', VARIABLE_VALUE, NULL))" for name in MYSQL_STATUS)},
+           (SELECT COUNT(*) FROM performance_schema.threads
+            WHERE TYPE = 'FOREGROUND' AND PROCESSLIST_COMMAND = 'Query'
+              AND PROCESSLIST_ID <> CONNECTION_ID() AND PROCESSLIST_TIME >= {int(LONG_QUERY_SECONDS)}),
+           (SELECT MAX(PROCESSLIST_TIME) FROM performance_schema.threads
+            WHERE TYPE = 'FOREGROUND' AND PROCESSLIST_COMMAND = 'Query'
+              AND PROCESSLIST_ID <> CONNECTION_ID())
+    FROM performance_schema.global_status
+    WHERE VARIABLE_NAME IN ({", ".join(f"'{name}'" for name in MYSQL_STATUS)})
+"""
+
+
+class CounterRates:
+    """Per-second rates of a node's cumulative server counters between two probes.
+
+    Servers only expose totals since start-up (transactions, queries, buffer
+    reads), so a rate needs the previous probe's totals. A node is always
+    probed by the same process (see ProbeProcesses), which keeps them here.
+    A counter that went backwards (server restart) gives no rate this once.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._last = {}   # (cluster, role) -> (monotonic time, {counter: total})
+
+    def update(self, key, counters):
+        """{counter: per-second rate} since the previous probe; None where unknown"""
+        now = time.monotonic()
+        with self._lock:
+            previous = self._last.get(key)
+            self._last[key] = (now, counters)
+        rates = dict.fromkeys(counters)
+        if previous is None or now <= previous[0]:
+            return rates
+        for name, total in counters.items():
+            before = previous[1].get(name)
+            if total is not None and before is not None and total >= before:
+                rates[name] = (total - before) / (now - previous[0])
+        return rates
+
+    def discard(self, key):
+        with self._lock:
+            self._last.pop(key, None)
+
+
+_counter_rates = CounterRates()
+_legacy_nodes = {}   # (cluster, role) -> monotonic time the extended probe is tried again
+
+
+def hit_ratio(hits, misses):
+    total = (hits or 0) + (misses or 0)
+    return round(hits / total, 4) if hits is not None and total else None
+
+
+def record_load(node, metrics, transactions, queries, hits, misses):
+    """Rates and cache hit ratio from the node's counters; the ratio covers the interval
+    since the previous probe, or the time since server start on the first one"""
+    rates = _counter_rates.update((node.cluster, node.role), {
+        "transactions": transactions, "queries": queries, "hits": hits, "misses": misses})
+    for field, name in (("transactions_per_second", "transactions"), ("queries_per_second", "queries")):
+        metrics[field] = round(rates[name], 2) if rates[name] is not None else None
+    interval = hit_ratio(rates["hits"], rates["misses"])
+    metrics["cache_hit_ratio"] = interval if interval is not None else hit_ratio(hits, misses)
+
+
+def probe_postgres(conn, node, metrics):
+    with conn.cursor() as cur:
+        cur.execute(POSTGRES_PROBE_SQL, (LONG_QUERY_SECONDS,))
+        (version, started, in_recovery, connections, active, max_connections, long_running, longest,
+         transactions, hits, misses, wal_position, lag_bytes, lag) = cur.fetchone()
+    metrics["cluster_version"] = version
+    metrics["cluster_creation_timestamp"] = started.isoformat()
+    if not node.primary:
+        metrics["replication_lag_seconds"] = lag
+    metrics.update({
+        "connections": connections, "active_connections": active, "max_connections": max_connections,
+        "long_running_queries": long_running,
+        "longest_query_seconds": round(longest, 2) if longest is not None else None,
+        "wal_position": wal_position, "replication_lag_bytes": lag_bytes,
+    })
+    # PostgreSQL keeps no server-wide statement counter (that needs pg_stat_statements)
+    record_load(node, metrics, transactions, None, hits, misses)
+    return 1
+
+
+def _mysql_version(banner):
+    numbers = []
+    for part in banner.split("-", 1)[0].split(".")[:3]:
+        numbers.append(int(part) if part.isdigit() else 0)
+    return tuple(numbers)
+
+
+def _first(row, *names):
+    """Value of the first column present; MySQL 8.0.22+ renamed Master/Slave to Source/Replica"""
+    for name in names:
+        if name in row:
+            return row[name]
+    return None
+
+
+def _integer(value):
+    return int(value) if value is not None else None
+
+
+def probe_mysql(conn, node, metrics):
+    cur = conn.cursor()
+    try:
+        # No parameters: mysql-connector reads the session sql_mode before interpolating any
+        cur.execute(MYSQL_PROBE_SQL)
+        (version, max_connections, uptime, connected, running, questions, commits, rollbacks,
+         read_requests, disk_reads, long_running, longest) = cur.fetchone()
+        cur.close()
+        if isinstance(version, (bytes, bytearray)):
+            version = version.decode()
+        uptime, connected, running, questions, commits, rollbacks, read_requests, disk_reads = map(
+            _integer, (uptime, connected, running, questions, commits, rollbacks, read_requests, disk_reads))
+
+        metrics["cluster_version"] = version
+        if uptime is not None:
+            start_time = datetime.datetime.now() - datetime.timedelta(seconds=uptime)
+            metrics["cluster_creation_timestamp"] = start_time.isoformat() + "Z"
+        metrics.update({
+            "connections": connected, "max_connections": _integer(max_connections),
+            # Threads_running counts this probe's own thread
+            "active_connections": max(running - 1, 0) if running is not None else None,
+            "long_running_queries": _integer(long_running),
+            "longest_query_seconds": float(longest) if longest is not None else None,
+        })
+        transactions = commits + rollbacks if commits is not None and rollbacks is not None else None
+        hits = read_requests - disk_reads if read_requests is not None and disk_reads is not None else None
+        record_load(node, metrics, transactions, questions, hits, disk_reads)
+
+        server = _mysql_version(version)
+        if node.primary:
+            statement = "SHOW BINARY LOG STATUS" if server >= (8, 4) else "SHOW MASTER STATUS"
+        else:
+            statement = "SHOW REPLICA STATUS" if server >= (8, 0, 22) else "SHOW SLAVE STATUS"
+        cur = conn.cursor(dictionary=True)
+        cur.execute(statement)
+        row = cur.fetchone()
+        if row and node.primary:
+            metrics["wal_position"] = f"{row['File']}:{row['Position']}"
+        elif row:
+            metrics["replication_lag_seconds"] = _first(row, "Seconds_Behind_Source", "Seconds_Behind_Master")
+            metrics["replication_io_running"] = _first(row, "Replica_IO_Running", "Slave_IO_Running")
+            metrics["replication_sql_running"] = _first(row, "Replica_SQL_Running", "Slave_SQL_Running")
+            read_file = _first(row, "Source_Log_File", "Master_Log_File")
+            read_position = _integer(_first(row, "Read_Source_Log_Pos", "Read_Master_Log_Pos"))
+            exec_file = _first(row, "Relay_Source_Log_File", "Relay_Master_Log_File")
+            exec_position = _integer(_first(row, "Exec_Source_Log_Pos", "Exec_Master_Log_Pos"))
+            if read_file and read_position is not None:
+                metrics["wal_position"] = f"{read_file}:{read_position}"
+                # Bytes received but not yet applied; unknown while the two threads are in different files
+                if read_file == exec_file and exec_position is not None:
+                    metrics["replication_lag_bytes"] = max(read_position - exec_position, 0)
+        return 2
+    finally:
+        cur.close()
+
+
+# ======================= Legacy probes =======================
+
+def collect_postgres_metrics(conn, primary, metrics):
+    with conn.cursor() as cur:
+        cur.execute("SELECT version();")
+        metrics["cluster_version"] = cur.fetchone()[0]
+        cur.execute("SELECT pg_postmaster_start_time();")
+        metrics["cluster_creation_timestamp"] = cur.fetchone()[0].isoformat()
+        if not primary:
+            cur.execute("SELECT now() - pg_last_xact_replay_timestamp() AS replication_lag;")
+            lag = cur.fetchone()[0]
+            metrics["replication_lag_seconds"] = lag.total_seconds() if lag else None
+    return 3 if not primary else 2
+
+
+def collect_mysql_metrics(conn, primary, metrics):
+    cur = conn.cursor(dictionary=True)
+    try:
+        cur.execute("SELECT VERSION() AS version;")
+        row = cur.fetchone()
+        metrics["cluster_version"] = row["version"] if row else "N/A"
+        cur.execute("SHOW GLOBAL STATUS LIKE 'Uptime';")
+        row2 = cur.fetchone()
+        if row2 and "Value" in row2:
+            uptime_seconds = int(row2["Value"])
+            start_time = datetime.datetime.now() - datetime.timedelta(seconds=uptime_seconds)
+            metrics["cluster_creation_timestamp"] = start_time.isoformat() + "Z"
+        if not primary:
+            cur.execute("SHOW SLAVE STATUS;")
+            slave_status = cur.fetchone()
+            if slave_status:
+                metrics["replication_lag_seconds"] = slave_status.get("Seconds_Behind_Master", None)
+                metrics["replication_io_running"] = slave_status.get("Slave_IO_Running", None)
+                metrics["replication_sql_running"] = slave_status.get("Slave_SQL_Running", None)
+    finally:
+        cur.close()
+    return 3 if not primary else 2
+
+
+def collect_metrics(conn, node, metrics):
+    """Probe the node, extended if its server allows; returns the number of statements run"""
+    key = (node.cluster, node.role)
+    refused = 0
+    if time.monotonic() >= _legacy_nodes.get(key, 0):
+        probe = probe_postgres if node.engine == "postgres" else probe_mysql
+        try:
+            return probe(conn, node, metrics)
+        except (psycopg2.ProgrammingError, mysql.connector.ProgrammingError) as e:
+            # Unknown function or view, or no privilege on it: the connection itself is fine
+            logger.warning(f"Extended probe of {node.cluster} {node.role} refused ({str(e).strip()}), "
+                           f"using the legacy queries for {LEGACY_RETRY_SECONDS:.0f}s")
+            _legacy_nodes[key] = time.monotonic() + LEGACY_RETRY_SECONDS
+            _counter_rates.discard(key)
+            refused = 1
+    collect = collect_postgres_metrics if node.engine == "postgres" else collect_mysql_metrics
+    return refused + collect(conn, node.primary, metrics)
+
+
+def get_db_metrics(node, pool):
+    params = {"engine": node.engine, "host": node.host, "port": node.port, "user": node.user,
+              "password": node.password, "dbname": node.dbname}
+
+    metrics = {"connection_status": "down", "cluster_version": "N/A", "cluster_creation_timestamp": "N/A"}
+    started = time.monotonic()
+    # Set when the pool hands over a connection: everything before is connect (or pool) time
+    query_started = []
+
+    def run_queries(conn):
+        query_started.append(time.monotonic())
+        metrics["probe_statements"] = collect_metrics(conn, node, metrics)
+
+    try:
+        pool.run(node.cluster, node.role, params, run_queries)
+        metrics["connection_status"] = "up"
+
+    except Exception as e:
+        logger.error(f"Error connecting to {node.cluster} {node.role} at {node.host}:{node.port}: {e}")
+        metrics["connection_status"] = "down"
+
+    finished = time.monotonic()
+    metrics["probe_latency_ms"] = round((finished - started) * 1000, 2)
+    # Phase split for the collector's instrumentation; popped before results are stored
+    if query_started:
+        metrics["probe_phases"] = {"connect": query_started[-1] - started, "query": finished - query_started[-1]}
+    else:
+        metrics["probe_phases"] = {"connect": finished - started}
+    return metrics, node.host, node.port
+
+
+def down_result(node, deadline):
+    """Result recorded for a node whose probe did not finish"""
+    return ({
+        "connection_status": "down", "cluster_version": "N/A", "cluster_creation_timestamp": "N/A",
+        "probe_latency_ms": round(deadline * 1000, 2)
+    }, node.host, node.port)
+
+
+def probe_nodes(nodes, executor, pool, deadline):
+    """Probe topology nodes concurrently; nodes still running at the deadline are reported down.
+
+    Results are keyed by (cluster, role).
+    """
+    futures = {executor.submit(get_db_metrics, node, pool): node for node in nodes}
+    done, _ = wait(futures, timeout=deadline)
+
+    results = {}
+    for future, node in futures.items():
+        key = (node.cluster, node.role)
+        if future in done and future.exception() is None:
+            results[key] = future.result()
+            continue
+
+        if future in done:
+            logger.error(f"Probe of {node.cluster} {node.role} failed: {future.exception()}")
+        else:
+            logger.warning(f"Probe of {node.cluster} {node.role} at {node.host}:{node.port} "
+                           f"exceeded the {deadline}s cycle deadline")
+            future.cancel()
+        results[key] = down_result(node, deadline)
+    return results
+
+
+# ======================= Probe worker processes =======================
+
+# Set in each worker process by _init_worker
+_worker_pool = None
+_worker_executor = None
+
+
+def _init_worker(pool_settings, threads):
+    global _worker_pool, _worker_executor
+    logging.basicConfig(level=logging.INFO)
+    _worker_pool = NodeConnectionPool(**pool_settings)
+    atexit.register(_worker_pool.close_all)
+    _worker_executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="probe")
+
+
+def _probe_in_worker(nodes, deadline):
+    return probe_nodes(nodes, _worker_executor, _worker_pool, deadline)
+
+
+class ProbeProcesses:
+    """Spreads each cycle's probes over worker processes.
+
+    Nodes are assigned to workers on a consistent-hash ring, so a node is
+    always probed by the same process and its pooled connections are reused;
+    each worker probes its share with its own thread pool. Only results come
+    back: the calling process stays the single writer of the SQLite files.
+    Workers are spawned (not forked) on first use, so they never inherit the
+    collector's threads or open database handles.
+    """
+
+    def __init__(self, processes, pool_settings, threads_per_process):
+        self.ring = HashRing([f"worker-{i}" for i in range(processes)])
+        self._pool_settings = pool_settings
+        self._threads = threads_per_process
+        self._executors = {shard: self._start(shard) for shard in self.ring.shards}
+        self._assigned = {}
+        self.restarts = 0
+
+    def _start(self, shard):
+        return ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"),
+                                   initializer=_init_worker, initargs=(self._pool_settings, self._threads))
+
+    def _restart(self, shard):
+        """Replace a worker whose process died; a broken executor refuses all further work"""
+        logger.warning(f"Restarting probe worker {shard}")
+        self._executors[shard].shutdown(wait=False, cancel_futures=True)
+        self._executors[shard] = self._start(shard)
+        self.restarts += 1
+
+    def probe(self, nodes, deadline):
+        shards = self.ring.assign(nodes, key=lambda node: f"{node.cluster}/{node.role}")
+        self._assigned = {shard: len(shard_nodes) for shard, shard_nodes in shards.items()}
+        futures = {}
+        for shard, shard_nodes in shards.items():
+            try:
+                future = self._executors[shard].submit(_probe_in_worker, shard_nodes, deadline)
+            except BrokenProcessPool:
+                self._restart(shard)
+                future = self._executors[shard].submit(_probe_in_worker, shard_nodes, deadline)
+            futures[future] = (shard, shard_nodes)
+        # Workers enforce the deadline themselves; the margin covers pickling and process start-up
+        done, _ = wait(futures, timeout=deadline + 5)
+
+        results = {}
+        for future, (shard, shard_nodes) in futures.items():
+            if future in done and future.exception() is None:
+                results.update(future.result())
+                continue
+            reason = future.exception() if future in done else "no reply before the deadline"
+            logger.error(f"Probe worker {shard} failed for {len(shard_nodes)} node(s): {reason}")
+            if isinstance(reason, BrokenProcessPool):
+                self._restart(shard)
+            for node in shard_nodes:
+                results[(node.cluster, node.role)] = down_result(node, deadline)
+        return results
+
+    def status(self):
+        return {"processes": len(self._executors), "restarts": self.restarts,
+                "nodes_per_process": dict(sorted(self._assigned.items()))}
+
+    def shutdown(self):
+        for executor in self._executors.values():
+            executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,76 @@
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def database_size(writer, db_file):
+    """(bytes allocated, bytes on the freelist) for a database file"""
+    page_size = writer.query(db_file, "PRAGMA page_size;")[0][0]
+    page_count = writer.query(db_file, "PRAGMA page_count;")[0][0]
+    freelist = writer.query(db_file, "PRAGMA freelist_count;")[0][0]
+    return page_count * page_size, freelist * page_size
+
+
+def purge_in_batches(writer, db_file, table, keys, where, params, batch_size, pause):
+    """Delete matching rows at most batch_size at a time, releasing the writer between batches"""
+    statement = f"""
+        DELETE FROM {table} WHERE ({keys}) IN (
+            SELECT {keys} FROM {table} WHERE {where} LIMIT ?
+        )
+    """
+    deleted = 0
+    while True:
+        removed = writer.execute(db_file, statement, (*params, batch_size)).rowcount
+        deleted += removed
+        if removed < batch_size:
+            return deleted
+        time.sleep(pause)
+
+
+def incremental_vacuum(writer, db_file, pages_per_step, pause):
+    """Release free pages back to the filesystem in small steps"""
+    while writer.query(db_file, "PRAGMA freelist_count;")[0][0] > 0:
+        writer.query(db_file, f"PRAGMA incremental_vacuum({int(pages_per_step)});")
+        time.sleep(pause)
+
+
+def apply_retention(writer, plan, batch_size=5000, pause=0.05, vacuum_pages=1000):
+    """Run a retention plan and report what it removed and reclaimed.
+
+    ``plan`` is a list of ``(db_file, table, keys, where, params)`` entries:
+    rows of ``table`` matching ``where`` are deleted, identified by the
+    ``keys`` column list. Free pages are released with incremental vacuum;
+    the files are switched to auto_vacuum=INCREMENTAL by their migrations.
+    """
+    started = time.monotonic()
+    db_files = sorted({entry[0] for entry in plan})
+    size_before = {db_file: database_size(writer, db_file)[0] for db_file in db_files}
+
+    deleted = {}
+    for db_file, table, keys, where, params in plan:
+        deleted[table] = deleted.get(table, 0) + purge_in_batches(
+            writer, db_file, table, keys, where, params, batch_size, pause
+        )
+
+    files = {}
+    for db_file in db_files:
+        incremental_vacuum(writer, db_file, vacuum_pages, pause)
+        size_after = database_size(writer, db_file)[0]
+        files[db_file] = {
+            "size_before_bytes": size_before[db_file],
+            "size_after_bytes": size_after,
+            # Writes made by the collector during the run can grow the file; never below 0
+            "reclaimed_bytes": max(size_before[db_file] - size_after, 0),
+        }
+
+    report = {
+        "deleted_rows": deleted,
+        "files": files,
+        "duration_seconds": round(time.monotonic() - started, 3),
+    }
+    logger.info(
+        f"Retention removed {sum(deleted.values())} rows and reclaimed "
+        f"{sum(f['reclaimed_bytes'] for f in files.values())} bytes in {report['duration_seconds']}s"
+    )
+    return report
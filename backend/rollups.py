@@ -0,0 +1,140 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Every raw metrics/cluster_status row is also folded into 1-minute, 1-hour and
+# 1-day buckets, so the dashboard API aggregates a few pre-computed rows
+# instead of every raw sample in the requested range.
+# Resolution -> strftime format of the bucket start (UTC, like CURRENT_TIMESTAMP)
+ROLLUP_RESOLUTIONS = {
+    "1m": "%Y-%m-%d %H:%M:00",
+    "1h": "%Y-%m-%d %H:00:00",
+    "1d": "%Y-%m-%d 00:00:00",
+}
+
+ROLLUP_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS metrics_rollup (
+        resolution TEXT NOT NULL,
+        bucket DATETIME NOT NULL,
+        db_type TEXT NOT NULL,
+        role TEXT NOT NULL,
+        samples INTEGER NOT NULL,
+        up_count INTEGER NOT NULL,
+        lag_sum REAL NOT NULL DEFAULT 0,
+        lag_count INTEGER NOT NULL DEFAULT 0,
+        lag_max REAL,
+        uptime_sum REAL NOT NULL DEFAULT 0,
+        uptime_count INTEGER NOT NULL DEFAULT 0,
+        uptime_min REAL,
+        uptime_max REAL,
+        last_status TEXT,
+        last_timestamp DATETIME,
+        PRIMARY KEY (resolution, bucket, db_type, role)
+    ) WITHOUT ROWID;
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS cluster_status_rollup (
+        resolution TEXT NOT NULL,
+        bucket DATETIME NOT NULL,
+        db_type TEXT NOT NULL,
+        status TEXT NOT NULL,
+        status_count INTEGER NOT NULL,
+        PRIMARY KEY (resolution, bucket, db_type, status)
+    ) WITHOUT ROWID;
+    """,
+]
+
+UPSERT_METRICS_ROLLUP = """
+    INSERT INTO metrics_rollup (
+        resolution, bucket, db_type, role, samples, up_count, lag_sum, lag_count, lag_max,
+        uptime_sum, uptime_count, uptime_min, uptime_max, last_status, last_timestamp
+    ) VALUES (?, strftime(?, 'now'), ?, ?, 1, ?, COALESCE(?, 0), ?, ?, COALESCE(?, 0), ?, ?, ?, ?, CURRENT_TIMESTAMP)
+    ON CONFLICT (resolution, bucket, db_type, role) DO UPDATE SET
+        samples = samples + 1,
+        up_count = up_count + excluded.up_count,
+        lag_sum = lag_sum + excluded.lag_sum,
+        lag_count = lag_count + excluded.lag_count,
+        lag_max = MAX(COALESCE(lag_max, excluded.lag_max), COALESCE(excluded.lag_max, lag_max)),
+        uptime_sum = uptime_sum + excluded.uptime_sum,
+        uptime_count = uptime_count + excluded.uptime_count,
+        uptime_min = MIN(COALESCE(uptime_min, excluded.uptime_min), COALESCE(excluded.uptime_min, uptime_min)),
+        uptime_max = MAX(COALESCE(uptime_max, excluded.uptime_max), COALESCE(excluded.uptime_max, uptime_max)),
+        last_status = excluded.last_status,
+        last_timestamp = excluded.last_timestamp
+"""
+
+UPSERT_CLUSTER_ROLLUP = """
+    INSERT INTO cluster_status_rollup (resolution, bucket, db_type, status, status_count)
+    VALUES (?, strftime(?, 'now'), ?, ?, 1)
+    ON CONFLICT (resolution, bucket, db_type, status) DO UPDATE SET
+        status_count = status_count + 1
+"""
+
+BACKFILL_METRICS_ROLLUP = """
+    INSERT INTO metrics_rollup (
+        resolution, bucket, db_type, role, samples, up_count, lag_sum, lag_count, lag_max,
+        uptime_sum, uptime_count, uptime_min, uptime_max, last_status, last_timestamp
+    )
+    SELECT ?, g.bucket, g.db_type, g.role, g.samples, g.up_count, g.lag_sum, g.lag_count, g.lag_max,
+           g.uptime_sum, g.uptime_count, g.uptime_min, g.uptime_max, m.connection_status, m.timestamp
+    FROM (
+        SELECT strftime(?, timestamp) AS bucket, db_type, role,
+               COUNT(*) AS samples,
+               SUM(connection_status = 'up') AS up_count,
+               COALESCE(SUM(replication_lag_seconds), 0) AS lag_sum,
+               COUNT(replication_lag_seconds) AS lag_count,
+               MAX(replication_lag_seconds) AS lag_max,
+               COALESCE(SUM(uptime_percentage), 0) AS uptime_sum,
+               COUNT(uptime_percentage) AS uptime_count,
+               MIN(uptime_percentage) AS uptime_min,
+               MAX(uptime_percentage) AS uptime_max,
+               MAX(id) AS last_id
+        FROM metrics
+        GROUP BY bucket, db_type, role
+    ) AS g
+    JOIN metrics AS m ON m.id = g.last_id
+"""
+
+BACKFILL_CLUSTER_ROLLUP = """
+    INSERT INTO cluster_status_rollup (resolution, bucket, db_type, status, status_count)
+    SELECT ?, strftime(?, timestamp) AS bucket, db_type, status, COUNT(*)
+    FROM cluster_status
+    GROUP BY bucket, db_type, status
+"""
+
+
+def init_rollups(writer, db_file):
+    """Create the rollup tables and, the first time, backfill them from the raw history"""
+    for statement in ROLLUP_SCHEMA:
+        writer.execute(db_file, statement)
+
+    if not writer.query(db_file, "SELECT 1 FROM metrics_rollup LIMIT 1"):
+        for resolution, fmt in ROLLUP_RESOLUTIONS.items():
+            writer.execute(db_file, BACKFILL_METRICS_ROLLUP, (resolution, fmt))
+        logger.info("Backfilled metrics_rollup from raw metrics")
+    if not writer.query(db_file, "SELECT 1 FROM cluster_status_rollup LIMIT 1"):
+        for resolution, fmt in ROLLUP_RESOLUTIONS.items():
+            writer.execute(db_file, BACKFILL_CLUSTER_ROLLUP, (resolution, fmt))
+        logger.info("Backfilled cluster_status_rollup from raw cluster_status")
+
+
+def record_metric_rollups(writer, db_file, db_type, role, connection_status, lag_seconds, uptime_percentage):
+    """Fold one metrics sample into every rollup resolution"""
+    is_up = 1 if connection_status == "up" else 0
+    writer.executemany(db_file, UPSERT_METRICS_ROLLUP, [
+        (
+            resolution, fmt, db_type, role, is_up,
+            lag_seconds, 0 if lag_seconds is None else 1, lag_seconds,
+            uptime_percentage, 0 if uptime_percentage is None else 1, uptime_percentage, uptime_percentage,
+            connection_status,
+        )
+        for resolution, fmt in ROLLUP_RESOLUTIONS.items()
+    ])
+
+
+def record_cluster_rollups(writer, db_file, db_type, status):
+    """Fold one cluster_status sample into every rollup resolution"""
+    writer.executemany(db_file, UPSERT_CLUSTER_ROLLUP, [
+        (resolution, fmt, db_type, status) for resolution, fmt in ROLLUP_RESOLUTIONS.items()
+    ])
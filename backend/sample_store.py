@@ -0,0 +1,310 @@
+import json
+import zlib
+import array
+import logging
+import sqlite3
+import itertools
+from pathlib import Path
+
+from uptime_tracker import to_epoch, to_timestamp
+
+logger = logging.getLogger(__name__)
+
+# Compact storage for node samples. Rows of `metrics` are packed into chunks, one per
+# node per window (a day by default), with one BLOB per column so a read decodes only the columns it
+# needs, a whole chunk at a time:
+#   delta  NOT NULL integers (id, epoch timestamp) as zlib'd deltas; a regular polling
+#          interval compresses to a few bytes per chunk
+#   int    nullable integers as a zlib'd int64 array
+#   float  nullable floats as a zlib'd float64 array, NaN for NULL
+#   dict   repeated strings (version banner, host, status) as ids into sample_strings
+#   text   high-cardinality strings (MySQL start times drift by a second per probe) as
+#          zlib'd JSON, which still collapses their shared prefixes
+METRIC_COLUMNS = [
+    ("id", "delta"),
+    ("timestamp", "delta"),
+    ("host", "dict"),
+    ("port", "int"),
+    ("connection_status", "dict"),
+    ("cluster_version", "dict"),
+    ("cluster_creation_timestamp", "text"),
+    ("replication_lag_seconds", "float"),
+    ("replication_io_running", "dict"),
+    ("replication_sql_running", "dict"),
+    ("uptime_percentage", "float"),
+    ("last_node_down_time", "text"),
+    ("probe_latency_ms", "float"),
+    ("connections", "int"),
+    ("active_connections", "int"),
+    ("max_connections", "int"),
+    ("transactions_per_second", "float"),
+    ("queries_per_second", "float"),
+    ("cache_hit_ratio", "float"),
+    ("wal_position", "text"),
+    ("replication_lag_bytes", "int"),
+    ("long_running_queries", "int"),
+    ("longest_query_seconds", "float"),
+]
+CODECS = dict(METRIC_COLUMNS)
+# Probe load columns (metrics migration 9); chunks packed before it hold NULL for them
+LOAD_COLUMNS = [column for column, _ in METRIC_COLUMNS[METRIC_COLUMNS.index(("connections", "int")):]]
+
+# Bump when a codec changes; chunks keep the encoding they were written with
+ENCODING_VERSION = 1
+
+INT_NULL = -(2 ** 63)
+
+STRINGS_SQL = "SELECT id, value FROM sample_strings"
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS sample_strings (
+        id INTEGER PRIMARY KEY,
+        value TEXT NOT NULL UNIQUE
+    );
+    """,
+    f"""
+    CREATE TABLE IF NOT EXISTS metric_chunks (
+        db_type TEXT NOT NULL,
+        role TEXT NOT NULL,
+        start_ts INTEGER NOT NULL,
+        end_ts INTEGER NOT NULL,
+        first_id INTEGER NOT NULL,
+        last_id INTEGER NOT NULL,
+        samples INTEGER NOT NULL,
+        encoding INTEGER NOT NULL,
+        {", ".join(f"{column} BLOB" for column, _ in METRIC_COLUMNS)},
+        PRIMARY KEY (db_type, role, start_ts)
+    ) WITHOUT ROWID;
+    """,
+    # Range reads across all nodes, newest window first
+    "CREATE INDEX IF NOT EXISTS idx_metric_chunks_start ON metric_chunks(start_ts, end_ts);",
+]
+
+
+def init_sample_store(writer, db_file):
+    for statement in SCHEMA:
+        writer.execute(db_file, statement)
+
+
+def add_load_columns(writer, db_file):
+    """BLOB columns for the probe load columns in metric_chunks created by an older schema"""
+    columns = [row[1] for row in writer.query(db_file, "PRAGMA table_info(metric_chunks)")]
+    for column in LOAD_COLUMNS:
+        if column not in columns:
+            writer.execute(db_file, f"ALTER TABLE metric_chunks ADD COLUMN {column} BLOB")
+
+
+# ======================= Codecs =======================
+
+def encode_column(codec, values, string_ids=None):
+    if codec == "delta":
+        deltas, previous = array.array("q"), 0
+        for value in values:
+            deltas.append(value - previous)
+            previous = value
+        return zlib.compress(deltas.tobytes())
+    if codec == "int":
+        return zlib.compress(array.array("q", [INT_NULL if v is None else v for v in values]).tobytes())
+    if codec == "float":
+        return zlib.compress(array.array("d", [float("nan") if v is None else v for v in values]).tobytes())
+    if codec == "dict":
+        return zlib.compress(array.array("I", [0 if v is None else string_ids[v] for v in values]).tobytes())
+    if codec == "text":
+        return zlib.compress(json.dumps(values).encode())
+    raise ValueError(f"Unknown codec: {codec}")
+
+
+def decode_column(codec, blob, strings=None, samples=0):
+    """One column of a chunk as a list; float columns come back as array('d') with NaN for NULL.
+
+    A NULL blob (a column added after the chunk was packed) decodes to ``samples`` NULLs.
+    """
+    if blob is None:
+        return array.array("d", [float("nan")]) * samples if codec == "float" else [None] * samples
+    raw = zlib.decompress(blob)
+    if codec == "delta":
+        values, total = array.array("q"), 0
+        values.frombytes(raw)
+        for i, delta in enumerate(values):
+            total += delta
+            values[i] = total
+        return values.tolist()
+    if codec == "int":
+        values = array.array("q")
+        values.frombytes(raw)
+        return [None if v == INT_NULL else v for v in values]
+    if codec == "float":
+        values = array.array("d")
+        values.frombytes(raw)
+        return values
+    if codec == "dict":
+        values = array.array("I")
+        values.frombytes(raw)
+        return [strings[v] if v else None for v in values]
+    if codec == "text":
+        return json.loads(raw)
+    raise ValueError(f"Unknown codec: {codec}")
+
+
+def nullable(values):
+    """A decoded float column as a list with None for NULL"""
+    return [None if v != v else v for v in values]
+
+
+# ======================= Compaction (collector, through the writer) =======================
+
+def _string_ids(writer, db_file, values):
+    """Ids of the given strings in sample_strings, adding the missing ones"""
+    values = sorted({v for v in values if v is not None})
+    writer.executemany(db_file, "INSERT OR IGNORE INTO sample_strings (value) VALUES (?)", [(v,) for v in values])
+    ids = {}
+    for start in range(0, len(values), 500):
+        part = values[start:start + 500]
+        ids.update(writer.query(db_file, f"SELECT value, id FROM sample_strings WHERE value IN "
+                                         f"({', '.join('?' * len(part))})", part))
+    return ids
+
+
+def _write_chunk(writer, db_file, db_type, role, start_ts, rows):
+    """Encode rows (dicts ordered by id) into the chunk, merging with one already stored"""
+    existing = writer.query(db_file, f"""
+        SELECT samples, {", ".join(column for column, _ in METRIC_COLUMNS)} FROM metric_chunks
+        WHERE db_type = ? AND role = ? AND start_ts = ?
+    """, (db_type, role, start_ts))
+    if existing:
+        strings = dict(writer.query(db_file, STRINGS_SQL))
+        stored = _decode_rows(existing[0][1:], [column for column, _ in METRIC_COLUMNS], strings, existing[0][0])
+        known = {row["id"] for row in stored}
+        rows = stored + [row for row in rows if row["id"] not in known]
+        rows.sort(key=lambda row: row["id"])
+
+    dict_values = [row[column] for row in rows for column, codec in METRIC_COLUMNS if codec == "dict"]
+    string_ids = _string_ids(writer, db_file, dict_values)
+    blobs = [encode_column(codec, [row[column] for row in rows], string_ids) for column, codec in METRIC_COLUMNS]
+    writer.execute(db_file, f"""
+        INSERT OR REPLACE INTO metric_chunks (
+            db_type, role, start_ts, end_ts, first_id, last_id, samples, encoding,
+            {", ".join(column for column, _ in METRIC_COLUMNS)}
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, {", ".join("?" * len(METRIC_COLUMNS))})
+    """, (db_type, role, start_ts, rows[-1]["timestamp"], rows[0]["id"], rows[-1]["id"], len(rows),
+          ENCODING_VERSION, *blobs))
+
+
+def compact_metrics(writer, db_file, before_epoch, chunk_seconds=86400):
+    """Pack raw metrics rows of every whole chunk window before ``before_epoch`` into chunks.
+
+    Resumes after the highest id already packed and commits one window at a
+    time. The raw rows stay in place: retention removes them once they are
+    older than RAW_RETENTION_DAYS, by which time they are long packed.
+    """
+    cutoff = before_epoch - before_epoch % chunk_seconds
+    watermark = writer.query(db_file, "SELECT IFNULL(MAX(last_id), 0) FROM metric_chunks")[0][0]
+    oldest = writer.query(db_file, "SELECT MIN(timestamp) FROM metrics WHERE id > ?", (watermark,))[0][0]
+    report = {"chunks": 0, "samples": 0}
+    if oldest is None:
+        return report
+
+    select = ", ".join(["db_type", "role"] + [column for column, _ in METRIC_COLUMNS])
+    window = to_epoch(oldest) - to_epoch(oldest) % chunk_seconds
+    while window < cutoff:
+        rows = writer.query(db_file, f"""
+            SELECT {select} FROM metrics
+            WHERE timestamp >= ? AND timestamp < ? AND id > ?
+            ORDER BY db_type, role, id
+        """, (to_timestamp(window), to_timestamp(window + chunk_seconds), watermark))
+        nodes = {}
+        for db_type, role, *values in rows:
+            row = dict(zip(CODECS, values))
+            row["timestamp"] = to_epoch(row["timestamp"])
+            nodes.setdefault((db_type, role), []).append(row)
+        with writer.batch():
+            for (db_type, role), node_rows in nodes.items():
+                _write_chunk(writer, db_file, db_type, role, window, node_rows)
+        report["chunks"] += len(nodes)
+        report["samples"] += len(rows)
+        window += chunk_seconds
+    logger.info(f"Packed {report['samples']} metrics rows into {report['chunks']} chunks")
+    return report
+
+
+# ======================= Range reads (read-only connections) =======================
+
+def _decode_rows(blobs, columns, strings, samples):
+    decoded = [decode_column(CODECS[column], blob, strings, samples) for column, blob in zip(columns, blobs)]
+    decoded = [nullable(values) if CODECS[column] == "float" else values
+               for column, values in zip(columns, decoded)]
+    return [dict(zip(columns, values)) for values in zip(*decoded)]
+
+
+def open_store(db_file):
+    """Read-only connection for range reads, like the history export's"""
+    return sqlite3.connect(f"{Path(db_file).resolve().as_uri()}?mode=ro", uri=True, check_same_thread=False)
+
+
+def read_chunks(conn, columns, since_epoch=None, until_epoch=None, db_type=None, role=None, before_id=None):
+    """Yield (db_type, role, start_ts, {column: values}) per chunk overlapping the range,
+    newest window first.
+
+    Each requested column is bulk-decoded as a whole (float columns as
+    array('d') with NaN for NULL); rows outside the range are not trimmed,
+    use the "timestamp" column (epoch seconds) for that.
+    """
+    columns = list(columns)
+    sql = f"SELECT db_type, role, start_ts, samples, {', '.join(columns)} FROM metric_chunks WHERE 1 = 1"
+    params = []
+    for condition, value in (("end_ts >= ?", since_epoch), ("start_ts <= ?", until_epoch),
+                             ("db_type = ?", db_type), ("role = ?", role), ("first_id < ?", before_id)):
+        if value is not None:
+            sql += f" AND {condition}"
+            params.append(value)
+    sql += " ORDER BY start_ts DESC, db_type, role"
+    strings = None
+    for chunk_db_type, chunk_role, start_ts, samples, *blobs in conn.execute(sql, params):
+        if strings is None and any(CODECS[column] == "dict" for column in columns):
+            strings = dict(conn.execute(STRINGS_SQL))
+        yield chunk_db_type, chunk_role, start_ts, {column: decode_column(CODECS[column], blob, strings, samples)
+                                                    for column, blob in zip(columns, blobs)}
+
+
+def history_rows(conn, columns, since_epoch, filters, before_id=None, limit=None):
+    """Packed samples as rows in ``columns`` order (the metrics table's), newest id first.
+
+    The chunks of one window hold interleaved ids, so rows are ordered a window at a time.
+    """
+    packed = [column for column, _ in METRIC_COLUMNS]
+    id_index = columns.index("id")
+    chunks = read_chunks(conn, packed, since_epoch=since_epoch, db_type=filters.get("db_type") or None,
+                         role=filters.get("role") or None, before_id=before_id)
+    count = 0
+    for _, window in itertools.groupby(chunks, key=lambda chunk: chunk[2]):
+        rows = []
+        for db_type, role, _, values in window:
+            ids, stamps = values["id"], values["timestamp"]
+            keep = [(before_id is None or sample_id < before_id) and stamp >= since_epoch
+                    for sample_id, stamp in zip(ids, stamps)]
+            constants = {"db_type": db_type, "role": role}
+            series = []
+            for column in columns:
+                if column == "timestamp":
+                    series.append(map(to_timestamp, stamps))
+                elif column in CODECS:
+                    series.append(nullable(values[column]) if CODECS[column] == "float" else values[column])
+                else:
+                    series.append(itertools.repeat(constants.get(column)))
+            rows.extend(itertools.compress(zip(*series), keep))
+        rows.sort(key=lambda row: row[id_index], reverse=True)
+        for row in rows:
+            yield row
+            count += 1
+            if limit is not None and count >= limit:
+                return
+
+
+def packed_history(db_file, columns, since_epoch, filters, before_id=None, limit=None):
+    """history_rows on its own read-only connection, closed when the rows are exhausted"""
+    conn = open_store(db_file)
+    try:
+        yield from history_rows(conn, columns, since_epoch, filters, before_id, limit)
+    finally:
+        conn.close()
@@ -0,0 +1,109 @@
+import json
+import math
+import uuid
+import decimal
+import datetime
+import dataclasses
+from json.encoder import encode_basestring
+from flask.json.provider import DefaultJSONProvider
+
+from shared.json_backend import orjson, msgspec, JSON_BACKEND, finite
+
+
+def _default(obj):
+    """Types the encoders do not all handle natively; datetimes come out as ISO 8601 everywhere"""
+    if isinstance(obj, (datetime.date, datetime.time)):
+        return obj.isoformat()
+    if isinstance(obj, (decimal.Decimal, uuid.UUID)):
+        return str(obj)
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return dataclasses.asdict(obj)
+    if hasattr(obj, "__html__"):
+        return str(obj.__html__())
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj, sort_keys=False, indent=None):
+    """Encode obj to UTF-8 JSON bytes with the configured backend"""
+    if JSON_BACKEND == "orjson":
+        option = orjson.OPT_NON_STR_KEYS
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=_default, option=option)
+    if JSON_BACKEND == "msgspec":
+        encoded = msgspec.json.encode(obj, enc_hook=_default, order="sorted" if sort_keys else None)
+        return msgspec.json.format(encoded, indent=indent) if indent else encoded
+    options = {"sort_keys": sort_keys, "indent": indent, "ensure_ascii": False, "allow_nan": False,
+               "separators": (", ", ": ") if indent else (",", ":")}
+    try:
+        return json.dumps(obj, default=_default, **options).encode()
+    except ValueError:
+        # NaN or Infinity somewhere: null, as the other backends write them
+        return json.dumps(finite(obj), default=lambda value: finite(_default(value)), **options).encode()
+
+
+class RowEncoder:
+    """Encodes database row tuples as JSON objects for one fixed column list.
+
+    Rows go straight from cursor tuples to bytes, a batch at a time. The fast
+    backends encode the whole batch in one call; the stdlib fallback splices
+    pre-encoded keys with per-type value encoding instead of building and
+    re-walking a dict per row.
+    """
+
+    def __init__(self, columns):
+        self.columns = list(columns)
+        self._keys = [encode_basestring(column) + ":" for column in self.columns]
+
+    def objects(self, rows):
+        """Comma-separated objects (no brackets), ready to go inside a JSON array"""
+        if not rows:
+            return b""
+        if JSON_BACKEND != "stdlib":
+            return dumps([dict(zip(self.columns, row)) for row in rows])[1:-1]
+        return ",".join(self._object(row) for row in rows).encode()
+
+    def lines(self, rows):
+        """One object per line (NDJSON), each line newline-terminated"""
+        if not rows:
+            return b""
+        if JSON_BACKEND != "stdlib":
+            return b"".join(dumps(dict(zip(self.columns, row))) + b"\n" for row in rows)
+        return "".join(self._object(row) + "\n" for row in rows).encode()
+
+    def _object(self, row):
+        return "{" + ",".join([key + _encode_value(value) for key, value in zip(self._keys, row)]) + "}"
+
+
+def _encode_value(value):
+    # SQLite only hands back None, int, float, str and bytes
+    if value is None:
+        return "null"
+    if isinstance(value, str):
+        return encode_basestring(value)
+    if isinstance(value, float):
+        return float.__repr__(value) if math.isfinite(value) else "null"
+    if isinstance(value, int):
+        return int.__repr__(value)
+    return json.dumps(value, default=_default)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider (jsonify, app.json) backed by the configured JSON backend.
+
+    Keeps Flask's conventions: sorted keys and indented output in debug mode.
+    Datetimes are encoded as ISO 8601 rather than HTTP dates; the routes
+    format their timestamps before returning them.
+    """
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return dumps(obj, sort_keys=self.sort_keys).decode()
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = 2 if self.compact is False or (self.compact is None and self._app.debug) else None
+        return self._app.response_class(dumps(obj, sort_keys=self.sort_keys, indent=indent), mimetype=self.mimetype)
@@ -0,0 +1,97 @@
+import os
+import bisect
+import fcntl
+import hashlib
+import datetime
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+def _hash(value):
+    return int.from_bytes(hashlib.md5(value.encode()).digest()[:8], "big")
+
+
+class HashRing:
+    """Consistent hashing of keys onto shards.
+
+    Every shard owns ``vnodes`` points on the ring and a key belongs to the
+    first point at or after its hash, so adding or removing a shard moves only
+    about 1/N of the keys instead of reshuffling all of them.
+    """
+
+    def __init__(self, shards, vnodes=64):
+        self.shards = list(shards)
+        self._ring = sorted((_hash(f"{shard}#{i}"), shard) for shard in self.shards for i in range(vnodes))
+        self._points = [point for point, _ in self._ring]
+
+    def owner(self, key):
+        index = bisect.bisect(self._points, _hash(key)) % len(self._ring)
+        return self._ring[index][1]
+
+    def assign(self, items, key=str):
+        """{shard: [item]} for the items, hashed by key(item); shards without items are left out"""
+        shards = {}
+        for item in items:
+            shards.setdefault(self.owner(key(item)), []).append(item)
+        return shards
+
+
+class ShardLock:
+    """Exclusive lock file marking the one active collector of a shard.
+
+    Uses flock, so the lock belongs to the open file and the kernel releases
+    it when the holder exits or crashes; a standby instance that keeps calling
+    ``acquire`` takes over on its next attempt. The holder's pid is written to
+    the file for diagnostics.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._fd = None
+        self.acquired_at = None
+
+    @property
+    def held(self):
+        return self._fd is not None
+
+    def acquire(self):
+        """Take the lock if it is free; True while this process holds it"""
+        with self._lock:
+            if self._fd is not None:
+                return True
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                os.close(fd)
+                return False
+            os.ftruncate(fd, 0)
+            os.write(fd, f"{os.getpid()}\n".encode())
+            self._fd = fd
+            self.acquired_at = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        logger.info(f"Acquired collector lock {self.path} (pid {os.getpid()})")
+        return True
+
+    def release(self):
+        with self._lock:
+            if self._fd is None:
+                return
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+            self.acquired_at = None
+
+    def holder(self):
+        """Pid recorded by the current (or last) holder, if any"""
+        try:
+            with open(self.path) as f:
+                return int(f.read().strip() or 0) or None
+        except (OSError, ValueError):
+            return None
+
+    def status(self):
+        return {"lock_file": self.path, "held": self.held, "acquired_at": self.acquired_at,
+                "holder_pid": self.holder()}
@@ -0,0 +1,113 @@
+import time
+import datetime
+import logging
+import threading
+
+from shared.instrumentation import Counter
+
+logger = logging.getLogger(__name__)
+
+LOOKUPS = Counter("monitor_snapshot_cache_lookups_total",
+                  "Live snapshot lookups: hit (fresh), shared (waited for a refresh in flight) "
+                  "or miss (ran the loader)", ["result"])
+
+
+class SnapshotCache:
+    """Latest live snapshot of the clusters, refreshed at most once per TTL.
+
+    Requests that find the snapshot expired share a single refresh
+    (single-flight): one caller runs the loader while the others wait for its
+    result instead of probing the databases themselves. ``on_update`` is
+    called with ``(snapshot, metadata)`` after every new snapshot.
+    """
+
+    def __init__(self, loader, ttl, wait_timeout=30, on_update=None):
+        self._loader = loader
+        self.ttl = ttl
+        self.wait_timeout = wait_timeout
+        self.on_update = on_update
+        self._cond = threading.Condition()
+        self._value = None
+        self._taken_at = None       # wall clock, reported to clients
+        self._taken_mono = None     # monotonic clock, used for expiry
+        self._refreshing = False
+
+    def get(self):
+        """Return (snapshot, metadata), refreshing first if the snapshot has expired"""
+        with self._cond:
+            if self._is_fresh():
+                LOOKUPS.labels("hit").inc()
+                return self._result()
+        return self.refresh(only_if_expired=True)
+
+    def refresh(self, only_if_expired=False):
+        """Run the loader, or wait for a refresh that is already in flight"""
+        with self._cond:
+            if only_if_expired and self._is_fresh():
+                LOOKUPS.labels("hit").inc()
+                return self._result()
+            if self._refreshing:
+                LOOKUPS.labels("shared").inc()
+                self._cond.wait_for(lambda: not self._refreshing, timeout=self.wait_timeout)
+                if self._value is None:
+                    raise RuntimeError("Live snapshot is not available yet")
+                return self._result()
+            self._refreshing = True
+            LOOKUPS.labels("miss").inc()
+
+        try:
+            value = self._loader()
+        except Exception:
+            with self._cond:
+                self._refreshing = False
+                self._cond.notify_all()
+                if self._value is None:
+                    raise
+                logger.exception("Snapshot refresh failed, serving the previous snapshot")
+                return self._result()
+
+        with self._cond:
+            self._store(value)
+            self._refreshing = False
+            self._cond.notify_all()
+            result = self._result()
+        self._notify(result)
+        return result
+
+    def peek(self):
+        """(snapshot, metadata) as it is, without refreshing; None before the first snapshot"""
+        with self._cond:
+            return self._result() if self._value is not None else None
+
+    def set(self, value):
+        """Replace the snapshot with one produced elsewhere (e.g. a scheduled poll cycle)"""
+        with self._cond:
+            self._store(value)
+            self._cond.notify_all()
+            result = self._result()
+        self._notify(result)
+
+    def _notify(self, result):
+        if self.on_update is None:
+            return
+        try:
+            self.on_update(*result)
+        except Exception:
+            logger.exception("Snapshot update callback failed")
+
+    def _store(self, value):
+        self._value = value
+        self._taken_at = datetime.datetime.now()
+        self._taken_mono = time.monotonic()
+
+    def _is_fresh(self):
+        return self._value is not None and time.monotonic() - self._taken_mono < self.ttl
+
+    def _result(self):
+        age = time.monotonic() - self._taken_mono
+        return self._value, {
+            "taken_at": self._taken_at.strftime("%Y-%m-%d %H:%M:%S"),
+            "age_seconds": round(age, 2),
+            "ttl_seconds": self.ttl,
+            "stale": age >= self.ttl,
+        }
@@ -0,0 +1,115 @@
+import os
+import time
+import logging
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from shared.instrumentation import Histogram
+
+logger = logging.getLogger(__name__)
+
+WRITE_SECONDS = Histogram("monitor_sqlite_write_seconds",
+                          "Time spent in SQLite write statements and commits, by database file",
+                          ["db", "operation"])
+
+
+class SQLiteWriter:
+    """Single long-lived writer for the collector's SQLite files.
+
+    One connection per database file is opened on first use in WAL mode and
+    kept for the life of the process. Every write goes through one re-entrant
+    lock, so the scheduler thread and Flask request threads can share the
+    writer. Inside ``batch()`` all writes, across files, are grouped into one
+    transaction per file and committed together when the block exits.
+    """
+
+    def __init__(self, synchronous="NORMAL", busy_timeout_ms=5000):
+        self.synchronous = synchronous
+        self.busy_timeout_ms = busy_timeout_ms
+        self._lock = threading.RLock()
+        self._conns = {}
+        self._batch_depth = 0
+        self._in_transaction = set()
+
+    def execute(self, db_file, sql, params=()):
+        """Run one write statement and return its cursor (for lastrowid / rowcount)"""
+        with self._lock:
+            started = time.perf_counter()
+            cursor = self._begin(db_file).execute(sql, params)
+            self._observe(db_file, "execute", started)
+            return cursor
+
+    def executemany(self, db_file, sql, seq_of_params):
+        with self._lock:
+            started = time.perf_counter()
+            self._begin(db_file).executemany(sql, seq_of_params)
+            self._observe(db_file, "executemany", started)
+
+    def query(self, db_file, sql, params=()):
+        """Read through the writer connection, e.g. for schema checks"""
+        with self._lock:
+            return self._connection(db_file).execute(sql, params).fetchall()
+
+    @contextmanager
+    def batch(self):
+        """Group every write made in the block into one transaction per file"""
+        with self._lock:
+            self._batch_depth += 1
+            try:
+                yield self
+            except Exception:
+                if self._batch_depth == 1:
+                    self._finish("ROLLBACK")
+                raise
+            else:
+                if self._batch_depth == 1:
+                    self._finish("COMMIT")
+            finally:
+                self._batch_depth -= 1
+
+    def close(self):
+        with self._lock:
+            for conn in self._conns.values():
+                conn.close()
+            self._conns.clear()
+            self._in_transaction.clear()
+
+    def _connection(self, db_file):
+        conn = self._conns.get(db_file)
+        if conn is None:
+            # isolation_level=None: transactions are managed explicitly by batch()
+            conn = sqlite3.connect(db_file, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL;")
+            conn.execute(f"PRAGMA synchronous={self.synchronous};")
+            conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)};")
+            self._conns[db_file] = conn
+        return conn
+
+    def _begin(self, db_file):
+        conn = self._connection(db_file)
+        if self._batch_depth and db_file not in self._in_transaction:
+            conn.execute("BEGIN IMMEDIATE;")
+            self._in_transaction.add(db_file)
+        return conn
+
+    @staticmethod
+    def _observe(db_file, operation, started):
+        WRITE_SECONDS.labels(os.path.basename(db_file), operation).observe(time.perf_counter() - started)
+
+    def _finish(self, statement):
+        error = None
+        for db_file in list(self._in_transaction):
+            conn = self._conns[db_file]
+            started = time.perf_counter()
+            try:
+                conn.execute(f"{statement};")
+                self._observe(db_file, statement.lower(), started)
+            except sqlite3.Error as e:
+                logger.error(f"{statement} failed on {db_file}: {e}")
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK;")
+                error = error or e
+        self._in_transaction.clear()
+        if error is not None and statement == "COMMIT":
+            raise error
@@ -0,0 +1,226 @@
+import os
+import json
+import datetime
+import logging
+import threading
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+ENGINES = {"postgres": 5432, "mysql": 3306}   # supported engines and their default ports
+PRIMARY_ROLES = ("master", "primary")
+
+# One monitored database server. `cluster` is the name stored in the db_type
+# columns of the history tables; for the default topology it equals the engine.
+Node = namedtuple("Node", "cluster engine role host port user password dbname primary poll_interval")
+
+
+class Topology:
+    """Clusters and their nodes, primary first, in file order"""
+
+    def __init__(self, clusters):
+        self.clusters = clusters    # cluster name -> {"engine": ..., "nodes": [Node]}
+        self._nodes = {(node.cluster, node.role): node for cluster in clusters.values() for node in cluster["nodes"]}
+
+    def keys(self):
+        """(cluster, role) of every node, the identity used across the collector"""
+        return list(self._nodes)
+
+    def node(self, key):
+        return self._nodes[key]
+
+    def __contains__(self, key):
+        return key in self._nodes
+
+    def __len__(self):
+        return len(self._nodes)
+
+    def subset(self, names):
+        """The topology restricted to the named clusters"""
+        return Topology({name: self.clusters[name] for name in names})
+
+    def roles(self, cluster):
+        return [node.role for node in self.clusters[cluster]["nodes"]]
+
+    def primary(self, cluster):
+        return self.clusters[cluster]["nodes"][0]
+
+    def describe(self):
+        """The topology without credentials"""
+        return [{
+            "cluster": name,
+            "engine": cluster["engine"],
+            "nodes": [{
+                "role": node.role, "host": node.host, "port": node.port,
+                "primary": node.primary, "poll_interval_seconds": node.poll_interval,
+            } for node in cluster["nodes"]],
+        } for name, cluster in self.clusters.items()]
+
+
+def _secret(spec, field):
+    """A credential given inline ("password") or by environment variable ("password_env")"""
+    if f"{field}_env" in spec:
+        return os.getenv(spec[f"{field}_env"])
+    return spec.get(field)
+
+
+def _poll_interval(where, value):
+    """poll_interval_seconds as given, if it is a positive number (None leaves the default)"""
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not 0 < value < float("inf"):
+        raise ValueError(f"{where}: poll_interval_seconds must be a positive number, got {value!r}")
+    return value
+
+
+def _port(where, value):
+    if isinstance(value, bool) or not str(value).strip().isdigit() or not 0 < int(value) < 65536:
+        raise ValueError(f"{where}: port must be a number between 1 and 65535, got {value!r}")
+    return int(value)
+
+
+def build_topology(spec):
+    """Validate a topology document and build a Topology; raises ValueError on a bad document.
+
+    Connection settings (user, password, dbname, poll_interval_seconds) given
+    on a cluster apply to every node that does not set its own.
+    """
+    if not isinstance(spec, dict):
+        raise ValueError("the topology must be a JSON object")
+    clusters = {}
+    for cluster_spec in spec.get("clusters", []):
+        if not isinstance(cluster_spec, dict):
+            raise ValueError("every cluster must be a JSON object")
+        name = cluster_spec.get("name")
+        engine = cluster_spec.get("engine", name)
+        if not name:
+            raise ValueError("every cluster needs a name")
+        if name in clusters:
+            raise ValueError(f"cluster {name!r} is defined twice")
+        if engine not in ENGINES:
+            raise ValueError(f"cluster {name!r}: unsupported engine {engine!r}")
+        _poll_interval(f"cluster {name!r}", cluster_spec.get("poll_interval_seconds"))
+
+        nodes = []
+        for node_spec in cluster_spec.get("nodes", []):
+            if not isinstance(node_spec, dict):
+                raise ValueError(f"cluster {name!r}: every node must be a JSON object")
+            role = node_spec.get("role")
+            if not role or not node_spec.get("host"):
+                raise ValueError(f"cluster {name!r}: every node needs a role and a host")
+            if any(node.role == role for node in nodes):
+                raise ValueError(f"cluster {name!r}: role {role!r} is defined twice")
+            merged = {**cluster_spec, **node_spec}
+            where = f"cluster {name!r} node {role!r}"
+            nodes.append(Node(
+                cluster=name, engine=engine, role=role,
+                host=node_spec["host"], port=_port(where, node_spec.get("port", ENGINES[engine])),
+                user=_secret(merged, "user"), password=_secret(merged, "password"), dbname=merged.get("dbname"),
+                primary=bool(node_spec.get("primary", role in PRIMARY_ROLES)),
+                poll_interval=_poll_interval(where, merged.get("poll_interval_seconds")),
+            ))
+
+        primaries = [node for node in nodes if node.primary]
+        if len(primaries) != 1:
+            raise ValueError(f"cluster {name!r} needs exactly one primary node, found {len(primaries)}")
+        clusters[name] = {"engine": engine, "nodes": primaries + [node for node in nodes if not node.primary]}
+
+    if not clusters:
+        raise ValueError("the topology defines no clusters")
+    return Topology(clusters)
+
+
+def topology_from_db_config(db_config):
+    """The classic three-node postgres and mysql clusters described by db_config.py"""
+    def node(prefix, role):
+        slot = f"{prefix}_{role.upper()}"
+        return {
+            "role": role, "host": db_config[f"{slot}_IP"], "port": db_config[f"{slot}_PORT"],
+            # slave2 has its own credentials and database in db_config.py; the others share the cluster's
+            "user": db_config.get(f"{slot}_USER", db_config[f"{prefix}_USER"]),
+            "password": db_config.get(f"{slot}_PASS", db_config[f"{prefix}_PASS"]),
+            "dbname": db_config.get(f"{slot}_DB_NAME", db_config[f"{prefix}_DB_NAME"]),
+        }
+
+    return build_topology({"clusters": [
+        {"name": engine, "engine": engine, "nodes": [node(prefix, role) for role in ("master", "slave1", "slave2")]}
+        for engine, prefix in (("postgres", "PG"), ("mysql", "MYSQL"))
+    ]})
+
+
+class TopologyRegistry:
+    """The current topology, loaded from a JSON file and hot-reloaded when it changes.
+
+    Without a file the topology comes from db_config.py. A file that fails to
+    parse or validate is reported and ignored; the last good topology stays
+    in force, and at startup, when there is none yet, the db_config.py one is used. ``on_change(old, new)`` is called after every successful reload
+    that changed the file.
+    """
+
+    def __init__(self, path, db_config, on_change=None):
+        self.path = path
+        self.on_change = on_change
+        self._lock = threading.Lock()
+        self._signature = self._file_signature() if path else None
+        self._loaded_at = None
+        self.last_error = None
+        self._topology = None
+        if path:
+            try:
+                self._topology = self._load()
+            except (OSError, ValueError) as e:
+                self.last_error = str(e)
+                logger.error(f"Starting with the db_config.py topology, {self.path} is invalid: {e}")
+        if self._topology is None:
+            self._topology = topology_from_db_config(db_config)
+
+    def current(self):
+        return self._topology
+
+    def reload(self):
+        """Re-read the file if it changed since the last load; True if the topology was replaced"""
+        if not self.path:
+            return False
+        with self._lock:
+            signature = self._file_signature()
+            if signature == self._signature:
+                return False
+            # Remember the signature even if the file is bad, so one bad edit is reported once
+            self._signature = signature
+            try:
+                old, new = self._topology, self._load()
+            except (OSError, ValueError) as e:
+                self.last_error = str(e)
+                logger.error(f"Keeping the current topology, {self.path} is invalid: {e}")
+                return False
+            self._topology = new
+        logger.info(f"Reloaded topology from {self.path}: {len(new.clusters)} clusters, {len(new)} nodes")
+        if self.on_change:
+            self.on_change(old, new)
+        return True
+
+    def status(self):
+        return {
+            "source": self.path if self._loaded_at else "db_config.py",
+            "loaded_at": self._loaded_at,
+            "last_error": self.last_error,
+            "clusters": len(self._topology.clusters),
+            "nodes": len(self._topology),
+        }
+
+    def _file_signature(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _load(self):
+        with open(self.path, encoding="utf-8") as f:
+            try:
+                topology = build_topology(json.load(f))
+            except json.JSONDecodeError as e:
+                raise ValueError(f"not valid JSON ({e})")
+        self._loaded_at = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.last_error = None
+        return topology
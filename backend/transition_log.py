@@ -0,0 +1,71 @@
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Kinds of stored rows
+CHANGE = "change"          # the state differs from the last stored one
+HEARTBEAT = "heartbeat"    # unchanged for heartbeat_seconds: the collector was still watching
+START = "start"            # first sample of this process; the state before it is unknown
+
+# Severity of the events row written when a cluster's status changes
+CLUSTER_SEVERITY = {"healthy": "info", "degraded": "warning", "critical": "critical"}
+
+
+class TransitionLog:
+    """Decides which state samples are stored: changes, plus heartbeat checkpoints.
+
+    Between two stored rows of a key its state is the earlier row's, so
+    timelines and uptime are rebuilt as intervals from a handful of rows
+    instead of one row per poll. The last stored state of every key is loaded
+    once through ``loader`` (returns ``{key: state}``), so a change across a
+    collector restart is still recognised as one.
+    """
+
+    def __init__(self, heartbeat_seconds, loader=None):
+        self.heartbeat_seconds = heartbeat_seconds
+        self._loader = loader
+        self._lock = threading.Lock()
+        self._last = {}        # key -> [state, epoch of its last stored row]
+        self._stored = {}      # key -> state stored by an earlier process
+        self._loaded = loader is None
+
+    def check(self, key, state, epoch=None):
+        """(kind, previous state) when this sample has to be stored, (None, state) when not"""
+        epoch = time.time() if epoch is None else epoch
+        with self._lock:
+            self._ensure_loaded()
+            last = self._last.get(key)
+            if last is None:
+                previous = self._stored.pop(key, None)
+                kind = CHANGE if previous is not None and previous != state else START
+            elif last[0] != state:
+                previous, kind = last[0], CHANGE
+            elif epoch - last[1] >= self.heartbeat_seconds:
+                previous, kind = state, HEARTBEAT
+            else:
+                return None, state
+            self._last[key] = [state, epoch]
+            return kind, previous
+
+    def discard(self, key):
+        with self._lock:
+            self._last.pop(key, None)
+            self._stored.pop(key, None)
+
+    def reset(self):
+        """Forget what was stored, e.g. after a rolled-back write; reloaded on the next check"""
+        with self._lock:
+            self._last.clear()
+            self._stored.clear()
+            self._loaded = self._loader is None
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            self._stored = dict(self._loader())
+        except Exception as e:
+            logger.error(f"Could not load the last stored states: {e}")
@@ -0,0 +1,152 @@
+import time
+import calendar
+import itertools
+import logging
+import threading
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# Time-based uptime windows, in seconds
+UPTIME_WINDOWS = {"1h": 3600, "24h": 86400, "7d": 7 * 86400}
+
+
+def to_epoch(timestamp):
+    """Parse a SQLite CURRENT_TIMESTAMP string (UTC) into epoch seconds"""
+    return calendar.timegm(time.strptime(timestamp, "%Y-%m-%d %H:%M:%S"))
+
+
+def to_timestamp(epoch):
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(epoch))
+
+
+class _NodeUptime:
+    """A node's recent history as runs of one state: [start, end, is_up], oldest first"""
+
+    def __init__(self):
+        self.runs = deque()
+        self.last_sample = None     # (epoch, is_up) of the newest sample
+        self.last_down = None
+
+    def add(self, epoch, is_up, max_gap, keep_seconds):
+        # The previous sample's state held until this one, but for at most max_gap
+        if self.last_sample is not None:
+            previous_epoch, previous_up = self.last_sample
+            end = min(epoch, previous_epoch + max_gap)
+            if end > previous_epoch:
+                last = self.runs[-1] if self.runs else None
+                if last is not None and last[2] == previous_up and last[1] == previous_epoch:
+                    last[1] = end
+                else:
+                    self.runs.append([previous_epoch, end, previous_up])
+        self.last_sample = (epoch, is_up)
+        if not is_up:
+            self.last_down = epoch
+        while self.runs and self.runs[0][1] <= epoch - keep_seconds:
+            self.runs.popleft()
+
+    def seconds(self, since, now, max_gap):
+        """(up seconds, observed seconds) from since to now, the newest sample's state included"""
+        up = total = 0
+        spans = reversed(self.runs)
+        if self.last_sample is not None:
+            epoch, is_up = self.last_sample
+            spans = itertools.chain([(epoch, min(now, epoch + max_gap), is_up)], spans)
+        for start, end, is_up in spans:
+            if end <= since:
+                break
+            held = end - max(start, since)
+            if held > 0:
+                total += held
+                up += held if is_up else 0
+        return up, total
+
+
+class UptimeTracker:
+    """Per-node uptime over time windows, weighted by how long each state lasted.
+
+    Every status sample extends the node's current run of one state (runs of
+    the same state merge), so reads cost one step per state change in the
+    window, not one per sample. A sample's state counts until the next sample,
+    but for at most ``max_gap`` seconds; longer gaps are time nobody watched and
+    count for neither. The tracker is warmed once from the status log through
+    ``loader``, which returns ``(samples, last_down)``: samples as
+    ``(timestamp, db_type, role, status)`` rows in insertion order (the log
+    stores only changes and heartbeats, which rebuild the same runs),
+    last_down as ``{(db_type, role): timestamp}``.
+    """
+
+    def __init__(self, loader=None, windows=UPTIME_WINDOWS, max_gap=3600):
+        self._loader = loader
+        self._windows = windows
+        self.max_gap = max_gap
+        self._keep_seconds = max(windows.values())
+        self._lock = threading.Lock()
+        self._nodes = {}
+        self._loaded = loader is None
+
+    def history_seconds(self):
+        """How far back the loader has to reach: the longest window plus one gap before it"""
+        return self._keep_seconds + self.max_gap
+
+    def record(self, db_type, role, status, epoch=None):
+        epoch = time.time() if epoch is None else epoch
+        with self._lock:
+            self._ensure_loaded()
+            self._add(db_type, role, status, epoch)
+
+    def reset(self):
+        """Forget the counted samples, e.g. after a rolled-back write; rewarmed on the next use"""
+        with self._lock:
+            self._nodes.clear()
+            self._loaded = self._loader is None
+
+    def uptime_data(self, db_type, role, window):
+        """Uptime for one node in the shape calculate_uptime has always returned"""
+        now = time.time()
+        with self._lock:
+            self._ensure_loaded()
+            node = self._nodes.get((db_type, role))
+            if node is None:
+                return {"uptime_percentage": "No data", "last_node_down_time": "No data", "uptime_windows": {}}
+            windows = {}
+            for name, seconds in self._windows.items():
+                up, total = node.seconds(now - seconds, now, self.max_gap)
+                if total:
+                    windows[name] = f"{(up / total) * 100:.2f}%"
+                elif node.last_sample is not None and node.last_sample[0] >= now - seconds:
+                    # A single sample so far: its state is all there is
+                    windows[name] = f"{node.last_sample[1] * 100:.2f}%"
+                else:
+                    windows[name] = "No data"
+            last_down = node.last_down
+        return {
+            "uptime_percentage": windows.get(window, "No data"),
+            "last_node_down_time": to_timestamp(last_down) if last_down is not None else "Never",
+            "uptime_windows": windows,
+        }
+
+    def _node(self, db_type, role):
+        node = self._nodes.get((db_type, role))
+        if node is None:
+            node = self._nodes[(db_type, role)] = _NodeUptime()
+        return node
+
+    def _add(self, db_type, role, status, epoch):
+        self._node(db_type, role).add(epoch, 1 if status == "up" else 0, self.max_gap, self._keep_seconds)
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            samples, last_down = self._loader()
+        except Exception as e:
+            logger.error(f"Could not warm uptime counters from the status log: {e}")
+            return
+        for timestamp, db_type, role, status in samples:
+            self._add(db_type, role, status, to_epoch(timestamp))
+        for (db_type, role), timestamp in last_down.items():
+            node = self._node(db_type, role)
+            node.last_down = max(node.last_down or 0, to_epoch(timestamp))
+        logger.info(f"Uptime counters warmed from {len(samples)} status log rows")
@@ -0,0 +1,121 @@
+"""Micro-benchmarks on generated history.
+
+Times the collector's calculate_uptime (cold warm-up from status_logs and
+steady-state calls) and format_timestamps on a /metrics snapshot, every
+dashboard endpoint query (queries.ENDPOINT_QUERIES) at its representative
+range and over the whole generated history, and the NumPy analytics
+(analytics.py) over the whole history.
+
+    python benchmarks/bench_micro.py [--nodes 6] [--days 90] [--data-dir DIR]
+
+Without --data-dir a fresh data set is generated in a temporary directory.
+"""
+import os
+import sys
+import time
+import sqlite3
+import argparse
+import tempfile
+from pathlib import Path
+
+import harness
+from generate_data import generate
+
+sys.path.insert(0, os.path.join(harness.ROOT, "frontend"))
+from queries import ENDPOINT_QUERIES  # noqa: E402
+from analytics import read_nodes, availability, outage_intervals, lag_percentiles  # noqa: E402
+
+
+def bench_collector(data_dir, rows):
+    m = harness.load_collector(data_dir)
+    nodes = sqlite3.connect(m.METRICS_DB_FILE).execute("SELECT db_type, role FROM node_current").fetchall()
+
+    started = time.perf_counter()
+    m.calculate_uptime(*nodes[0])       # first call warms the counters from status_logs
+    rows.append(("calculate_uptime (warm-up)", "", time.perf_counter() - started, None))
+    best, median, _ = harness.measure(lambda: [m.calculate_uptime(*node) for node in nodes], number=100)
+    rows.append((f"calculate_uptime x{len(nodes)} nodes", "", best, median))
+
+    uptimes = {node: m.calculate_uptime(*node) for node in nodes}
+    snapshot = {}
+    for db_type, role in nodes:
+        snapshot.setdefault(f"{db_type}_cluster", {"status": "healthy", "nodes": []})
+        snapshot[f"{db_type}_cluster"]["nodes"].append(role)
+        snapshot[f"{db_type}_cluster"][f"{role}_node"] = {
+            "connection_status": "up", "cluster_version": "PostgreSQL 16.4 on x86_64-pc-linux-gnu",
+            "cluster_creation_timestamp": "2025-01-01T00:00:00+00:00", "replication_lag_seconds": 0.4,
+            "probe_latency_ms": 4.2, **uptimes[(db_type, role)],
+        }
+    best, median, _ = harness.measure(lambda: m.format_timestamps(snapshot), number=100)
+    rows.append((f"format_timestamps (/metrics, {len(nodes)} nodes)", "", best, median))
+
+
+def widen(params, days):
+    """The representative parameters with the time range replaced by the whole history"""
+    return tuple(f"-{days + 1} days" if isinstance(p, str) and p.startswith("-") and "day" in p else p
+                 for p in params)
+
+
+def bench_queries(data_dir, days, rows):
+    files = {"metrics": os.path.join(data_dir, "metrics.db"), "log": os.path.join(data_dir, "db_log.sqlite")}
+    conns = {}
+    for name, path in files.items():
+        # Opened like the dashboard's ReadOnlyPool
+        conn = sqlite3.connect(f"{Path(path).resolve().as_uri()}?mode=ro", uri=True)
+        conn.row_factory = sqlite3.Row
+        conns[name] = conn
+    for endpoint, (database, sql, params) in ENDPOINT_QUERIES.items():
+        variants = [("default", params)]
+        if widen(params, days) != params:
+            variants.append((f"{days}d", widen(params, days)))
+        for label, values in variants:
+            best, median, result = harness.measure(lambda: conns[database].execute(sql, values).fetchall())
+            rows.append((f"{endpoint} [{label}]", len(result), best, median))
+    for conn in conns.values():
+        conn.close()
+
+
+def bench_analytics(data_dir, days, rows):
+    conn = sqlite3.connect(f"{Path(data_dir, 'metrics.db').resolve().as_uri()}?mode=ro", uri=True)
+    offset = f"-{days + 1} days"
+    cases = [
+        ("availability", lambda e, up, lag, since, until: availability(e, up, since, until, 3600)),
+        ("outages", lambda e, up, lag, since, until: outage_intervals(e, up, until)),
+        ("lag percentiles", lambda e, up, lag, since, until: lag_percentiles(e, lag, until, 3600)),
+        ("load series only", lambda e, up, lag, since, until: len(e)),
+    ]
+    for name, compute in cases:
+        best, median, result = harness.measure(lambda: read_nodes(conn, offset, compute))
+        rows.append((f"analytics {name} [{days}d, {len(result)} nodes]", "", best, median))
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--nodes", type=int, default=6)
+    parser.add_argument("--replicas", type=int, default=2)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--interval", type=int, default=600)
+    parser.add_argument("--data-dir", default=None, help="use data generated earlier by generate_data.py")
+    args = parser.parse_args()
+
+    data_dir = args.data_dir
+    if data_dir is None:
+        data_dir = tempfile.mkdtemp(prefix="bench_micro_")
+        print(f"Generating {args.days} days for {args.nodes} nodes in {data_dir} ...")
+        _, _, counts = generate(data_dir, args.nodes, args.replicas, args.days, args.interval)
+        print("  " + ", ".join(f"{count} {table}" for table, count in counts.items()))
+
+    rows = []
+    bench_collector(os.path.abspath(data_dir), rows)
+    bench_queries(data_dir, args.days, rows)
+    bench_analytics(data_dir, args.days, rows)
+
+    print(f"\n{'case':58} {'rows':>7} {'best':>10} {'median':>10}")
+    for case, count, best, median in rows:
+        print(f"{case:58} {count:>7} {harness.format_seconds(best):>10} {harness.format_seconds(median):>10}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,78 @@
+"""Cost of one node probe: the extended probe against the legacy per-value queries.
+
+Probes every node of a fake fleet (fake_databases.py) with a fixed query
+latency through a warm connection pool, once with the extended statements
+and once with the servers refusing them (the legacy fallback), and reports
+statements and wall time per probe by engine and role.
+
+    python benchmarks/bench_probe.py [--clusters 2] [--replicas 2] [--latency-ms 5] [--repeat 20]
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+from collections import defaultdict
+
+import harness
+from fake_databases import FakeFleet
+
+sys.path.insert(0, os.path.join(harness.ROOT, "backend"))
+import probes  # noqa: E402
+from db_pool import NodeConnectionPool  # noqa: E402
+from topology import Node  # noqa: E402
+
+
+def fleet_nodes(fleet):
+    return [Node(name, engine, role, fleet.host, port, "bench", "bench", "bench", role == "master", None)
+            for name, engine, nodes in fleet.clusters for role, _, port in nodes]
+
+
+def run(fleet, extended, repeat):
+    """{(engine, primary): ([statements], [seconds])} over ``repeat`` probes of every node"""
+    for fake in fleet.nodes():
+        fake.extended = extended
+    probes._legacy_nodes.clear()
+    pool = NodeConnectionPool(statement_timeout_ms=5000)
+    nodes = fleet_nodes(fleet)
+    for node in nodes:
+        probes.get_db_metrics(node, pool)    # connect, and fall back once where refused
+    samples = defaultdict(lambda: ([], []))
+    for _ in range(repeat):
+        for node in nodes:
+            started = time.perf_counter()
+            metrics, _, _ = probes.get_db_metrics(node, pool)
+            statements, seconds = samples[(node.engine, node.primary)]
+            seconds.append(time.perf_counter() - started)
+            statements.append(metrics.get("probe_statements", 0))
+    pool.close_all()
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clusters", type=int, default=2)
+    parser.add_argument("--replicas", type=int, default=2)
+    parser.add_argument("--latency-ms", type=float, default=5, help="fake node query latency")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    fleet = FakeFleet(args.clusters, args.replicas, latency_ms=args.latency_ms, connect_ms=0).start()
+    try:
+        results = {"extended": run(fleet, True, args.repeat), "legacy": run(fleet, False, args.repeat)}
+    finally:
+        fleet.stop()
+
+    print(f"\n{'probe':10} {'node':16} {'statements':>10} {'median':>10} {'p95':>10}")
+    for probe, samples in results.items():
+        for (engine, primary), (statements, seconds) in sorted(samples.items()):
+            seconds.sort()
+            print(f"{probe:10} {engine + (' primary' if primary else ' replica'):16} "
+                  f"{statistics.mean(statements):>10.1f} {harness.format_seconds(statistics.median(seconds)):>10} "
+                  f"{harness.format_seconds(harness.percentile(seconds, 0.95)):>10}")
+    print(f"\nQuery latency {args.latency_ms:.0f}ms per statement; extended rows also carry load and WAL figures")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,152 @@
+"""Serialization benchmark on a synthetic metrics table.
+
+Compares the legacy /metrics/history path (fetchall, dict per row,
+format_timestamps over every value, stdlib json) with the streaming export
+(history_export + RowEncoder) on every installed JSON backend, and the
+dashboard API's response rendering (FastJSONResponse) per backend.
+
+    python benchmarks/bench_serialization.py [rows]
+"""
+import os
+import sys
+import json
+import time
+import random
+import datetime
+import tempfile
+import importlib.util
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)     # the shared/ package
+sys.path.insert(0, os.path.join(ROOT, "backend"))
+
+import serialization  # noqa: E402
+from sqlite_writer import SQLiteWriter  # noqa: E402
+from migrations import migrate, METRICS_MIGRATIONS  # noqa: E402
+from history_export import history_query, open_rows, stream_json, stream_ndjson  # noqa: E402
+
+# The dashboard API has its own serialization module; load it under another name
+_spec = importlib.util.spec_from_file_location("frontend_serialization", os.path.join(ROOT, "frontend", "serialization.py"))
+frontend_serialization = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(frontend_serialization)
+
+NODES = [(db_type, role) for db_type in ("postgres", "mysql") for role in ("master", "slave1", "slave2")]
+
+
+def build_table(db_file, rows):
+    writer = SQLiteWriter()
+    migrate(writer, db_file, METRICS_MIGRATIONS)
+    now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+    batch = []
+    for i in range(rows):
+        db_type, role = NODES[i % len(NODES)]
+        ts = (now - datetime.timedelta(seconds=10 * (rows - i) // len(NODES))).strftime("%Y-%m-%d %H:%M:%S")
+        up = random.random() > 0.01
+        batch.append((
+            ts, db_type, role, f"10.0.0.{i % len(NODES) + 1}", 5432 if db_type == "postgres" else 3306,
+            "up" if up else "down", "17.2" if db_type == "postgres" else "8.0.43",
+            "2025-01-01 00:00:00.000000+00:00", None if role == "master" else random.random() * 5,
+            "Yes" if db_type == "mysql" and role != "master" else None,
+            "Yes" if db_type == "mysql" and role != "master" else None,
+            99.0 + random.random(), None if up else ts, random.random() * 20,
+        ))
+    with writer.batch():
+        writer.executemany(db_file, """
+            INSERT INTO metrics (timestamp, db_type, role, host, port, connection_status, cluster_version,
+                cluster_creation_timestamp, replication_lag_seconds, replication_io_running,
+                replication_sql_running, uptime_percentage, last_node_down_time, probe_latency_ms)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, batch)
+    writer.close()
+
+
+def legacy_format_timestamps(obj):
+    """format_timestamps as the history routes used it: try-parse every string"""
+    if isinstance(obj, dict):
+        return {k: legacy_format_timestamps(v) for k, v in obj.items()}
+    elif isinstance(obj, list):
+        return [legacy_format_timestamps(item) for item in obj]
+    elif isinstance(obj, str):
+        try:
+            return datetime.datetime.fromisoformat(obj.replace("Z", "+00:00")).strftime("%Y-%m-%d %H:%M:%S")
+        except Exception:
+            return obj
+    return obj
+
+
+def legacy_history(db_file):
+    import sqlite3
+    conn = sqlite3.connect(db_file)
+    cur = conn.execute("SELECT * FROM metrics WHERE timestamp >= datetime('now', '-720 hours') ORDER BY timestamp DESC")
+    columns = [desc[0] for desc in cur.description]
+    rows = cur.fetchall()
+    conn.close()
+    history = [dict(zip(columns, row)) for row in rows]
+    return json.dumps(legacy_format_timestamps({"total_records": len(history), "metrics": history})).encode()
+
+
+def streamed_history(db_file, export_format):
+    sql, params = history_query("metrics", 720, {})
+    columns, batches = open_rows(db_file, sql, params)
+    if export_format == "ndjson":
+        parts = stream_ndjson(columns, batches)
+    else:
+        parts = stream_json(columns, batches, "metrics", {"time_range_hours": 720}, None)
+    return b"".join(part if isinstance(part, bytes) else part.encode() for part in parts)
+
+
+def lag_payload(db_file):
+    import sqlite3
+    conn = sqlite3.connect(db_file)
+    rows = conn.execute(
+        "SELECT db_type, role, replication_lag_seconds, timestamp FROM metrics WHERE replication_lag_seconds IS NOT NULL"
+    ).fetchall()
+    conn.close()
+    return {"replication_lag": [
+        {"db_type": db_type, "role": role, "lag_seconds": lag, "timestamp": ts} for db_type, role, lag, ts in rows
+    ], "time_range": "30d"}
+
+
+def timed(func, repeat=3):
+    best, result = None, None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def available_backends():
+    return [name for name, module in (("orjson", serialization.orjson), ("msgspec", serialization.msgspec),
+                                      ("stdlib", json)) if module is not None]
+
+
+def main(rows):
+    db_file = os.path.join(tempfile.mkdtemp(prefix="bench_serialization_"), "metrics.db")
+    print(f"Building {rows} synthetic metrics rows in {db_file} ...")
+    build_table(db_file, rows)
+
+    print(f"\n{'case':32} {'backend':8} {'seconds':>8} {'rows/s':>10} {'MB':>7} {'speedup':>8}")
+    baseline, output = timed(lambda: legacy_history(db_file))
+    print(f"{'history json (legacy)':32} {'stdlib':8} {baseline:8.3f} {rows / baseline:10.0f} {len(output) / 1e6:7.1f} {1:8.1f}x")
+    for backend in available_backends():
+        serialization.JSON_BACKEND = backend
+        for export_format in ("json", "ndjson"):
+            elapsed, output = timed(lambda: streamed_history(db_file, export_format))
+            print(f"{'history ' + export_format + ' (streamed)':32} {backend:8} {elapsed:8.3f} "
+                  f"{rows / elapsed:10.0f} {len(output) / 1e6:7.1f} {baseline / elapsed:8.1f}x")
+
+    payload = lag_payload(db_file)
+    points = len(payload["replication_lag"])
+    frontend_serialization.JSON_BACKEND = "stdlib"
+    api_baseline, _ = timed(lambda: frontend_serialization.dumps(payload))
+    for backend in available_backends():
+        frontend_serialization.JSON_BACKEND = backend
+        elapsed, output = timed(lambda: frontend_serialization.dumps(payload))
+        print(f"{'api replication-lag render':32} {backend:8} {elapsed:8.3f} "
+              f"{points / elapsed:10.0f} {len(output) / 1e6:7.1f} {api_baseline / elapsed:8.1f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200000)
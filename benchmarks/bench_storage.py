@@ -0,0 +1,107 @@
+"""Compact sample storage (backend/sample_store.py) against the raw metrics table.
+
+Packs every generated sample into chunks, then compares the bytes each
+representation takes and the time to read a range: one node's lag series
+(sqlite3.Row per sample vs. bulk-decoded columns) and every column of every
+node (the /metrics/history export).
+
+    python benchmarks/bench_storage.py [--nodes 6] [--days 90] [--data-dir DIR]
+"""
+import os
+import sys
+import time
+import shutil
+import sqlite3
+import argparse
+import tempfile
+
+import harness
+from generate_data import generate
+
+sys.path.insert(0, os.path.join(harness.ROOT, "backend"))
+from sqlite_writer import SQLiteWriter  # noqa: E402
+from migrations import migrate, METRICS_MIGRATIONS  # noqa: E402
+from sample_store import compact_metrics, read_chunks, history_rows, METRIC_COLUMNS  # noqa: E402
+
+RAW_OBJECTS = ("metrics", "idx_metrics_ts_cover", "idx_metrics_node_ts", "sqlite_autoindex_metrics_1")
+PACKED_OBJECTS = ("metric_chunks", "idx_metric_chunks_start", "sample_strings", "sqlite_autoindex_sample_strings_1")
+
+
+def table_bytes(conn, names):
+    """Bytes of pages used by the tables and indexes; payload bytes when dbstat is not compiled in"""
+    try:
+        placeholders = ", ".join("?" * len(names))
+        return conn.execute(f"SELECT IFNULL(SUM(pgsize), 0) FROM dbstat WHERE name IN ({placeholders})", names).fetchone()[0]
+    except sqlite3.OperationalError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--nodes", type=int, default=6)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--data-dir", default=None, help="use data generated earlier by generate_data.py (copied)")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="bench_storage_")
+    db_file = os.path.join(work_dir, "metrics.db")
+    if args.data_dir:
+        shutil.copy(os.path.join(args.data_dir, "metrics.db"), db_file)
+    else:
+        print(f"Generating {args.days} days for {args.nodes} nodes in {work_dir} ...")
+        generate(work_dir, args.nodes, days=args.days)
+
+    writer = SQLiteWriter()
+    migrate(writer, db_file, METRICS_MIGRATIONS)
+    started = time.perf_counter()
+    report = compact_metrics(writer, db_file, int(time.time()) + 86400)
+    print(f"Packed {report['samples']} samples into {report['chunks']} chunks in {time.perf_counter() - started:.2f}s")
+    writer.close()
+
+    conn = sqlite3.connect(db_file)
+    samples = conn.execute("SELECT COUNT(*) FROM metrics").fetchone()[0]
+    raw, packed = table_bytes(conn, RAW_OBJECTS), table_bytes(conn, PACKED_OBJECTS)
+    if raw is not None:
+        print(f"\n{'storage':30} {'bytes':>12} {'bytes/sample':>13}")
+        print(f"{'metrics + indexes':30} {raw:>12} {raw / samples:>13.1f}")
+        print(f"{'metric_chunks + dictionary':30} {packed:>12} {packed / samples:>13.1f}   ({raw / packed:.1f}x smaller)")
+
+    db_type, role = conn.execute("SELECT db_type, role FROM metrics WHERE role != 'master' LIMIT 1").fetchone()
+    since = int(time.time()) - args.days * 86400
+    since_text = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(since))
+    conn.row_factory = sqlite3.Row
+
+    def raw_series():
+        rows = conn.execute("""
+            SELECT timestamp, replication_lag_seconds FROM metrics
+            WHERE db_type = ? AND role = ? AND timestamp >= ? ORDER BY timestamp
+        """, (db_type, role, since_text)).fetchall()
+        return [(row["timestamp"], row["replication_lag_seconds"]) for row in rows]
+
+    def packed_series():
+        columns = ("timestamp", "replication_lag_seconds")
+        chunks = list(read_chunks(conn, columns, since_epoch=since, db_type=db_type, role=role))
+        return sum(len(values["timestamp"]) for _, _, _, values in chunks)
+
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(metrics)")]
+
+    def raw_export():
+        return len(conn.execute("SELECT * FROM metrics WHERE timestamp >= ? ORDER BY id DESC", (since_text,)).fetchall())
+
+    def packed_export():
+        return sum(1 for _ in history_rows(conn, columns, since, {}))
+
+    print(f"\n{'range read':44} {'rows':>8} {'best':>10} {'median':>10}")
+    for case, func in ((f"lag series {db_type} {role}, raw rows", raw_series),
+                       (f"lag series {db_type} {role}, packed columns", packed_series),
+                       ("all columns, all nodes, raw rows", raw_export),
+                       ("all columns, all nodes, packed rows", packed_export)):
+        best, median, result = harness.measure(func)
+        count = result if isinstance(result, int) else len(result)
+        print(f"{case:44} {count:>8} {harness.format_seconds(best):>10} {harness.format_seconds(median):>10}")
+    print(f"\n{len(METRIC_COLUMNS)} packed columns per chunk; results in {work_dir}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,463 @@
+"""Stand-in PostgreSQL and MySQL servers for offline benchmarks.
+
+Each fake node listens on its own local port and speaks just enough of the
+wire protocol for psycopg2 and mysql-connector to connect (any user and
+password are accepted) and run the collector's probe queries, extended or
+legacy. Connect and query latency, replication lag and failure rate are
+configurable per node and can be changed while the servers run; load
+counters grow at a steady rate.
+
+Serve a fleet and write a topology file for the collector:
+
+    python benchmarks/fake_databases.py --clusters 4 --replicas 2 --latency-ms 20 \\
+        --topology /tmp/fake-topology.json
+    TOPOLOGY_FILE=/tmp/fake-topology.json python backend/main_metric.py
+"""
+import os
+import sys
+import json
+import time
+import random
+import struct
+import argparse
+import datetime
+import threading
+import socketserver
+
+PG_PROTOCOL_V3 = 196608
+PG_SSL_REQUEST = 80877103
+PG_GSSENC_REQUEST = 80877104
+
+# PostgreSQL type oids of the values the probes read
+PG_TEXT, PG_BOOL, PG_TIMESTAMPTZ, PG_INTERVAL = 25, 16, 1184, 1186
+PG_INT4, PG_INT8, PG_FLOAT8 = 23, 20, 701
+
+MYSQL_TYPE_LONGLONG, MYSQL_TYPE_VAR_STRING = 8, 253
+# long password, found rows, long flag, connect with db, protocol 41, transactions,
+# secure connection, multi results, plugin auth, lenenc auth data; no SSL, no EOF deprecation
+MYSQL_CAPABILITIES = 0x1 | 0x2 | 0x4 | 0x8 | 0x200 | 0x2000 | 0x8000 | 0x20000 | 0x80000 | 0x200000
+MYSQL_STATUS_AUTOCOMMIT = 0x0002
+
+SERVER_STARTED = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=12)
+
+# Per-second growth of the load counters the extended probes read
+TRANSACTION_RATE, QUERY_RATE, CACHE_HIT_RATE, CACHE_MISS_RATE = 40, 120, 2000, 20
+# WAL / binlog bytes written per second; a replica's replay position trails by lag_seconds of it
+WAL_RATE = 64 * 1024
+
+
+class FakeNode:
+    """Behaviour of one fake server; attributes may be changed at any time"""
+
+    def __init__(self, engine, primary=True, latency_ms=5, jitter_ms=0, connect_ms=None,
+                 lag_seconds=0.5, fail_rate=0.0, extended=True):
+        self.engine = engine
+        self.primary = primary
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.connect_ms = latency_ms if connect_ms is None else connect_ms
+        self.lag_seconds = lag_seconds
+        self.fail_rate = fail_rate
+        # False answers the extended probe statements with an error, like an old server
+        self.extended = extended
+        self.connections = 0
+        self.sessions = 0
+        self.queries = 0
+
+    def delay(self, base_ms):
+        time.sleep(max(0.0, base_ms + random.uniform(-self.jitter_ms, self.jitter_ms)) / 1000)
+
+    def should_fail(self):
+        return self.fail_rate and random.random() < self.fail_rate
+
+    def counters(self):
+        """Load counters since server start: (transactions, queries, cache hits, cache misses)"""
+        elapsed = (datetime.datetime.now(datetime.timezone.utc) - SERVER_STARTED).total_seconds()
+        return tuple(int(elapsed * rate) for rate in (TRANSACTION_RATE, QUERY_RATE, CACHE_HIT_RATE, CACHE_MISS_RATE))
+
+    def wal_positions(self):
+        """(received, applied) WAL / binlog bytes; equal on a primary or a caught-up replica"""
+        received = int((datetime.datetime.now(datetime.timezone.utc) - SERVER_STARTED).total_seconds() * WAL_RATE)
+        return received, received - (0 if self.primary else int(self.lag_seconds * WAL_RATE))
+
+
+# ======================= PostgreSQL =======================
+
+def pg_message(kind, payload=b""):
+    return kind + struct.pack("!I", len(payload) + 4) + payload
+
+
+def pg_rows(columns, rows):
+    """RowDescription + DataRows + CommandComplete for a simple-query result; values are text or None"""
+    description = struct.pack("!H", len(columns))
+    for name, oid in columns:
+        description += name.encode() + b"\0" + struct.pack("!IHIhiH", 0, 0, oid, -1, -1, 0)
+    out = pg_message(b"T", description)
+    for row in rows:
+        data = struct.pack("!H", len(row))
+        for value in row:
+            if value is None:
+                data += struct.pack("!i", -1)
+            else:
+                encoded = str(value).encode()
+                data += struct.pack("!i", len(encoded)) + encoded
+        out += pg_message(b"D", data)
+    return out + pg_message(b"C", f"SELECT {len(rows)}\0".encode())
+
+
+def pg_answer(node, sql):
+    """Response messages for one simple query, before ReadyForQuery"""
+    text = sql.strip().rstrip(";").lower()
+    if "pg_stat_activity" in text:
+        if not node.extended:
+            return pg_message(b"E", b"SERROR\0C42883\0Mfake server: function pg_last_wal_receive_lsn() does not exist\0\0")
+        return _pg_extended(node)
+    if "version()" in text:
+        return pg_rows([("version", PG_TEXT)], [("PostgreSQL 16.4 (fake) on x86_64-pc-linux-gnu",)])
+    if "pg_postmaster_start_time" in text:
+        return pg_rows([("pg_postmaster_start_time", PG_TIMESTAMPTZ)],
+                       [(SERVER_STARTED.strftime("%Y-%m-%d %H:%M:%S.%f+00"),)])
+    if "pg_last_xact_replay_timestamp" in text:
+        lag = None if node.primary else _pg_interval(node.lag_seconds)
+        return pg_rows([("replication_lag", PG_INTERVAL)], [(lag,)])
+    if "pg_is_in_recovery" in text:
+        return pg_rows([("pg_is_in_recovery", PG_BOOL)], [("f" if node.primary else "t",)])
+    if text.split(" ", 1)[0] in ("set", "begin", "commit", "rollback", "discard"):
+        return pg_message(b"C", text.split(" ", 1)[0].upper().encode() + b"\0")
+    error = b"SERROR\0C42883\0Mfake server: unsupported query\0\0"
+    return pg_message(b"E", error)
+
+
+def _pg_extended(node):
+    """Row of the collector's extended PostgreSQL probe (probes.POSTGRES_PROBE_SQL)"""
+    transactions, _, hits, misses = node.counters()
+    received, applied = node.wal_positions()
+    lag_bytes = received - applied
+    if node.primary:
+        position, lag = received, None
+    else:
+        position, lag = received, 0 if lag_bytes == 0 else node.lag_seconds
+    columns = [("version", PG_TEXT), ("pg_postmaster_start_time", PG_TIMESTAMPTZ), ("pg_is_in_recovery", PG_BOOL),
+               ("connections", PG_INT8), ("active", PG_INT8), ("current_setting", PG_INT4),
+               ("long_running", PG_INT8), ("longest", PG_FLOAT8), ("transactions", PG_INT8),
+               ("blks_hit", PG_INT8), ("blks_read", PG_INT8), ("lsn", PG_TEXT), ("lag_bytes", PG_INT8),
+               ("lag", PG_FLOAT8)]
+    return pg_rows(columns, [(
+        "PostgreSQL 16.4 (fake) on x86_64-pc-linux-gnu", SERVER_STARTED.strftime("%Y-%m-%d %H:%M:%S.%f+00"),
+        "f" if node.primary else "t", node.sessions, max(node.sessions - 1, 0), 100, 0, None,
+        transactions, hits, misses, _pg_lsn(position), lag_bytes if not node.primary else 0, lag,
+    )])
+
+
+def _pg_lsn(position):
+    return f"{position >> 32:X}/{position & 0xFFFFFFFF:X}"
+
+
+def _pg_interval(seconds):
+    whole = int(seconds)
+    return f"{whole // 3600:02d}:{whole % 3600 // 60:02d}:{whole % 60:02d}.{int((seconds - whole) * 1e6):06d}"
+
+
+class PostgresHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        node = self.server.node
+        sock = self.request
+        opened = False
+        try:
+            # Startup: refuse SSL / GSS encryption, then read the startup message
+            while True:
+                length, code = struct.unpack("!II", _recv_exact(sock, 8))
+                body = _recv_exact(sock, length - 8)
+                if code in (PG_SSL_REQUEST, PG_GSSENC_REQUEST):
+                    sock.sendall(b"N")
+                    continue
+                if code != PG_PROTOCOL_V3:
+                    return
+                break
+            node.delay(node.connect_ms)
+            if node.should_fail():
+                sock.sendall(pg_message(b"E", b"SFATAL\0C57P03\0Mfake server: the database system is starting up\0\0"))
+                return
+            node.connections += 1
+            node.sessions += 1
+            opened = True
+            out = pg_message(b"R", struct.pack("!I", 0))
+            for name, value in (("server_version", "16.4"), ("server_encoding", "UTF8"),
+                                ("client_encoding", "UTF8"), ("DateStyle", "ISO, MDY"),
+                                ("integer_datetimes", "on"), ("IntervalStyle", "postgres"),
+                                ("standard_conforming_strings", "on"), ("TimeZone", "UTC")):
+                out += pg_message(b"S", name.encode() + b"\0" + value.encode() + b"\0")
+            out += pg_message(b"K", struct.pack("!II", os.getpid(), random.getrandbits(31)))
+            sock.sendall(out + pg_message(b"Z", b"I"))
+
+            while True:
+                kind = _recv_exact(sock, 1)
+                length, = struct.unpack("!I", _recv_exact(sock, 4))
+                body = _recv_exact(sock, length - 4)
+                if kind == b"X":
+                    return
+                if kind != b"Q":
+                    sock.sendall(pg_message(b"E", b"SERROR\0C0A000\0Mfake server: simple queries only\0\0")
+                                 + pg_message(b"Z", b"I"))
+                    continue
+                node.delay(node.latency_ms)
+                node.queries += 1
+                sock.sendall(pg_answer(node, body.rstrip(b"\0").decode()) + pg_message(b"Z", b"I"))
+        except (ConnectionError, OSError):
+            return
+        finally:
+            if opened:
+                node.sessions -= 1
+
+
+# ======================= MySQL =======================
+
+def _lenenc_int(value):
+    if value < 251:
+        return bytes([value])
+    if value < 1 << 16:
+        return b"\xfc" + struct.pack("<H", value)
+    if value < 1 << 24:
+        return b"\xfd" + struct.pack("<I", value)[:3]
+    return b"\xfe" + struct.pack("<Q", value)
+
+
+def _lenenc_str(value):
+    encoded = value if isinstance(value, bytes) else str(value).encode()
+    return _lenenc_int(len(encoded)) + encoded
+
+
+class MySQLPackets:
+    """Frames payloads as MySQL packets with running sequence ids"""
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.sequence = 0
+
+    def read(self):
+        header = _recv_exact(self.sock, 4)
+        length = header[0] | header[1] << 8 | header[2] << 16
+        self.sequence = (header[3] + 1) % 256
+        return _recv_exact(self.sock, length)
+
+    def frame(self, payload):
+        packet = struct.pack("<I", len(payload))[:3] + bytes([self.sequence]) + payload
+        self.sequence = (self.sequence + 1) % 256
+        return packet
+
+    def ok(self):
+        return self.frame(b"\x00\x00\x00" + struct.pack("<HH", MYSQL_STATUS_AUTOCOMMIT, 0))
+
+    def eof(self):
+        return self.frame(b"\xfe" + struct.pack("<HH", 0, MYSQL_STATUS_AUTOCOMMIT))
+
+    def error(self, code, state, message):
+        return self.frame(b"\xff" + struct.pack("<H", code) + b"#" + state.encode() + message.encode())
+
+    def result_set(self, columns, rows):
+        """columns: [(name, type)]; rows hold text values or None"""
+        out = self.frame(_lenenc_int(len(columns)))
+        for name, column_type in columns:
+            out += self.frame(b"".join(_lenenc_str(part) for part in ("def", "", "", "", name, name))
+                              + b"\x0c" + struct.pack("<HIBHB", 255, 1024, column_type, 0, 0) + b"\0\0")
+        out += self.eof()
+        for row in rows:
+            out += self.frame(b"".join(b"\xfb" if value is None else _lenenc_str(value) for value in row))
+        return out + self.eof()
+
+
+def mysql_answer(node, packets, sql):
+    text = sql.strip().rstrip(";").lower()
+    if "performance_schema" in text:
+        if not node.extended:
+            return packets.error(1142, "42000", "fake server: SELECT command denied on performance_schema")
+        return _mysql_extended(node, packets)
+    if text.startswith(("show master status", "show binary log status")):
+        received, _ = node.wal_positions()
+        rows = [("binlog.000042", received)] if node.primary else []
+        return packets.result_set([("File", MYSQL_TYPE_VAR_STRING), ("Position", MYSQL_TYPE_LONGLONG)], rows)
+    if text.startswith("show replica status"):
+        received, applied = node.wal_positions()
+        columns = [(name, MYSQL_TYPE_VAR_STRING) for name in (
+            "Source_Host", "Replica_IO_Running", "Replica_SQL_Running", "Source_Log_File", "Relay_Source_Log_File")]
+        columns += [(name, MYSQL_TYPE_LONGLONG) for name in (
+            "Read_Source_Log_Pos", "Exec_Source_Log_Pos", "Seconds_Behind_Source")]
+        rows = [] if node.primary else [("127.0.0.1", "Yes", "Yes", "binlog.000042", "binlog.000042",
+                                         received, applied, int(node.lag_seconds))]
+        return packets.result_set(columns, rows)
+    if text.startswith("select version()"):
+        return packets.result_set([("version", MYSQL_TYPE_VAR_STRING)], [("8.0.36-fake",)])
+    if text.startswith("show global status like 'uptime'"):
+        uptime = int((datetime.datetime.now(datetime.timezone.utc) - SERVER_STARTED).total_seconds())
+        return packets.result_set([("Variable_name", MYSQL_TYPE_VAR_STRING), ("Value", MYSQL_TYPE_VAR_STRING)],
+                                  [("Uptime", uptime)])
+    if text.startswith("show slave status"):
+        columns = [("Master_Host", MYSQL_TYPE_VAR_STRING), ("Slave_IO_Running", MYSQL_TYPE_VAR_STRING),
+                   ("Slave_SQL_Running", MYSQL_TYPE_VAR_STRING), ("Seconds_Behind_Master", MYSQL_TYPE_LONGLONG)]
+        rows = [] if node.primary else [("127.0.0.1", "Yes", "Yes", int(node.lag_seconds))]
+        return packets.result_set(columns, rows)
+    if text.startswith("select @@"):
+        # Session variables some connectors read after connecting
+        name = text.split()[1]
+        return packets.result_set([(name, MYSQL_TYPE_VAR_STRING)], [(None,)])
+    if text.startswith(("set ", "commit", "rollback", "start transaction", "begin")):
+        return packets.ok()
+    return packets.error(1064, "42000", "fake server: unsupported query")
+
+
+def _mysql_extended(node, packets):
+    """Row of the collector's extended MySQL status probe (probes.MYSQL_PROBE_SQL)"""
+    transactions, queries, hits, misses = node.counters()
+    uptime = int((datetime.datetime.now(datetime.timezone.utc) - SERVER_STARTED).total_seconds())
+    status = (uptime, node.sessions, 1, queries, transactions, 0, hits + misses, misses)
+    columns = [("VERSION()", MYSQL_TYPE_VAR_STRING), ("@@max_connections", MYSQL_TYPE_LONGLONG)]
+    columns += [(f"status_{i}", MYSQL_TYPE_VAR_STRING) for i in range(len(status))]
+    columns += [("long_running", MYSQL_TYPE_LONGLONG), ("longest", MYSQL_TYPE_LONGLONG)]
+    return packets.result_set(columns, [("8.0.36-fake", 151, *status, 0, None)])
+
+
+class MySQLHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        node = self.server.node
+        packets = MySQLPackets(self.request)
+        opened = False
+        try:
+            node.delay(node.connect_ms)
+            if node.should_fail():
+                self.request.sendall(packets.error(1040, "08004", "fake server: too many connections"))
+                return
+            scramble = bytes(random.randint(1, 127) for _ in range(20))
+            greeting = (b"\x0a" + b"8.0.36-fake\0" + struct.pack("<I", random.getrandbits(31))
+                        + scramble[:8] + b"\0" + struct.pack("<H", MYSQL_CAPABILITIES & 0xffff)
+                        + bytes([255]) + struct.pack("<H", MYSQL_STATUS_AUTOCOMMIT)
+                        + struct.pack("<H", MYSQL_CAPABILITIES >> 16) + bytes([21]) + b"\0" * 10
+                        + scramble[8:] + b"\0" + b"mysql_native_password\0")
+            self.request.sendall(packets.frame(greeting))
+            packets.read()              # handshake response: any credentials are accepted
+            self.request.sendall(packets.ok())
+            node.connections += 1
+            node.sessions += 1
+            opened = True
+
+            while True:
+                payload = packets.read()
+                command = payload[:1]
+                if command == b"\x01":          # COM_QUIT
+                    return
+                if command == b"\x0e":          # COM_PING
+                    self.request.sendall(packets.ok())
+                    continue
+                if command == b"\x02":          # COM_INIT_DB
+                    self.request.sendall(packets.ok())
+                    continue
+                if command != b"\x03":          # anything but COM_QUERY
+                    self.request.sendall(packets.error(1047, "08S01", "fake server: unknown command"))
+                    continue
+                node.delay(node.latency_ms)
+                node.queries += 1
+                self.request.sendall(mysql_answer(node, packets, payload[1:].decode(errors="replace")))
+        except (ConnectionError, OSError):
+            return
+        finally:
+            if opened:
+                node.sessions -= 1
+
+
+# ======================= Fleet =======================
+
+def _recv_exact(sock, size):
+    data = b""
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("client closed the connection")
+        data += chunk
+    return data
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 128
+
+
+class FakeFleet:
+    """Fake clusters of one primary and ``replicas`` replicas each, alternating engines.
+
+    Node settings (latency_ms, jitter_ms, connect_ms, lag_seconds, fail_rate)
+    are passed to every FakeNode.
+    """
+
+    def __init__(self, clusters=2, replicas=2, engines=("postgres", "mysql"), host="127.0.0.1", **node_settings):
+        self.host = host
+        self.clusters = []
+        self._servers = []
+        for index in range(clusters):
+            engine = engines[index % len(engines)]
+            nodes = []
+            for position in range(replicas + 1):
+                role = "master" if position == 0 else f"slave{position}"
+                node = FakeNode(engine, primary=position == 0, **node_settings)
+                server = _Server((host, 0), PostgresHandler if engine == "postgres" else MySQLHandler)
+                server.node = node
+                self._servers.append(server)
+                nodes.append((role, node, server.server_address[1]))
+            self.clusters.append((f"{engine}-{index}", engine, nodes))
+
+    def start(self):
+        for server in self._servers:
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        for server in self._servers:
+            server.shutdown()
+            server.server_close()
+
+    def nodes(self):
+        return [node for _, _, nodes in self.clusters for _, node, _ in nodes]
+
+    def topology(self):
+        """A topology file document (see backend/topology.example.json) pointing at the fake nodes"""
+        return {"clusters": [{
+            "name": name, "engine": engine, "user": "bench", "password": "bench", "dbname": "bench",
+            "nodes": [{"role": role, "host": self.host, "port": port} for role, _, port in nodes],
+        } for name, engine, nodes in self.clusters]}
+
+    def write_topology(self, path):
+        with open(path, "w") as f:
+            json.dump(self.topology(), f, indent=2)
+        return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clusters", type=int, default=2)
+    parser.add_argument("--replicas", type=int, default=2)
+    parser.add_argument("--latency-ms", type=float, default=5, help="delay before every query reply")
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--connect-ms", type=float, default=None, help="delay before the handshake (default: latency)")
+    parser.add_argument("--lag-seconds", type=float, default=0.5, help="replication lag reported by replicas")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="fraction of connections refused")
+    parser.add_argument("--legacy", action="store_true", help="refuse the extended probe statements")
+    parser.add_argument("--topology", default=None, help="write a topology file for TOPOLOGY_FILE here")
+    args = parser.parse_args()
+
+    fleet = FakeFleet(args.clusters, args.replicas, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                      connect_ms=args.connect_ms, lag_seconds=args.lag_seconds, fail_rate=args.fail_rate,
+                      extended=not args.legacy).start()
+    for name, engine, nodes in fleet.clusters:
+        print(f"{name:12} {engine:9} " + "  ".join(f"{role}=:{port}" for role, _, port in nodes))
+    if args.topology:
+        print(f"Topology written to {fleet.write_topology(args.topology)}")
+    print("Serving, Ctrl+C to stop")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        fleet.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
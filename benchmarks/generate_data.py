@@ -0,0 +1,220 @@
+"""Synthetic history for benchmarks: months of collector output for N nodes.
+
+Fills metrics.db (metrics, cluster_status, cluster_status_nodes and, through
+the regular migrations, the rollup and latest-state tables) and
+db_log.sqlite (status_logs, plus down/recovered rows in events) with one
+sample per node every --interval seconds up to now; status_logs and
+cluster_status keep only changes and --heartbeat rows, like the collector. Nodes go down and
+recover at random and replicas carry replication lag with occasional
+spikes, so uptime and lag aggregates have something to chew on. Clusters
+are named like benchmarks/fake_databases.py names them.
+
+    python benchmarks/generate_data.py OUT_DIR [--nodes 6] [--replicas 2] [--days 90] [--interval 600] [--heartbeat 3600]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+from collections import deque
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)     # the shared/ package
+sys.path.insert(0, os.path.join(ROOT, "backend"))
+
+from sqlite_writer import SQLiteWriter  # noqa: E402
+from migrations import migrate, METRICS_MIGRATIONS, LOG_MIGRATIONS  # noqa: E402
+from transition_log import TransitionLog, CHANGE, CLUSTER_SEVERITY  # noqa: E402
+
+ENGINES = ("postgres", "mysql")
+VERSIONS = {"postgres": "PostgreSQL 16.4 on x86_64-pc-linux-gnu", "mysql": "8.0.36"}
+PORTS = {"postgres": 5432, "mysql": 3306}
+
+INSERT_METRICS = """
+    INSERT INTO metrics (
+        timestamp, db_type, role, host, port, connection_status, cluster_version,
+        cluster_creation_timestamp, replication_lag_seconds, replication_io_running,
+        replication_sql_running, uptime_percentage, last_node_down_time, probe_latency_ms
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+INSERT_CLUSTER_STATUS = """
+    INSERT INTO cluster_status (id, timestamp, db_type, status, master_status, slave1_status, slave2_status)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+INSERT_STATUS_LOG = "INSERT INTO status_logs (timestamp, db_type, role, host, status, kind) VALUES (?, ?, ?, ?, ?, ?)"
+INSERT_EVENT = "INSERT INTO events (event, severity, timestamp) VALUES (?, ?, ?)"
+
+# Migration 6 backfills cluster_status_nodes from the master/slave1/slave2 columns; statuses
+# of further replicas wait in a temporary table until it has run
+LEGACY_ROLES = ("master", "slave1", "slave2")
+INSERT_EXTRA_NODE = "INSERT INTO temp.extra_nodes (cluster_status_id, role, status) VALUES (?, ?, ?)"
+
+
+def cluster_layout(nodes, replicas):
+    """[(cluster, engine, [role])] with at least ``nodes`` nodes, one primary per cluster"""
+    clusters = -(-nodes // (replicas + 1))
+    return [(f"{ENGINES[i % len(ENGINES)]}-{i}", ENGINES[i % len(ENGINES)],
+             ["master"] + [f"slave{n}" for n in range(1, replicas + 1)]) for i in range(clusters)]
+
+
+def cluster_summary(primary_status, replica_statuses):
+    # Same rules as main_metric.get_status_summary
+    if primary_status == "up" and all(status == "up" for status in replica_statuses):
+        return "healthy"
+    if primary_status == "down":
+        return "critical"
+    if any(status == "down" for status in replica_statuses):
+        return "degraded"
+    return "unknown"
+
+
+class _Node:
+    def __init__(self, cluster, engine, role, index, window):
+        self.cluster, self.engine, self.role = cluster, engine, role
+        self.host = f"10.{index // 250}.{index % 250}.{10 + len(role)}"
+        self.up = True
+        self.last_down = None
+        self.recent = deque(maxlen=window)
+        self.spike = 0
+
+
+def generate(out_dir, nodes=6, replicas=2, days=90, interval=600, down_rate=0.002, recover_rate=0.3, seed=1,
+             heartbeat=3600):
+    """Write metrics.db and db_log.sqlite into out_dir; returns (metrics_db, log_db, row counts)"""
+    rng = random.Random(seed)
+    os.makedirs(out_dir, exist_ok=True)
+    metrics_db, log_db = os.path.join(out_dir, "metrics.db"), os.path.join(out_dir, "db_log.sqlite")
+    for path in (metrics_db, log_db):
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+    writer = SQLiteWriter(synchronous="OFF")
+    # Raw tables first; the later migrations then backfill rollups and latest-state tables
+    # from the generated history exactly as they would for an upgraded installation
+    migrate(writer, metrics_db, METRICS_MIGRATIONS[:2])
+    migrate(writer, log_db, LOG_MIGRATIONS)
+    writer.execute(metrics_db, "CREATE TEMP TABLE extra_nodes (cluster_status_id INTEGER, role TEXT, status TEXT)")
+
+    window = max(1, 86400 // interval)  # uptime_percentage covers the last 24h, like UPTIME_WINDOW
+    layout = cluster_layout(nodes, replicas)
+    fleet, index = [], 0
+    for cluster, engine, roles in layout:
+        members = []
+        for role in roles:
+            members.append(_Node(cluster, engine, role, index, window))
+            index += 1
+        fleet.append((cluster, members))
+
+    end = int(time.time()) // interval * interval
+    start = end - days * 86400
+    counts = {"metrics": 0, "cluster_status": 0, "status_logs": 0, "events": 0}
+    cluster_status_id = 0
+    node_transitions, cluster_transitions = TransitionLog(heartbeat), TransitionLog(heartbeat)
+    # cluster_status is written for every sample so the rollup migration backfills full counts,
+    # then thinned to its transitions: {id: kind} of the rows to keep
+    cluster_kinds = {}
+    per_batch = max(1, 86400 // interval)   # one transaction per simulated day
+
+    sample = start
+    while sample <= end:
+        metric_rows, cluster_rows, cluster_node_rows, log_rows, event_rows = [], [], [], [], []
+        for _ in range(per_batch):
+            if sample > end:
+                break
+            timestamp = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(sample))
+            for cluster, members in fleet:
+                for node in members:
+                    was_up = node.up
+                    node.up = rng.random() > down_rate if was_up else rng.random() < recover_rate
+                    status = "up" if node.up else "down"
+                    if not node.up:
+                        node.last_down = timestamp
+                    if was_up != node.up:
+                        event_rows.append((f"{cluster} {node.role} ({node.host}) is {'down' if not node.up else 'up again'}",
+                                           "critical" if not node.up else "info", timestamp))
+                    kind, _ = node_transitions.check((cluster, node.role), status, sample)
+                    node.recent.append(node.up)
+                    uptime = round(100 * sum(node.recent) / len(node.recent), 2)
+
+                    lag = io_running = sql_running = None
+                    if node.role != "master" and node.up:
+                        if node.spike:
+                            node.spike -= 1
+                            lag = rng.uniform(30, 300)
+                        else:
+                            node.spike = rng.randint(1, 6) if rng.random() < 0.005 else 0
+                            lag = rng.expovariate(1 / 0.8)
+                        lag = round(lag, 3) if node.engine == "postgres" else float(int(lag))
+                        if node.engine == "mysql":
+                            io_running = sql_running = "Yes"
+                    metric_rows.append((
+                        timestamp, cluster, node.role, node.host, PORTS[node.engine], status,
+                        VERSIONS[node.engine] if node.up else "N/A", "2025-01-01T00:00:00+00:00" if node.up else "N/A",
+                        lag, io_running, sql_running, uptime, node.last_down or "Never",
+                        round(rng.uniform(2, 20), 2) if node.up else 5000.0,
+                    ))
+                    if kind is not None:
+                        log_rows.append((timestamp, cluster, node.role, node.host, status, kind))
+
+                statuses = [(node.role, "up" if node.up else "down") for node in members]
+                cluster_status_id += 1
+                legacy = ([status for _, status in statuses] + [None, None, None])[:3]
+                summary = cluster_summary(statuses[0][1], [s for _, s in statuses[1:]])
+                cluster_rows.append((cluster_status_id, timestamp, cluster, summary, *legacy))
+                kind, previous = cluster_transitions.check(cluster, (summary, tuple(sorted(statuses))), sample)
+                if kind is not None:
+                    cluster_kinds[cluster_status_id] = kind
+                if kind == CHANGE and previous[0] != summary:
+                    event_rows.append((f"{cluster} cluster is {summary} (was {previous[0]})",
+                                       CLUSTER_SEVERITY.get(summary, "warning"), timestamp))
+                cluster_node_rows.extend((cluster_status_id, role, status) for role, status in statuses)
+            sample += interval
+
+        with writer.batch():
+            writer.executemany(metrics_db, INSERT_METRICS, metric_rows)
+            writer.executemany(metrics_db, INSERT_CLUSTER_STATUS, cluster_rows)
+            writer.executemany(metrics_db, INSERT_EXTRA_NODE, [row for row in cluster_node_rows
+                                                               if row[1] not in LEGACY_ROLES])
+            writer.executemany(log_db, INSERT_STATUS_LOG, log_rows)
+            writer.executemany(log_db, INSERT_EVENT, event_rows)
+        counts["metrics"] += len(metric_rows)
+        counts["status_logs"] += len(log_rows)
+        counts["events"] += len(event_rows)
+
+    migrate(writer, metrics_db, METRICS_MIGRATIONS)
+    with writer.batch():
+        writer.execute(metrics_db, "INSERT OR IGNORE INTO cluster_status_nodes SELECT * FROM temp.extra_nodes")
+        dropped = [(row_id,) for row_id in range(1, cluster_status_id + 1) if row_id not in cluster_kinds]
+        writer.executemany(metrics_db, "DELETE FROM cluster_status WHERE id = ?", dropped)
+        writer.executemany(metrics_db, "DELETE FROM cluster_status_nodes WHERE cluster_status_id = ?", dropped)
+        writer.executemany(metrics_db, "UPDATE cluster_status SET kind = ? WHERE id = ?",
+                           [(kind, row_id) for row_id, kind in cluster_kinds.items()])
+    counts["cluster_status"] = len(cluster_kinds)
+    writer.close()
+    return metrics_db, log_db, counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("out_dir")
+    parser.add_argument("--nodes", type=int, default=6)
+    parser.add_argument("--replicas", type=int, default=2, help="replicas per cluster")
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--interval", type=int, default=600, help="seconds between samples of a node")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--heartbeat", type=int, default=3600, help="TRANSITION_HEARTBEAT_SECONDS of the collector")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    metrics_db, log_db, counts = generate(args.out_dir, args.nodes, args.replicas, args.days, args.interval,
+                                          seed=args.seed, heartbeat=args.heartbeat)
+    print(f"Generated in {time.perf_counter() - started:.1f}s: "
+          + ", ".join(f"{count} {table}" for table, count in counts.items()))
+    for path in (metrics_db, log_db):
+        print(f"  {path} ({os.path.getsize(path) / 1e6:.1f} MB)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,143 @@
+"""Shared set-up for the benchmarks: the collector and the dashboard API
+pointed at generated data instead of the production paths.
+
+The two services have sibling modules of the same name (serialization),
+so one process can load only one of them; the load test
+serves each from its own process:
+
+    python benchmarks/harness.py collector DATA_DIR PORT [--topology FILE] [--env NAME=VALUE ...]
+    python benchmarks/harness.py dashboard DATA_DIR PORT
+"""
+import os
+import sys
+import time
+import socket
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Modules imported without their app (main_metric.py, app.py put it there) still need shared/
+sys.path.insert(0, ROOT)
+
+
+def load_collector(data_dir, topology_file=None, **env):
+    """Import backend/main_metric.py with its SQLite files in data_dir.
+
+    Settings read at import time (TOPOLOGY_FILE, PROBE_*, POLL_*, ...) are
+    passed as keyword arguments and exported before the import. The scheduler
+    is not started, but the shard lock is taken: without it the collector is a
+    standby that neither probes nor serves a live snapshot.
+    """
+    os.environ["COLLECTOR_LOCK_FILE"] = os.path.join(data_dir, "collector.lock")
+    if topology_file:
+        os.environ["TOPOLOGY_FILE"] = topology_file
+    os.environ.update({name: str(value) for name, value in env.items()})
+    sys.path.insert(0, os.path.join(ROOT, "backend"))
+    cwd = os.getcwd()
+    os.chdir(data_dir)      # main_metric creates a relative log directory on import
+    try:
+        import main_metric
+    finally:
+        os.chdir(cwd)
+    main_metric.METRICS_DB_FILE = os.path.join(data_dir, "metrics.db")
+    main_metric.DB_LOG_FILE = os.path.join(data_dir, "db_log.sqlite")
+    main_metric.init_logging_db()
+    main_metric.init_metrics_db()
+    main_metric.acquire_shard_lock()
+    if not main_metric.shard_lock.held:
+        raise RuntimeError(f"{main_metric.COLLECTOR_LOCK_FILE} is held by pid {main_metric.shard_lock.holder()}")
+    return main_metric
+
+
+def load_dashboard(data_dir):
+    """Import frontend/app.py reading the generated files in data_dir"""
+    sys.path.insert(0, os.path.join(ROOT, "frontend"))
+    cwd = os.getcwd()
+    os.chdir(os.path.join(ROOT, "frontend"))    # static files are mounted from a relative path
+    try:
+        import app
+    finally:
+        os.chdir(cwd)
+    app.METRICS_DB_FILE = os.path.join(data_dir, "metrics.db")
+    app.DB_LOG_FILE = os.path.join(data_dir, "db_log.sqlite")
+    return app
+
+
+def measure(func, repeat=5, number=1):
+    """Seconds per call: (best, median) over ``repeat`` rounds of ``number`` calls, and the last result"""
+    rounds, result = [], None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            result = func()
+        rounds.append((time.perf_counter() - started) / number)
+    return min(rounds), statistics.median(rounds), result
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def format_seconds(seconds):
+    if seconds is None:
+        return "-"
+    if seconds < 1e-3:
+        return f"{seconds * 1e6:.1f}us"
+    if seconds < 1:
+        return f"{seconds * 1e3:.2f}ms"
+    return f"{seconds:.2f}s"
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(service, data_dir, port, topology_file=None, env=None, timeout=60):
+    """Serve the collector or the dashboard API from a child process; returns it once the port accepts"""
+    command = [sys.executable, os.path.abspath(__file__), service, data_dir, str(port)]
+    if topology_file:
+        command += ["--topology", topology_file]
+    for name, value in (env or {}).items():
+        command += ["--env", f"{name}={value}"]
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{service} exited with {process.returncode} before serving")
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return process
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError(f"{service} did not start serving on port {port}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve one service on generated data")
+    parser.add_argument("service", choices=["collector", "dashboard"])
+    parser.add_argument("data_dir")
+    parser.add_argument("port", type=int)
+    parser.add_argument("--topology", default=None)
+    parser.add_argument("--env", action="append", default=[], help="NAME=VALUE set before the import")
+    args = parser.parse_args()
+
+    data_dir = os.path.abspath(args.data_dir)
+    if args.service == "collector":
+        from werkzeug.serving import make_server
+        m = load_collector(data_dir, args.topology, **dict(item.split("=", 1) for item in args.env))
+        make_server("127.0.0.1", args.port, m.app, threaded=True).serve_forever()
+    else:
+        import uvicorn
+        app = load_dashboard(data_dir)
+        uvicorn.run(app.app, host="127.0.0.1", port=args.port, log_level="warning")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+"""Load test of the collector's /metrics and the dashboard's /api/* routes.
+
+Runs everything locally: generated history (generate_data.py), fake
+PostgreSQL/MySQL nodes with configurable latency (fake_databases.py), the
+collector served by werkzeug and the dashboard API served by uvicorn, each
+in its own process (see harness.py). --clients threads then request the routes
+round-robin over keep-alive connections for --duration seconds, and
+latency percentiles are reported per route. The run exits non-zero when
+any request failed or the collector never queried the fake nodes.
+
+    python benchmarks/load_test.py [--clients 16] [--duration 20] [--nodes 6] [--latency-ms 20]
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import threading
+import http.client
+from collections import defaultdict
+
+import harness
+from generate_data import generate, cluster_layout
+from fake_databases import FakeFleet
+
+COLLECTOR_ROUTES = ["/metrics"]
+DASHBOARD_ROUTES = [
+    "/api/cluster-summary",
+    "/api/node-status?range=24h",
+    "/api/uptime-stats?range=24h",
+    "/api/cluster-trend?range=7d",
+    "/api/replication-lag?range=24h",
+    "/api/connection-timeline?range=24h",
+    "/api/historical-events?range=72h",
+    "/api/dashboard?range=24h",
+]
+
+
+def client(targets, stop_at, offset, results, errors):
+    """Request the targets round-robin until stop_at; one keep-alive connection per server"""
+    conns = {}
+    i = offset
+    while time.monotonic() < stop_at:
+        port, route = targets[i % len(targets)]
+        i += 1
+        conn = conns.get(port) or conns.setdefault(port, http.client.HTTPConnection("127.0.0.1", port, timeout=60))
+        started = time.perf_counter()
+        try:
+            conn.request("GET", route)
+            response = conn.getresponse()
+            response.read()
+            elapsed = time.perf_counter() - started
+            if response.status >= 400:
+                errors[route] += 1
+            results[route].append(elapsed)
+        except (OSError, http.client.HTTPException):
+            errors[route] += 1
+            conn.close()
+            conns.pop(port, None)
+    for conn in conns.values():
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--nodes", type=int, default=6)
+    parser.add_argument("--replicas", type=int, default=2)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--data-dir", default=None, help="use data generated earlier with the same --nodes/--replicas")
+    parser.add_argument("--latency-ms", type=float, default=20, help="fake node query latency")
+    parser.add_argument("--jitter-ms", type=float, default=5)
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="fraction of fake node connections refused")
+    parser.add_argument("--snapshot-ttl", type=float, default=5, help="SNAPSHOT_TTL of the collector")
+    parser.add_argument("--routes", choices=["all", "collector", "dashboard"], default="all")
+    args = parser.parse_args()
+
+    data_dir = os.path.abspath(args.data_dir or tempfile.mkdtemp(prefix="load_test_"))
+    if args.data_dir is None:
+        print(f"Generating {args.days} days for {args.nodes} nodes in {data_dir} ...")
+        generate(data_dir, args.nodes, args.replicas, args.days)
+
+    fleet = FakeFleet(len(cluster_layout(args.nodes, args.replicas)), args.replicas, latency_ms=args.latency_ms,
+                      jitter_ms=args.jitter_ms, fail_rate=args.fail_rate).start()
+    topology_file = fleet.write_topology(os.path.join(data_dir, "fake-topology.json"))
+
+    servers, targets = [], []
+    if args.routes in ("all", "collector"):
+        port = harness.free_port()
+        servers.append(harness.start_server("collector", data_dir, port, topology_file,
+                                            {"SNAPSHOT_TTL": args.snapshot_ttl}))
+        targets += [(port, route) for route in COLLECTOR_ROUTES]
+    if args.routes in ("all", "dashboard"):
+        port = harness.free_port()
+        servers.append(harness.start_server("dashboard", data_dir, port))
+        targets += [(port, route) for route in DASHBOARD_ROUTES]
+
+    # Fill the snapshot and the caches once, so the run measures steady state
+    for port, route in targets:
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        conn.request("GET", route)
+        conn.getresponse().read()
+        conn.close()
+
+    print(f"{args.clients} clients for {args.duration:.0f}s against {len(targets)} routes, "
+          f"{len(fleet.nodes())} fake nodes at {args.latency_ms:.0f}±{args.jitter_ms:.0f}ms ...")
+    results, errors = defaultdict(list), defaultdict(int)
+    stop_at = time.monotonic() + args.duration
+    threads = [threading.Thread(target=client, args=(targets, stop_at, i, results, errors))
+               for i in range(args.clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    print(f"\n{'route':40} {'requests':>9} {'errors':>7} {'req/s':>8} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}")
+    total = 0
+    for _, route in targets:
+        latencies = sorted(results[route])
+        total += len(latencies)
+        print(f"{route:40} {len(latencies):>9} {errors[route]:>7} {len(latencies) / args.duration:>8.1f} "
+              + " ".join(f"{harness.format_seconds(harness.percentile(latencies, q)):>9}" for q in (0.5, 0.95, 0.99))
+              + f" {harness.format_seconds(latencies[-1] if latencies else None):>9}")
+    print(f"{'total':40} {total:>9} {sum(errors.values()):>7} {total / args.duration:>8.1f}")
+    queries = sum(node.queries for node in fleet.nodes())
+    print(f"\nFake nodes answered {queries} queries on {sum(node.connections for node in fleet.nodes())} connections")
+    for server in servers:
+        server.terminate()
+        server.wait()
+    fleet.stop()
+
+    # Latencies of failed requests, or of a collector that never probed, measure nothing
+    problems = [f"{route}: {count} failed requests" for route, count in errors.items() if count]
+    if args.routes in ("all", "collector") and queries == 0:
+        problems.append("the collector never queried the fake nodes")
+    if problems:
+        print("\nINVALID RUN: " + "; ".join(problems), file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
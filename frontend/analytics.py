@@ -0,0 +1,166 @@
+import zlib
+import sqlite3
+
+import numpy as np
+
+from queries import (
+    ANALYTICS_RANGE_SQL, ANALYTICS_NODES_SQL, NODE_SERIES_SQL,
+    PACKED_WATERMARK_SQL, PACKED_SERIES_SQL, PACKED_UP_SQL,
+)
+
+# ========================
+# Loading a node's series
+# ========================
+# A node's samples are three aligned arrays, oldest first: epoch seconds (int64),
+# up (bool) and replication lag (float64, NaN where the sample has none). Raw rows
+# come from the metrics table; samples the collector has already packed into
+# metric_chunks (backend/sample_store.py) are decoded from there a whole chunk at a
+# time, so months of history load without a Python object per sample.
+
+RAW_DTYPE = np.dtype([("epoch", np.int64), ("up", np.bool_), ("has_lag", np.bool_), ("lag", np.float64)])
+
+# Chunk layout written by backend/sample_store.py, ENCODING_VERSION 1: zlib'd arrays of
+# int64 deltas (timestamp), uint32 sample_strings ids (connection_status) and float64
+# with NaN for NULL (replication_lag_seconds)
+PACKED_ENCODING = 1
+
+
+def _unpack(blob, dtype):
+    return np.frombuffer(zlib.decompress(blob), dtype=dtype)
+
+
+def _packed_series(conn, db_type, role, since):
+    """Arrays decoded from the node's chunks overlapping the range, and the highest packed id"""
+    try:
+        watermark = conn.execute(PACKED_WATERMARK_SQL, (db_type, role)).fetchone()[0]
+        chunks = conn.execute(PACKED_SERIES_SQL, (db_type, role, since)).fetchall()
+        up_id = conn.execute(PACKED_UP_SQL).fetchone()
+    except sqlite3.OperationalError:
+        # The collector has not migrated this database to compact storage yet
+        return [], 0
+    parts = []
+    for encoding, stamps, statuses, lags in chunks:
+        if encoding != PACKED_ENCODING:
+            raise ValueError(f"Unsupported metric_chunks encoding {encoding} for {db_type}/{role}")
+        epochs = np.cumsum(_unpack(stamps, np.int64))
+        up = _unpack(statuses, np.uint32) == up_id[0] if up_id else np.zeros(len(epochs), dtype=bool)
+        parts.append((epochs, up, _unpack(lags, np.float64)))
+    return parts, watermark
+
+
+def load_node_series(conn, db_type, role, since):
+    """(epochs, up, lag) of one node from ``since`` (epoch seconds) on, oldest first"""
+    parts, watermark = _packed_series(conn, db_type, role, since)
+    cursor = conn.cursor()
+    cursor.row_factory = None   # plain tuples for np.fromiter
+    raw = np.fromiter(cursor.execute(NODE_SERIES_SQL, (db_type, role, since, watermark)), dtype=RAW_DTYPE)
+    parts.append((raw["epoch"], raw["up"], np.where(raw["has_lag"], raw["lag"], np.nan)))
+
+    epochs = np.concatenate([part[0] for part in parts])
+    up = np.concatenate([part[1] for part in parts])
+    lag = np.concatenate([part[2] for part in parts])
+    # Chunks hold whole windows: trim to the range, then order (late rows may interleave)
+    keep = epochs >= since
+    epochs, up, lag = epochs[keep], up[keep], lag[keep]
+    order = np.argsort(epochs, kind="stable")
+    return epochs[order], up[order], lag[order]
+
+
+def read_nodes(conn, offset, compute, db_type=None, role=None):
+    """compute(epochs, up, lag, since, until) for every node, in one read transaction.
+
+    ``offset`` is a SQLite 'now' modifier such as '-30 days'. Returns a list of
+    (db_type, role, result), one node's arrays in memory at a time.
+    """
+    conn.execute("BEGIN")
+    try:
+        since, until = conn.execute(ANALYTICS_RANGE_SQL, (offset,)).fetchone()
+        results = []
+        for node_db_type, node_role in conn.execute(ANALYTICS_NODES_SQL).fetchall():
+            if (db_type and node_db_type != db_type) or (role and node_role != role):
+                continue
+            epochs, up, lag = load_node_series(conn, node_db_type, node_role, since)
+            results.append((node_db_type, node_role, compute(epochs, up, lag, since, until)))
+    finally:
+        conn.commit()
+    return results
+
+
+# ========================
+# Vectorized statistics
+# ========================
+
+def held_seconds(epochs, until, max_gap):
+    """Seconds each sample stands for: until the next sample (the last one until ``until``),
+    at most max_gap, beyond which the node was not observed (collector stopped)"""
+    return np.clip(np.diff(epochs, append=until), 0, max_gap).astype(np.float64)
+
+
+def outage_intervals(epochs, up, until):
+    """Down intervals as arrays (start, end, samples, ongoing, observed_start).
+
+    An outage runs from its first down sample to the first up sample after it;
+    one still down at the end of the series is ongoing and ends at ``until``.
+    observed_start is False when the series already begins down.
+    """
+    edges = np.diff((~up).astype(np.int8), prepend=np.int8(0), append=np.int8(0))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    ongoing = ends == len(epochs)
+    end_epochs = np.append(epochs, until)[ends]
+    return epochs[starts], end_epochs, ends - starts, ongoing, starts > 0
+
+
+def availability(epochs, up, since, until, max_gap):
+    """Time-weighted uptime, downtime, MTBF and MTTR of one node over [since, until]"""
+    held = held_seconds(epochs, until, max_gap)
+    observed = float(held.sum())
+    up_seconds = float(held[up].sum())
+    starts, ends, _, ongoing, observed_start = outage_intervals(epochs, up, until)
+    durations = ends - starts
+    failures = int(observed_start.sum())
+    repaired = observed_start & ~ongoing
+    return {
+        "samples": len(epochs),
+        "observed_seconds": observed,
+        "coverage": observed / (until - since) if until > since else 0.0,
+        "uptime": up_seconds / observed if observed else None,
+        "downtime_seconds": observed - up_seconds,
+        "outages": len(starts),
+        "failures": failures,
+        # Mean time between failures: up time per failure seen starting in the range
+        "mtbf_seconds": up_seconds / failures if failures else None,
+        # Mean time to repair: outages whose start and recovery are both in the range
+        "mttr_seconds": float(durations[repaired].mean()) if repaired.any() else None,
+        "longest_outage_seconds": float(durations.max()) if len(durations) else None,
+    }
+
+
+def weighted_percentiles(values, weights, percentiles):
+    """Percentiles of values where each value counts for its weight (seconds held)"""
+    order = np.argsort(values)
+    values, cumulative = values[order], np.cumsum(weights[order])
+    if cumulative[-1] <= 0:
+        return np.percentile(values, percentiles)
+    targets = np.asarray(percentiles, dtype=np.float64) / 100 * cumulative[-1]
+    return values[np.minimum(np.searchsorted(cumulative, targets), len(values) - 1)]
+
+
+def lag_percentiles(epochs, lag, until, max_gap, percentiles=(50, 95, 99)):
+    """Time-weighted replication lag percentiles of one node.
+
+    Lagging replicas are polled more often (adaptive polling), so plain sample
+    percentiles would overstate the lag; each sample counts for the time it held.
+    """
+    held = held_seconds(epochs, until, max_gap)
+    has_lag = ~np.isnan(lag)
+    values, weights = lag[has_lag], held[has_lag]
+    if not len(values):
+        return None
+    total = weights.sum()
+    return {
+        "samples": len(values),
+        "percentiles": dict(zip(percentiles, weighted_percentiles(values, weights, percentiles).tolist())),
+        "mean": float((values * weights).sum() / total) if total > 0 else float(values.mean()),
+        "max": float(values.max()),
+    }
@@ -1,11 +1,33 @@
+import json
+import time
 import sqlite3
+import asyncio
+import hashlib
 import logging
-from fastapi import FastAPI, HTTPException, Query
-from fastapi.responses import JSONResponse, HTMLResponse
+from typing import Optional
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import HTMLResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from datetime import datetime
+from contextlib import asynccontextmanager
 import os
+import sys
+# The shared/ package (instrumentation, JSON backend) sits at the repository root, next to this app
+if os.path.dirname(os.path.dirname(os.path.abspath(__file__))) not in sys.path:
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from db_read import ReadOnlyPool
+from serialization import FastJSONResponse
+from response_cache import BucketedCache
+from shared.instrumentation import Histogram, CONTENT_TYPE, render as render_instrumentation
+from downsample import to_epoch, lttb, coarse_state_intervals
+from analytics import read_nodes, availability, outage_intervals, lag_percentiles
+from queries import (
+    CLUSTER_SUMMARY_SQL, NODE_STATUS_SQL, UPTIME_STATS_SQL, CLUSTER_TREND_SQL,
+    REPLICATION_LAG_SQL, CONNECTION_TIMELINE_SQL, DASHBOARD_SERIES_SQL, HISTORICAL_EVENTS_SQL,
+    REPLICATION_LAG_SINCE_SQL, CONNECTION_TIMELINE_SINCE_SQL, DASHBOARD_SERIES_SINCE_SQL,
+    DATA_VERSION_SQL, EVENTS_VERSION_SQL, ENDPOINT_QUERIES,
+)
 
 # ========================
 # Database configuration
@@ -16,6 +38,18 @@ import os
 METRICS_DB_FILE = "/home/nodetree/Pictures/monitorapp/sqlite_db_data/metrics.db"
 DB_LOG_FILE = "/home/nodetree/Pictures/monitorapp/sqlite_db_data/db_log.sqlite"
 
+# Read-only connections; queries run in worker threads, at most this many at once
+READ_POOL_SIZE = int(os.getenv("READ_POOL_SIZE", 8))
+# /api/dashboard payloads are reused for requests in the same window of this many seconds
+DASHBOARD_CACHE_TTL = int(os.getenv("DASHBOARD_CACHE_TTL", 30))
+# Series are reduced to about this many points unless the client asks for max_points (0 = raw)
+DEFAULT_MAX_POINTS = int(os.getenv("DEFAULT_MAX_POINTS", 1000))
+# /api/analytics/*: a sample counts until the next one, but for at most this many seconds
+# (longer gaps mean the collector was not running); above the longest polling backoff
+ANALYTICS_MAX_GAP_SECONDS = float(os.getenv("ANALYTICS_MAX_GAP_SECONDS", 3600))
+# Analytics payloads are reused for requests in the same window of this many seconds
+ANALYTICS_CACHE_TTL = int(os.getenv("ANALYTICS_CACHE_TTL", 60))
+
 # ========================
 # Logger
 # ========================
@@ -25,7 +59,21 @@ logger = logging.getLogger("main")
 # ========================
 # FastAPI app
 # ========================
-app = FastAPI(title="DB Monitor API")
+# Query timings are reported under the endpoint names of the query-plan check
+read_pool = ReadOnlyPool(max_workers=READ_POOL_SIZE,
+                         query_names={sql: name for name, (_, sql, _) in ENDPOINT_QUERIES.items()})
+dashboard_cache = BucketedCache(ttl=DASHBOARD_CACHE_TTL, name="dashboard")
+analytics_cache = BucketedCache(ttl=ANALYTICS_CACHE_TTL, name="analytics")
+
+REQUEST_SECONDS = Histogram("dashboard_http_request_seconds", "API request latency by route",
+                            ["method", "route", "status"])
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    read_pool.close()
+
+app = FastAPI(title="DB Monitor API", lifespan=lifespan, default_response_class=FastJSONResponse)
 
 origins = [
     "http://10.101.1.50:9090",
@@ -39,6 +87,21 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def observe_request(request: Request, call_next):
+    started = time.perf_counter()
+    response = await call_next(request)
+    # The matched route's path template (or mount point, e.g. /static), so series stay bounded
+    route = getattr(request.scope.get("route"), "path", None) or request.scope.get("root_path") or "unmatched"
+    REQUEST_SECONDS.labels(request.method, route, str(response.status_code)).observe(
+        time.perf_counter() - started)
+    return response
+
+@app.get("/internal/metrics")
+async def get_internal_metrics():
+    """The dashboard API's own timings and counters, in Prometheus text format"""
+    return Response(render_instrumentation(), media_type=CONTENT_TYPE)
+
 # Create static directory and mount it
 os.makedirs("static", exist_ok=True)
 app.mount("/static", StaticFiles(directory="static"), name="static")
@@ -46,16 +109,11 @@ app.mount("/static", StaticFiles(directory="static"), name="static")
 # ========================
 # Helpers
 # ========================
-def get_db_connection(db_file: str):
-    conn = sqlite3.connect(db_file)
-    conn.row_factory = sqlite3.Row
-    return conn
-
 def format_datetime(ts: str):
-    try:
-        return datetime.strptime(ts, "%Y-%m-%d %H:%M:%S").strftime("%d-%m-%Y %H:%M:%S")
-    except Exception:
-        return ts
+    """'YYYY-MM-DD HH:MM:SS' -> 'DD-MM-YYYY HH:MM:SS' by slicing; anything else is returned as is"""
+    if isinstance(ts, str) and len(ts) == 19 and ts[4] == "-" and ts[7] == "-" and ts[10] == " ":
+        return f"{ts[8:10]}-{ts[5:7]}-{ts[:4]}{ts[10:]}"
+    return ts
 
 def parse_time_range(range_str: str) -> str:
     """Convert shorthand (10m, 2h, 3d) to SQLite offset string"""
@@ -77,6 +135,74 @@ def parse_time_range(range_str: str) -> str:
     except Exception:
         return "-1 day"
 
+def parse_time_range_seconds(range_str: str) -> int:
+    """Length of a shorthand range (10m, 2h, 3d, 1M) in seconds"""
+    units = {"m": 60, "h": 3600, "d": 86400, "M": 30 * 86400}
+    try:
+        return int(range_str[:-1]) * units[range_str[-1]]
+    except Exception:
+        return 86400
+
+# Rollup resolutions maintained by the collector: (name, bucket seconds, bucket strftime format)
+ROLLUP_RESOLUTIONS = [
+    ("1m", 60, "%Y-%m-%d %H:%M:00"),
+    ("1h", 3600, "%Y-%m-%d %H:00:00"),
+    ("1d", 86400, "%Y-%m-%d 00:00:00"),
+]
+# A range is answered from the coarsest rollup that still splits it into this many buckets
+MIN_ROLLUP_BUCKETS = 24
+
+def pick_resolution(range_str: str, minimum: str = "1m"):
+    """Coarsest rollup resolution that fits the range; returns (name, strftime format)"""
+    seconds = parse_time_range_seconds(range_str)
+    names = [name for name, _, _ in ROLLUP_RESOLUTIONS]
+    chosen = ROLLUP_RESOLUTIONS[names.index(minimum)]
+    for resolution in ROLLUP_RESOLUTIONS[names.index(minimum):]:
+        if seconds / resolution[1] >= MIN_ROLLUP_BUCKETS:
+            chosen = resolution
+    return chosen[0], chosen[2]
+
+# ========================
+# Cursors and ETags
+# ========================
+# Raw-series responses carry a cursor (the newest metrics.id they cover); a
+# client passing it back as ?since= gets only rows appended after it. ETags
+# are derived from the newest row ids, so an unchanged dashboard costs two
+# primary-key lookups and a 304.
+
+def resolution_seconds(resolution: str) -> int:
+    return next(seconds for name, seconds, _ in ROLLUP_RESOLUTIONS if name == resolution)
+
+async def data_version(range_str: str, include_events: bool = False):
+    row = (await read_pool.fetch_all(METRICS_DB_FILE, DATA_VERSION_SQL))[0]
+    version = [row["metrics_id"], row["cluster_id"]]
+    if include_events:
+        try:
+            version.append((await read_pool.fetch_all(DB_LOG_FILE, EVENTS_VERSION_SQL))[0]["events_id"])
+        except sqlite3.OperationalError:
+            version.append(None)
+    # Without new rows the range still slides; rollup panels move one bucket at a time
+    resolution, _ = pick_resolution(range_str)
+    version.append(int(time.time() // resolution_seconds(resolution)))
+    return version
+
+def etag_for(*parts) -> str:
+    return '"' + hashlib.sha1(repr(parts).encode()).hexdigest()[:20] + '"'
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    candidates = [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]
+    return etag in candidates or "*" in candidates
+
+def versioned_response(payload, etag: str):
+    # no-cache: browsers may keep the body but must revalidate with If-None-Match
+    return FastJSONResponse(payload, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+def not_modified_response(etag: str):
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+def newest_id(rows, default):
+    return max((row["id"] for row in rows), default=default)
+
 # ========================
 # HTML Template Route
 # ========================
@@ -92,6 +218,112 @@ async def dashboard():
             status_code=404
         )
 
+# ========================
+# Panel builders
+# ========================
+# Shared by the per-panel endpoints and /api/dashboard, so both return the same shapes
+
+def cluster_summary_panel(rows):
+    clusters = []
+    for row in rows:
+        clusters.append({
+            "db_type": row["db_type"],
+            "status": row["status"].lower(),
+            # Primary and first two replicas; "nodes" has every node of the cluster
+            "master_status": (row["master_status"] or "n/a").lower(),
+            "slave1_status": (row["slave1_status"] or "n/a").lower(),
+            "slave2_status": (row["slave2_status"] or "n/a").lower(),
+            "nodes": {role: status.lower() for role, status in json.loads(row["node_statuses"] or "{}").items()},
+            "timestamp": format_datetime(row["timestamp"])
+        })
+    return {"clusters": clusters}
+
+NO_CLUSTER_STATUS = {
+    "clusters": [],
+    "message": "No cluster status found. Please ensure monitoring data is being collected."
+}
+
+def node_status_panel(rows, range, resolution):
+    nodes = []
+    for row in rows:
+        total = row["total_checks"]
+        up_count = row["up_count"]
+        nodes.append({
+            "db_type": row["db_type"],
+            "role": row["role"],
+            "current_status": row["connection_status"].lower(),
+            "uptime_percentage": round((up_count/total)*100 if total>0 else 0, 2),
+            "total_checks": total,
+            "up_count": up_count,
+            "down_count": total-up_count,
+            "last_check": format_datetime(row["last_check"])
+        })
+    return {"nodes": nodes, "time_range": range, "resolution": resolution}
+
+def cluster_trend_panel(rows, range, resolution):
+    trend_data = {}
+    for row in rows:
+        db = row["db_type"]
+        if db not in trend_data:
+            trend_data[db] = []
+        trend_data[db].append({
+            "timestamp": row["hour_timestamp"],
+            "status": row["status"].lower(),
+            "count": row["status_count"]
+        })
+    return {"trends": trend_data, "time_range": range, "resolution": resolution}
+
+def replication_lag_point(row):
+    return {
+        "db_type": row["db_type"],
+        "role": row["role"],
+        "lag_seconds": row["replication_lag_seconds"],
+        "timestamp": row["timestamp"]
+    }
+
+def replication_lag_panel(series, range, max_points):
+    """Lag points per node ({node: [point]}), each series reduced to max_points with LTTB"""
+    lag_data = []
+    for points in series.values():
+        lag_data.extend(lttb(points, max_points, x=lambda p: to_epoch(p["timestamp"]), y=lambda p: p["lag_seconds"]))
+    lag_data.sort(key=lambda p: p["timestamp"])
+    return {"replication_lag": lag_data, "time_range": range, "max_points": max_points}
+
+def connection_timeline_panel(samples, range, max_points):
+    """Up/down samples per node ({node: [(timestamp, status)]}) as state-change intervals"""
+    timeline_data = {key: coarse_state_intervals(states, max_points) for key, states in samples.items()}
+    return {"timeline": timeline_data, "time_range": range, "encoding": "intervals", "max_points": max_points}
+
+def series_panels(rows, range, max_points):
+    """Replication lag and connection timeline panels from one pass over the raw rows"""
+    lag_series = {}
+    timeline_samples = {}
+    for row in rows:
+        key = f"{row['db_type']}_{row['role']}"
+        if key not in timeline_samples:
+            timeline_samples[key] = []
+        timeline_samples[key].append((row["timestamp"], row["connection_status"].lower()))
+        # Only replicas report a lag, whatever their role is called in the topology
+        if row["replication_lag_seconds"] is not None:
+            lag_series.setdefault(key, []).append(replication_lag_point(row))
+    return (
+        replication_lag_panel(lag_series, range, max_points),
+        connection_timeline_panel(timeline_samples, range, max_points),
+    )
+
+def historical_events_panel(rows, range):
+    events = [
+        {
+            "event": row["event"],
+            "severity": row["severity"].lower(),
+            "timestamp": format_datetime(row["timestamp"])
+        }
+        for row in rows
+    ]
+    return {"events": events, "time_range": range}
+
+NO_EVENTS_TABLE = {"events": [], "message": "No events table found"}
+
 # ========================
 # API Endpoints
 # ========================
@@ -100,44 +332,16 @@ async def dashboard():
 async def get_cluster_summary():
     """Get current cluster status summary"""
     try:
-        conn = get_db_connection(METRICS_DB_FILE)
-        cursor = conn.cursor()
-        
-        # Check if cluster_status table exists
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='cluster_status';")
-        if cursor.fetchone() is None:
-            conn.close()
-            return JSONResponse({
-                "clusters": [],
-                "message": "No cluster_status table found. Please ensure monitoring data is being collected."
-            })
-        
-        cursor.execute("""
-            SELECT db_type, status, master_status, slave1_status, slave2_status, timestamp
-            FROM cluster_status
-            WHERE id IN (
-                SELECT MAX(id) FROM cluster_status GROUP BY db_type
-            )
-            ORDER BY db_type
-        """)
-        
-        clusters = []
-        for row in cursor.fetchall():
-            clusters.append({
-                "db_type": row["db_type"],
-                "status": row["status"].lower(),
-                "master_status": row["master_status"].lower(),
-                "slave1_status": row["slave1_status"].lower(),
-                "slave2_status": row["slave2_status"].lower(),
-                "timestamp": format_datetime(row["timestamp"])
-            })
+        try:
+            rows = await read_pool.fetch_all(METRICS_DB_FILE, CLUSTER_SUMMARY_SQL)
+        except sqlite3.OperationalError:
+            return FastJSONResponse(NO_CLUSTER_STATUS)
         
-        conn.close()
-        return JSONResponse({"clusters": clusters})
+        return FastJSONResponse(cluster_summary_panel(rows))
         
     except Exception as e:
         logger.error(f"Error in cluster-summary: {str(e)}")
-        return JSONResponse({
+        return FastJSONResponse({
             "clusters": [],
             "error": str(e)
         })
@@ -146,36 +350,11 @@ async def get_cluster_summary():
 async def get_node_status(range: str = Query("12h")):
     try:
         offset = parse_time_range(range)
-        conn = get_db_connection(METRICS_DB_FILE)
-        cursor = conn.cursor()
+        resolution, bucket_format = pick_resolution(range)
         
-        cursor.execute(f"""
-            SELECT db_type, role, connection_status,
-                COUNT(*) as total_checks,
-                SUM(CASE WHEN connection_status='up' THEN 1 ELSE 0 END) as up_count,
-                MAX(timestamp) as last_check
-            FROM metrics
-            WHERE timestamp >= datetime('now', '{offset}')
-            GROUP BY db_type, role
-        """)
+        rows = await read_pool.fetch_all(METRICS_DB_FILE, NODE_STATUS_SQL, (resolution, bucket_format, offset))
         
-        nodes = []
-        for row in cursor.fetchall():
-            total = row["total_checks"]
-            up_count = row["up_count"]
-            nodes.append({
-                "db_type": row["db_type"],
-                "role": row["role"],
-                "current_status": row["connection_status"].lower(),
-                "uptime_percentage": round((up_count/total)*100 if total>0 else 0, 2),
-                "total_checks": total,
-                "up_count": up_count,
-                "down_count": total-up_count,
-                "last_check": format_datetime(row["last_check"])
-            })
-        
-        conn.close()
-        return JSONResponse({"nodes": nodes, "time_range": range})
+        return FastJSONResponse(node_status_panel(rows, range, resolution))
         
     except Exception as e:
         logger.error(f"Error in node-status: {str(e)}")
@@ -185,20 +364,9 @@ async def get_node_status(range: str = Query("12h")):
 async def get_uptime_stats(range: str = Query("24h")):
     try:
         offset = parse_time_range(range)
-        conn = get_db_connection(METRICS_DB_FILE)
-        cursor = conn.cursor()
+        resolution, bucket_format = pick_resolution(range)
         
-        cursor.execute(f"""
-            SELECT db_type, role,
-                AVG(uptime_percentage) as avg_uptime,
-                MIN(uptime_percentage) as min_uptime,
-                MAX(uptime_percentage) as max_uptime,
-                COUNT(*) as measurement_count
-            FROM metrics
-            WHERE timestamp >= datetime('now', '{offset}')
-            AND uptime_percentage IS NOT NULL
-            GROUP BY db_type, role
-        """)
+        rows = await read_pool.fetch_all(METRICS_DB_FILE, UPTIME_STATS_SQL, (resolution, bucket_format, offset))
         
         uptime_stats = [
             {
@@ -209,11 +377,10 @@ async def get_uptime_stats(range: str = Query("24h")):
                 "maximum_uptime": round(row["max_uptime"], 2),
                 "measurement_count": row["measurement_count"]
             }
-            for row in cursor.fetchall()
+            for row in rows
         ]
         
-        conn.close()
-        return JSONResponse({"uptime_statistics": uptime_stats, "time_range": range})
+        return FastJSONResponse({"uptime_statistics": uptime_stats, "time_range": range, "resolution": resolution})
         
     except Exception as e:
         logger.error(f"Error in uptime-stats: {str(e)}")
@@ -223,101 +390,76 @@ async def get_uptime_stats(range: str = Query("24h")):
 async def get_cluster_trend(range: str = Query("24h")):
     try:
         offset = parse_time_range(range)
-        conn = get_db_connection(METRICS_DB_FILE)
-        cursor = conn.cursor()
-        
-        cursor.execute(f"""
-            SELECT db_type,
-                strftime('%Y-%m-%d %H:00:00', timestamp) as hour_timestamp,
-                status,
-                COUNT(*) as status_count
-            FROM cluster_status
-            WHERE timestamp >= datetime('now', '{offset}')
-            GROUP BY db_type, hour_timestamp, status
-            ORDER BY hour_timestamp ASC
-        """)
+        # Trend buckets are never finer than one hour
+        resolution, bucket_format = pick_resolution(range, minimum="1h")
         
-        trend_data = {}
-        for row in cursor.fetchall():
-            db = row["db_type"]
-            if db not in trend_data:
-                trend_data[db] = []
-            trend_data[db].append({
-                "timestamp": row["hour_timestamp"],
-                "status": row["status"].lower(),
-                "count": row["status_count"]
-            })
+        rows = await read_pool.fetch_all(METRICS_DB_FILE, CLUSTER_TREND_SQL, (resolution, bucket_format, offset))
         
-        conn.close()
-        return JSONResponse({"trends": trend_data, "time_range": range})
+        return FastJSONResponse(cluster_trend_panel(rows, range, resolution))
         
     except Exception as e:
         logger.error(f"Error in cluster-trend: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/replication-lag")
-async def get_replication_lag(range: str = Query("24h")):
+async def get_replication_lag(
+    request: Request,
+    range: str = Query("24h"),
+    max_points: int = Query(DEFAULT_MAX_POINTS, ge=0),
+    since: Optional[int] = Query(None, ge=0),
+):
     try:
-        offset = parse_time_range(range)
-        conn = get_db_connection(METRICS_DB_FILE)
-        cursor = conn.cursor()
+        etag = etag_for("replication-lag", range, max_points, *await data_version(range))
+        if is_not_modified(request, etag):
+            return not_modified_response(etag)
         
-        cursor.execute(f"""
-            SELECT db_type, role, replication_lag_seconds, timestamp
-            FROM metrics
-            WHERE role IN ('slave1','slave2')
-            AND timestamp >= datetime('now', '{offset}')
-            AND replication_lag_seconds IS NOT NULL
-            ORDER BY timestamp ASC
-        """)
+        offset = parse_time_range(range)
+        if since is None:
+            rows = await read_pool.fetch_all(METRICS_DB_FILE, REPLICATION_LAG_SQL, (offset,))
+        else:
+            rows = await read_pool.fetch_all(METRICS_DB_FILE, REPLICATION_LAG_SINCE_SQL, (since, offset))
         
-        lag_data = [
-            {
-                "db_type": row["db_type"],
-                "role": row["role"],
-                "lag_seconds": row["replication_lag_seconds"],
-                "timestamp": row["timestamp"]
-            }
-            for row in cursor.fetchall()
-        ]
+        lag_series = {}
+        for row in rows:
+            lag_series.setdefault(f"{row['db_type']}_{row['role']}", []).append(replication_lag_point(row))
         
-        conn.close()
-        return JSONResponse({"replication_lag": lag_data, "time_range": range})
+        payload = replication_lag_panel(lag_series, range, max_points)
+        payload.update({"since": since, "cursor": newest_id(rows, since)})
+        return versioned_response(payload, etag)
         
     except Exception as e:
         logger.error(f"Error in replication-lag: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/connection-timeline")
-async def get_connection_timeline(range: str = Query("48h")):
-    """Get connection status timeline for visualization"""
+async def get_connection_timeline(
+    request: Request,
+    range: str = Query("48h"),
+    max_points: int = Query(DEFAULT_MAX_POINTS, ge=0),
+    since: Optional[int] = Query(None, ge=0),
+):
+    """Get connection status timeline for visualization, as up/down intervals per node"""
     try:
-        offset = parse_time_range(range)
-        conn = get_db_connection(METRICS_DB_FILE)
-        cursor = conn.cursor()
+        etag = etag_for("connection-timeline", range, max_points, *await data_version(range))
+        if is_not_modified(request, etag):
+            return not_modified_response(etag)
         
-        cursor.execute(f"""
-            SELECT db_type, role, connection_status,
-                timestamp, strftime('%Y-%m-%d %H:00:00', timestamp) as hour_group
-            FROM metrics
-            WHERE timestamp >= datetime('now', '{offset}')
-            ORDER BY timestamp ASC
-        """)
+        offset = parse_time_range(range)
+        if since is None:
+            rows = await read_pool.fetch_all(METRICS_DB_FILE, CONNECTION_TIMELINE_SQL, (offset,))
+        else:
+            rows = await read_pool.fetch_all(METRICS_DB_FILE, CONNECTION_TIMELINE_SINCE_SQL, (since, offset))
         
-        timeline_data = {}
-        for row in cursor.fetchall():
+        timeline_samples = {}
+        for row in rows:
             key = f"{row['db_type']}_{row['role']}"
-            if key not in timeline_data:
-                timeline_data[key] = []
-            
-            timeline_data[key].append({
-                "timestamp": row["timestamp"],
-                "status": row["connection_status"].lower(),
-                "hour": row["hour_group"]
-            })
+            if key not in timeline_samples:
+                timeline_samples[key] = []
+            timeline_samples[key].append((row["timestamp"], row["connection_status"].lower()))
         
-        conn.close()
-        return JSONResponse({"timeline": timeline_data, "time_range": range})
+        payload = connection_timeline_panel(timeline_samples, range, max_points)
+        payload.update({"since": since, "cursor": newest_id(rows, since)})
+        return versioned_response(payload, etag)
         
     except Exception as e:
         logger.error(f"Error in connection-timeline: {str(e)}")
@@ -327,39 +469,240 @@ async def get_connection_timeline(range: str = Query("48h")):
 async def get_historical_events(range: str = Query("72h")):
     try:
         offset = parse_time_range(range)
-        conn = get_db_connection(DB_LOG_FILE)
-        cursor = conn.cursor()
-
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='events';")
-        if cursor.fetchone() is None:
-            conn.close()
-            return JSONResponse({"events": [], "message": "No events table found"})
-
-        cursor.execute(f"""
-            SELECT event, severity, timestamp
-            FROM events
-            WHERE timestamp >= datetime('now', '{offset}')
-            ORDER BY timestamp DESC
-            LIMIT 100
-        """)
-        
-        rows = cursor.fetchall()
-        events = [
-            {
-                "event": row["event"],
-                "severity": row["severity"].lower(),
-                "timestamp": format_datetime(row["timestamp"])
-            }
-            for row in rows
-        ]
+        try:
+            rows = await read_pool.fetch_all(DB_LOG_FILE, HISTORICAL_EVENTS_SQL, (offset,))
+        except sqlite3.OperationalError:
+            return FastJSONResponse(NO_EVENTS_TABLE)
         
-        conn.close()
-        return JSONResponse({"events": events, "time_range": range})
+        return FastJSONResponse(historical_events_panel(rows, range))
         
     except Exception as e:
         logger.error(f"Error in historical-events: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+# ========================
+# Combined dashboard snapshot
+# ========================
+
+def read_dashboard_metrics(conn, range, max_points, since):
+    """Every metrics.db panel for a range, read inside one transaction on one connection.
+
+    With ``since`` the lag and timeline panels hold only rows after that cursor;
+    the other panels are always complete (they are small aggregates).
+    """
+    offset = parse_time_range(range)
+    resolution, bucket_format = pick_resolution(range)
+    trend_resolution, trend_format = pick_resolution(range, minimum="1h")
+    
+    # A single read transaction pins one WAL snapshot, so the panels agree with each other
+    conn.execute("BEGIN")
+    try:
+        try:
+            summary = cluster_summary_panel(conn.execute(CLUSTER_SUMMARY_SQL).fetchall())
+        except sqlite3.OperationalError:
+            summary = NO_CLUSTER_STATUS
+        node_rows = conn.execute(NODE_STATUS_SQL, (resolution, bucket_format, offset)).fetchall()
+        trend_rows = conn.execute(CLUSTER_TREND_SQL, (trend_resolution, trend_format, offset)).fetchall()
+        if since is None:
+            series_rows = conn.execute(DASHBOARD_SERIES_SQL, (offset,)).fetchall()
+        else:
+            series_rows = conn.execute(DASHBOARD_SERIES_SINCE_SQL, (since, offset)).fetchall()
+        version = conn.execute(DATA_VERSION_SQL).fetchone()
+        range_start = conn.execute("SELECT datetime('now', ?)", (offset,)).fetchone()[0]
+    finally:
+        conn.commit()
+    
+    replication_lag, connection_timeline = series_panels(series_rows, range, max_points)
+    return {
+        "since": since,
+        # Newest id in this snapshot: rows up to it are either included or older than the range
+        "cursor": version["metrics_id"] if version["metrics_id"] is not None else since,
+        "range_start": range_start,
+        "cluster_summary": summary,
+        "node_status": node_status_panel(node_rows, range, resolution),
+        "cluster_trend": cluster_trend_panel(trend_rows, range, trend_resolution),
+        "replication_lag": replication_lag,
+        "connection_timeline": connection_timeline,
+    }
+
+async def read_dashboard_events(range):
+    try:
+        rows = await read_pool.fetch_all(DB_LOG_FILE, HISTORICAL_EVENTS_SQL, (parse_time_range(range),))
+    except sqlite3.OperationalError:
+        return NO_EVENTS_TABLE
+    return historical_events_panel(rows, range)
+
+async def build_dashboard(range, max_points, since):
+    panels, events = await asyncio.gather(
+        read_pool.run(METRICS_DB_FILE, lambda conn: read_dashboard_metrics(conn, range, max_points, since),
+                      "/api/dashboard panels"),
+        read_dashboard_events(range),
+    )
+    return {
+        **panels,
+        "historical_events": events,
+        "time_range": range,
+        "generated_at": datetime.now().strftime("%d-%m-%Y %H:%M:%S"),
+    }
+
+@app.get("/api/dashboard")
+async def get_dashboard(
+    request: Request,
+    range: str = Query("24h"),
+    max_points: int = Query(DEFAULT_MAX_POINTS, ge=0),
+    since: Optional[int] = Query(None, ge=0),
+):
+    """All dashboard panels for one range in a single response, cached per data version"""
+    try:
+        # The ETag names the data version, not the request: a client that already holds
+        # this version gets a 304 whether it asks for the full range or a delta
+        etag = etag_for("dashboard", range, max_points, *await data_version(range, include_events=True))
+        if is_not_modified(request, etag):
+            return not_modified_response(etag)
+        
+        payload = await dashboard_cache.get((etag, since), lambda: build_dashboard(range, max_points, since))
+        return versioned_response(payload, etag)
+        
+    except Exception as e:
+        logger.error(f"Error in dashboard: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+# ========================
+# Analytics (NumPy over whole node series)
+# ========================
+# Computed from every sample in the range, raw and packed, rather than from the
+# stored uptime_percentage snapshots; cached per data version like /api/dashboard
+
+def epoch_timestamp(epoch):
+    return format_datetime(time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(int(epoch))))
+
+def rounded(value, digits=2):
+    return None if value is None else round(value, digits)
+
+def availability_entry(db_type, role, stats):
+    return {
+        "db_type": db_type,
+        "role": role,
+        "uptime_percentage": rounded(stats["uptime"] * 100 if stats["uptime"] is not None else None, 3),
+        "coverage_percentage": rounded(stats["coverage"] * 100),
+        "observed_seconds": round(stats["observed_seconds"]),
+        "downtime_seconds": round(stats["downtime_seconds"]),
+        "outages": stats["outages"],
+        "failures": stats["failures"],
+        "mtbf_seconds": rounded(stats["mtbf_seconds"], 0),
+        "mttr_seconds": rounded(stats["mttr_seconds"], 0),
+        "longest_outage_seconds": rounded(stats["longest_outage_seconds"], 0),
+        "samples": stats["samples"],
+    }
+
+def outage_entries(epochs, up, until):
+    starts, ends, samples, ongoing, _ = outage_intervals(epochs, up, until)
+    return [
+        {
+            "start": epoch_timestamp(start),
+            "end": None if is_ongoing else epoch_timestamp(end),
+            "duration_seconds": int(end - start),
+            "samples": int(count),
+            "ongoing": bool(is_ongoing),
+            "start_epoch": int(start),
+        }
+        for start, end, count, is_ongoing in zip(starts.tolist(), ends.tolist(), samples.tolist(), ongoing.tolist())
+    ]
+
+def lag_entry(db_type, role, stats):
+    percentiles = stats["percentiles"]
+    return {
+        "db_type": db_type,
+        "role": role,
+        "p50_seconds": rounded(percentiles[50], 3),
+        "p95_seconds": rounded(percentiles[95], 3),
+        "p99_seconds": rounded(percentiles[99], 3),
+        "mean_seconds": rounded(stats["mean"], 3),
+        "max_seconds": rounded(stats["max"], 3),
+        "samples": stats["samples"],
+    }
+
+async def analytics_payload(name, request, range, key, build):
+    """ETag/304 handling and caching shared by the analytics endpoints"""
+    etag = etag_for(name, range, *key, *await data_version(range))
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    payload = await analytics_cache.get(etag, build)
+    return versioned_response(payload, etag)
+
+@app.get("/api/analytics/availability")
+async def get_availability(
+    request: Request,
+    range: str = Query("30d"),
+    db_type: Optional[str] = Query(None),
+    role: Optional[str] = Query(None),
+):
+    """Time-weighted uptime, downtime, MTBF and MTTR per node"""
+    async def build():
+        rows = await read_pool.run(METRICS_DB_FILE, lambda conn: read_nodes(
+            conn, parse_time_range(range),
+            lambda epochs, up, lag, since, until: availability(epochs, up, since, until, ANALYTICS_MAX_GAP_SECONDS),
+            db_type, role), "/api/analytics/availability")
+        return {
+            "availability": [availability_entry(node_db_type, node_role, stats) for node_db_type, node_role, stats in rows],
+            "time_range": range,
+            "max_gap_seconds": ANALYTICS_MAX_GAP_SECONDS,
+        }
+    try:
+        return await analytics_payload("availability", request, range, (db_type, role), build)
+    except Exception as e:
+        logger.error(f"Error in analytics availability: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/analytics/outages")
+async def get_outages(
+    request: Request,
+    range: str = Query("30d"),
+    db_type: Optional[str] = Query(None),
+    role: Optional[str] = Query(None),
+    limit: int = Query(100, ge=1, le=10000),
+):
+    """Down intervals of every node, newest first"""
+    async def build():
+        rows = await read_pool.run(METRICS_DB_FILE, lambda conn: read_nodes(
+            conn, parse_time_range(range),
+            lambda epochs, up, lag, since, until: outage_entries(epochs, up, until),
+            db_type, role), "/api/analytics/outages")
+        outages = []
+        for node_db_type, node_role, entries in rows:
+            outages.extend({"db_type": node_db_type, "role": node_role, **entry} for entry in entries)
+        outages.sort(key=lambda entry: entry.pop("start_epoch"), reverse=True)
+        return {"outages": outages[:limit], "total": len(outages), "time_range": range}
+    try:
+        return await analytics_payload("outages", request, range, (db_type, role, limit), build)
+    except Exception as e:
+        logger.error(f"Error in analytics outages: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/analytics/replication-lag")
+async def get_lag_percentiles(
+    request: Request,
+    range: str = Query("7d"),
+    db_type: Optional[str] = Query(None),
+    role: Optional[str] = Query(None),
+):
+    """Time-weighted p50/p95/p99 replication lag per replica"""
+    async def build():
+        rows = await read_pool.run(METRICS_DB_FILE, lambda conn: read_nodes(
+            conn, parse_time_range(range),
+            lambda epochs, up, lag, since, until: lag_percentiles(epochs, lag, until, ANALYTICS_MAX_GAP_SECONDS),
+            db_type, role), "/api/analytics/replication-lag")
+        return {
+            "replication_lag": [lag_entry(node_db_type, node_role, stats)
+                                for node_db_type, node_role, stats in rows if stats is not None],
+            "time_range": range,
+        }
+    try:
+        return await analytics_payload("replication-lag", request, range, (db_type, role), build)
+    except Exception as e:
+        logger.error(f"Error in analytics replication-lag: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 if __name__ == "__main__":
     import uvicorn
     print("Starting Database Monitoring Dashboard...")
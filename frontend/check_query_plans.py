@@ -0,0 +1,70 @@
+"""Assert that every dashboard API query is served by an index.
+
+Runs EXPLAIN QUERY PLAN for each query in queries.ENDPOINT_QUERIES against
+the collector's databases and fails if any plan step is a full scan of a
+table (``SCAN <table>`` with or without an index). Range and key lookups show
+up as ``SEARCH``; scans of CTEs, subquery results and the latest-state
+tables (one row per cluster or node) are fine.
+
+    python check_query_plans.py [metrics.db] [db_log.sqlite]
+
+tests/test_query_plans.py asserts the same on a freshly migrated schema.
+"""
+import re
+import sys
+import sqlite3
+
+from queries import ENDPOINT_QUERIES
+
+METRICS_DB_FILE = "/home/nodetree/Pictures/monitorapp/sqlite_db_data/metrics.db"
+DB_LOG_FILE = "/home/nodetree/Pictures/monitorapp/sqlite_db_data/db_log.sqlite"
+
+# Bounded by the number of clusters/nodes, not by history
+LATEST_STATE_TABLES = {"cluster_current", "node_current"}
+
+
+def derived_names(sql):
+    """Names of CTEs and aliased subqueries, whose scans read already-reduced rows"""
+    ctes = re.findall(r"(?:WITH(?:\s+RECURSIVE)?|,)\s+(\w+)\s*(?:\([^)]*\))?\s+AS\s*\(", sql, re.IGNORECASE)
+    subqueries = re.findall(r"\)\s+AS\s+(\w+)", sql, re.IGNORECASE)
+    return set(ctes) | set(subqueries)
+
+
+def full_scans(conn, sql, params):
+    """Plan steps that scan a whole table or index (table aliases included)"""
+    derived = derived_names(sql)
+    problems = []
+    for _, _, _, detail in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params):
+        words = detail.split()
+        if len(words) < 2 or words[0] != "SCAN":
+            continue
+        if words[1] in derived or words[1] in LATEST_STATE_TABLES or words[1].startswith("(") or words[1] == "CONSTANT":
+            continue
+        problems.append(detail)
+    return problems
+
+
+def check(metrics_db, log_db):
+    databases = {"metrics": sqlite3.connect(metrics_db), "log": sqlite3.connect(log_db)}
+    failures = 0
+    for endpoint, (database, sql, params) in ENDPOINT_QUERIES.items():
+        conn = databases[database]
+        try:
+            problems = full_scans(conn, sql, params)
+        except sqlite3.OperationalError as e:
+            print(f"SKIP  {endpoint}: {e}")
+            continue
+        if problems:
+            failures += 1
+            print(f"FAIL  {endpoint}: {'; '.join(problems)}")
+        else:
+            print(f"OK    {endpoint}")
+    for conn in databases.values():
+        conn.close()
+    return failures
+
+
+if __name__ == "__main__":
+    metrics_db = sys.argv[1] if len(sys.argv) > 1 else METRICS_DB_FILE
+    log_db = sys.argv[2] if len(sys.argv) > 2 else DB_LOG_FILE
+    sys.exit(1 if check(metrics_db, log_db) else 0)
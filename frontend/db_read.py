@@ -0,0 +1,83 @@
+import time
+import asyncio
+import sqlite3
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+from shared.instrumentation import Histogram
+
+QUERY_SECONDS = Histogram("dashboard_query_seconds", "SQLite read time by query", ["query"])
+QUEUE_SECONDS = Histogram("dashboard_query_queue_seconds", "Time a read waited for a free worker thread")
+
+
+class ReadOnlyPool:
+    """Pooled read-only SQLite access for the dashboard API.
+
+    Connections are opened with ``mode=ro`` and ``query_only``, so they never
+    take write locks and read the collector's WAL without blocking it. They
+    are reused across requests, one worker thread at a time. Queries run in a
+    bounded thread pool off the event loop, so a slow history query only
+    occupies a worker instead of stalling every other request.
+    ``query_names`` maps SQL text to the name its timings are reported under.
+    """
+
+    def __init__(self, max_workers=8, query_names=None):
+        self.max_workers = max_workers
+        self.query_names = query_names or {}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="sqlite-read")
+        self._lock = threading.Lock()
+        self._idle = {}  # db_file -> [connection]
+
+    async def run(self, db_file: str, func, name: str = "other"):
+        """Call func(conn) with a pooled connection in a worker thread"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._call, db_file, func, name, time.perf_counter())
+
+    async def fetch_all(self, db_file: str, sql: str, params=()):
+        return await self.run(db_file, lambda conn: conn.execute(sql, params).fetchall(),
+                              self.query_names.get(sql, "other"))
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for conns in idle.values():
+            for conn in conns:
+                conn.close()
+        self._executor.shutdown(wait=False)
+
+    def _call(self, db_file, func, name, submitted):
+        started = time.perf_counter()
+        QUEUE_SECONDS.observe(started - submitted)
+        conn = self._acquire(db_file)
+        try:
+            with QUERY_SECONDS.labels(name).time():
+                result = func(conn)
+        except sqlite3.OperationalError:
+            # e.g. a missing table or a database that was replaced on disk: start afresh next time
+            conn.close()
+            raise
+        except Exception:
+            self._release(db_file, conn)
+            raise
+        self._release(db_file, conn)
+        return result
+
+    def _acquire(self, db_file):
+        with self._lock:
+            conns = self._idle.get(db_file)
+            if conns:
+                return conns.pop()
+        conn = sqlite3.connect(f"{Path(db_file).resolve().as_uri()}?mode=ro", uri=True, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA query_only = ON;")
+        return conn
+
+    def _release(self, db_file, conn):
+        # Each read is its own implicit transaction; nothing stays open between requests
+        with self._lock:
+            conns = self._idle.setdefault(db_file, [])
+            if len(conns) < self.max_workers:
+                conns.append(conn)
+                return
+        conn.close()
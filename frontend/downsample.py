@@ -0,0 +1,103 @@
+from datetime import datetime
+
+
+def to_epoch(timestamp: str) -> float:
+    """Seconds for a stored 'YYYY-MM-DD HH:MM:SS' timestamp (only differences matter here)"""
+    return datetime.fromisoformat(timestamp).timestamp()
+
+
+def lttb_indices(xs, ys, threshold):
+    """Largest-Triangle-Three-Buckets: indices of at most `threshold` points that keep the line's shape.
+
+    The first and last points are always kept. Every bucket in between keeps the
+    point forming the largest triangle with the previously kept point and the
+    average of the next bucket, so spikes survive while flat stretches thin out.
+    """
+    n = len(xs)
+    if threshold <= 0 or n <= threshold:
+        return list(range(n))
+    if threshold < 3:
+        return [0, n - 1][:threshold]
+
+    every = (n - 2) / (threshold - 2)
+    kept = [0]
+    a = 0
+    for i in range(threshold - 2):
+        avg_start = int((i + 1) * every) + 1
+        avg_end = min(max(int((i + 2) * every) + 1, avg_start + 1), n)
+        span = avg_end - avg_start
+        avg_x = sum(xs[avg_start:avg_end]) / span
+        avg_y = sum(ys[avg_start:avg_end]) / span
+
+        ax, ay = xs[a], ys[a]
+        best, best_area = None, -1.0
+        for j in range(int(i * every) + 1, int((i + 1) * every) + 1):
+            area = abs((ax - avg_x) * (ys[j] - ay) - (ax - xs[j]) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        kept.append(best)
+        a = best
+    kept.append(n - 1)
+    return kept
+
+
+def lttb(points, threshold, x, y):
+    """Downsample a time-ordered list of items; x and y extract the coordinates of an item"""
+    if threshold <= 0 or len(points) <= threshold:
+        return points
+    xs = [x(p) for p in points]
+    ys = [y(p) for p in points]
+    return [points[i] for i in lttb_indices(xs, ys, threshold)]
+
+
+def state_intervals(samples):
+    """Run-length encode time-ordered (timestamp, state) samples into state-change intervals.
+
+    Each interval runs from its first sample to the first sample of the next
+    interval (the last one ends at the last sample), so intervals tile the range.
+    """
+    intervals = []
+    for timestamp, state in samples:
+        if intervals and intervals[-1]["status"] == state:
+            intervals[-1]["end"] = timestamp
+            intervals[-1]["samples"] += 1
+            continue
+        if intervals:
+            intervals[-1]["end"] = timestamp
+        intervals.append({"start": timestamp, "end": timestamp, "status": state, "samples": 1})
+    return intervals
+
+
+def coarse_state_intervals(samples, max_intervals, worst="down"):
+    """State intervals limited to about max_intervals, without hiding outages.
+
+    When a flapping node produces more state changes than fit, the range is
+    cut into max_intervals equal time buckets; a bucket is `worst` if any of
+    its samples is, otherwise it takes its last sample's state.
+    """
+    intervals = state_intervals(samples)
+    if max_intervals <= 0 or len(intervals) <= max_intervals:
+        return intervals
+
+    first, last = to_epoch(samples[0][0]), to_epoch(samples[-1][0])
+    width = (last - first) / max_intervals or 1
+    buckets = {}
+    for timestamp, state in samples:
+        index = min(int((to_epoch(timestamp) - first) / width), max_intervals - 1)
+        bucket = buckets.get(index)
+        if bucket is None:
+            buckets[index] = [timestamp, state, 0]
+        elif bucket[1] != worst:
+            bucket[1] = state
+        buckets[index][2] += 1
+
+    coarse = []
+    for timestamp, state, count in (buckets[i] for i in sorted(buckets)):
+        if coarse and coarse[-1]["status"] == state:
+            coarse[-1]["samples"] += count
+            continue
+        if coarse:
+            coarse[-1]["end"] = timestamp
+        coarse.append({"start": timestamp, "end": timestamp, "status": state, "samples": count})
+    coarse[-1]["end"] = samples[-1][0]
+    return coarse
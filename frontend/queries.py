@@ -0,0 +1,182 @@
+# ========================
+# SQL behind the dashboard API endpoints
+# ========================
+# Kept in one place so check_query_plans.py can verify every access path
+# against the live schema with EXPLAIN QUERY PLAN.
+
+# Current state per cluster, maintained by the collector in cluster_current; node_statuses
+# is every node of the cluster as a JSON object {role: status}, from node_current
+CLUSTER_SUMMARY_SQL = """
+    SELECT db_type, status, master_status, slave1_status, slave2_status, timestamp,
+        (SELECT json_group_object(role, connection_status)
+         FROM node_current WHERE node_current.db_type = cluster_current.db_type) as node_statuses
+    FROM cluster_current
+    ORDER BY db_type
+"""
+
+# Range counters come from the rollups; the current status is a primary-key
+# lookup in node_current (falling back to the last status seen in the range)
+NODE_STATUS_SQL = """
+    SELECT r.db_type, r.role,
+        COALESCE(n.connection_status, r.last_status) as connection_status,
+        r.total_checks, r.up_count, r.last_check
+    FROM (
+        SELECT db_type, role, last_status,
+            SUM(samples) as total_checks,
+            SUM(up_count) as up_count,
+            MAX(last_timestamp) as last_check
+        FROM metrics_rollup
+        WHERE resolution = ?
+        AND bucket >= strftime(?, 'now', ?)
+        GROUP BY db_type, role
+    ) AS r
+    LEFT JOIN node_current AS n ON n.db_type = r.db_type AND n.role = r.role
+"""
+
+UPTIME_STATS_SQL = """
+    SELECT db_type, role,
+        SUM(uptime_sum) / SUM(uptime_count) as avg_uptime,
+        MIN(uptime_min) as min_uptime,
+        MAX(uptime_max) as max_uptime,
+        SUM(uptime_count) as measurement_count
+    FROM metrics_rollup
+    WHERE resolution = ?
+    AND bucket >= strftime(?, 'now', ?)
+    GROUP BY db_type, role
+    HAVING SUM(uptime_count) > 0
+"""
+
+CLUSTER_TREND_SQL = """
+    SELECT db_type,
+        bucket as hour_timestamp,
+        status,
+        status_count
+    FROM cluster_status_rollup
+    WHERE resolution = ?
+    AND bucket >= strftime(?, 'now', ?)
+    ORDER BY bucket ASC
+"""
+
+# Raw-series queries return metrics.id, which clients send back as ?since=
+# to fetch only newer rows (the *_SINCE_SQL variants, ordered by id)
+REPLICATION_LAG_SQL = """
+    SELECT id, db_type, role, replication_lag_seconds, timestamp
+    FROM metrics
+    WHERE timestamp >= datetime('now', ?)
+    AND replication_lag_seconds IS NOT NULL
+    ORDER BY timestamp ASC
+"""
+
+REPLICATION_LAG_SINCE_SQL = """
+    SELECT id, db_type, role, replication_lag_seconds, timestamp
+    FROM metrics
+    WHERE id > ?
+    AND timestamp >= datetime('now', ?)
+    AND replication_lag_seconds IS NOT NULL
+    ORDER BY id ASC
+"""
+
+CONNECTION_TIMELINE_SQL = """
+    SELECT id, db_type, role, connection_status, timestamp
+    FROM metrics
+    WHERE timestamp >= datetime('now', ?)
+    ORDER BY timestamp ASC
+"""
+
+CONNECTION_TIMELINE_SINCE_SQL = """
+    SELECT id, db_type, role, connection_status, timestamp
+    FROM metrics
+    WHERE id > ?
+    AND timestamp >= datetime('now', ?)
+    ORDER BY id ASC
+"""
+
+# One pass over the raw range feeds both the replication lag and the
+# connection timeline panels of /api/dashboard; served by idx_metrics_ts_cover
+DASHBOARD_SERIES_SQL = """
+    SELECT id, db_type, role, connection_status, replication_lag_seconds, timestamp
+    FROM metrics
+    WHERE timestamp >= datetime('now', ?)
+    ORDER BY timestamp ASC
+"""
+
+DASHBOARD_SERIES_SINCE_SQL = """
+    SELECT id, db_type, role, connection_status, replication_lag_seconds, timestamp
+    FROM metrics
+    WHERE id > ?
+    AND timestamp >= datetime('now', ?)
+    ORDER BY id ASC
+"""
+
+# Newest row ids: every panel changes only when one of these moves (or the range slides)
+DATA_VERSION_SQL = """
+    SELECT (SELECT MAX(id) FROM metrics) as metrics_id,
+        (SELECT MAX(id) FROM cluster_status) as cluster_id
+"""
+
+EVENTS_VERSION_SQL = "SELECT MAX(id) as events_id FROM events"
+
+HISTORICAL_EVENTS_SQL = """
+    SELECT event, severity, timestamp
+    FROM events
+    WHERE timestamp >= datetime('now', ?)
+    ORDER BY timestamp DESC
+    LIMIT 100
+"""
+
+# ========================
+# Analytics (analytics.py): one node's whole series as arrays
+# ========================
+ANALYTICS_RANGE_SQL = """
+    SELECT CAST(strftime('%s', 'now', ?) AS INTEGER) as since, CAST(strftime('%s', 'now') AS INTEGER) as until
+"""
+
+ANALYTICS_NODES_SQL = "SELECT db_type, role FROM node_current ORDER BY db_type, role"
+
+# Raw samples not yet packed into metric_chunks (ids above the node's packed watermark),
+# already reduced to numbers so they load straight into a NumPy array
+NODE_SERIES_SQL = """
+    SELECT CAST(strftime('%s', timestamp) AS INTEGER) as epoch,
+        LOWER(connection_status) = 'up' as up,
+        replication_lag_seconds IS NOT NULL as has_lag,
+        IFNULL(replication_lag_seconds, 0.0) as lag
+    FROM metrics
+    WHERE db_type = ? AND role = ?
+    AND timestamp >= datetime(?, 'unixepoch')
+    AND id > ?
+    ORDER BY timestamp ASC
+"""
+
+PACKED_WATERMARK_SQL = "SELECT IFNULL(MAX(last_id), 0) FROM metric_chunks WHERE db_type = ? AND role = ?"
+
+PACKED_SERIES_SQL = """
+    SELECT encoding, timestamp, connection_status, replication_lag_seconds
+    FROM metric_chunks
+    WHERE db_type = ? AND role = ?
+    AND end_ts >= ?
+    ORDER BY start_ts ASC
+"""
+
+PACKED_UP_SQL = "SELECT id FROM sample_strings WHERE value = 'up'"
+
+# Endpoint -> (database, SQL, representative parameters) for the query-plan check
+ENDPOINT_QUERIES = {
+    "/api/cluster-summary": ("metrics", CLUSTER_SUMMARY_SQL, ()),
+    "/api/node-status": ("metrics", NODE_STATUS_SQL, ("1h", "%Y-%m-%d %H:00:00", "-1 day")),
+    "/api/uptime-stats": ("metrics", UPTIME_STATS_SQL, ("1h", "%Y-%m-%d %H:00:00", "-1 day")),
+    "/api/cluster-trend": ("metrics", CLUSTER_TREND_SQL, ("1h", "%Y-%m-%d %H:00:00", "-1 day")),
+    "/api/replication-lag": ("metrics", REPLICATION_LAG_SQL, ("-1 day",)),
+    "/api/connection-timeline": ("metrics", CONNECTION_TIMELINE_SQL, ("-2 days",)),
+    "/api/historical-events": ("log", HISTORICAL_EVENTS_SQL, ("-3 days",)),
+    "/api/dashboard": ("metrics", DASHBOARD_SERIES_SQL, ("-1 day",)),
+    "/api/replication-lag?since": ("metrics", REPLICATION_LAG_SINCE_SQL, (0, "-1 day")),
+    "/api/connection-timeline?since": ("metrics", CONNECTION_TIMELINE_SINCE_SQL, (0, "-2 days")),
+    "/api/dashboard?since": ("metrics", DASHBOARD_SERIES_SINCE_SQL, (0, "-1 day")),
+    "/api/analytics nodes": ("metrics", ANALYTICS_NODES_SQL, ()),
+    "/api/analytics raw series": ("metrics", NODE_SERIES_SQL, ("postgres", "slave1", 0, 0)),
+    "/api/analytics packed watermark": ("metrics", PACKED_WATERMARK_SQL, ("postgres", "slave1")),
+    "/api/analytics packed series": ("metrics", PACKED_SERIES_SQL, ("postgres", "slave1", 0)),
+    "/api/analytics packed dictionary": ("metrics", PACKED_UP_SQL, ()),
+    "ETag version": ("metrics", DATA_VERSION_SQL, ()),
+    "ETag version (events)": ("log", EVENTS_VERSION_SQL, ()),
+}
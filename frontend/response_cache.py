@@ -0,0 +1,56 @@
+import time
+import asyncio
+
+from shared.instrumentation import Counter
+
+LOOKUPS = Counter("dashboard_cache_lookups_total",
+                  "Payload cache lookups: hit (computed), shared (computation in flight) or miss",
+                  ["cache", "result"])
+
+
+class BucketedCache:
+    """Caches computed API payloads per (key, time bucket).
+
+    Time is cut into ``ttl``-second buckets; every request for the same key in
+    the same bucket gets the same payload, and a new bucket starts a fresh
+    computation. Concurrent misses share one in-flight computation instead of
+    each hitting the database. Failed computations are not cached.
+    """
+
+    def __init__(self, ttl=30, max_entries=64, name="default"):
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = {}  # (key, bucket) -> asyncio.Future
+
+    def bucket(self, now=None):
+        return int((time.time() if now is None else now) // self.ttl)
+
+    async def get(self, key, compute):
+        """Payload for key in the current bucket; compute() is an async callable run on a miss"""
+        entry_key = (key, self.bucket())
+        future = self._entries.get(entry_key)
+        if future is not None:
+            LOOKUPS.labels(self.name, "hit" if future.done() else "shared").inc()
+        else:
+            LOOKUPS.labels(self.name, "miss").inc()
+            future = asyncio.ensure_future(compute())
+            self._entries[entry_key] = future
+            future.add_done_callback(lambda f: self._forget_failed(entry_key, f))
+            self._prune(entry_key[1])
+        # shield: a client disconnecting must not cancel the computation other requests wait on
+        return await asyncio.shield(future)
+
+    def clear(self):
+        self._entries.clear()
+
+    def _forget_failed(self, entry_key, future):
+        if future.cancelled() or future.exception() is not None:
+            if self._entries.get(entry_key) is future:
+                del self._entries[entry_key]
+
+    def _prune(self, current_bucket):
+        for entry_key in [k for k in self._entries if k[1] < current_bucket]:
+            del self._entries[entry_key]
+        while len(self._entries) > self.max_entries:
+            del self._entries[next(iter(self._entries))]
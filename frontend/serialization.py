@@ -0,0 +1,23 @@
+import json
+from fastapi.responses import JSONResponse
+
+from shared.json_backend import orjson, msgspec, JSON_BACKEND, finite
+
+
+def dumps(content) -> bytes:
+    if JSON_BACKEND == "orjson":
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    if JSON_BACKEND == "msgspec":
+        return msgspec.json.encode(content)
+    try:
+        return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+    except ValueError:
+        # NaN or Infinity somewhere: null, as orjson and msgspec write them
+        return json.dumps(finite(content), ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with the configured backend (orjson/msgspec/stdlib)"""
+
+    def render(self, content) -> bytes:
+        return dumps(content)
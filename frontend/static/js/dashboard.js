@@ -3,10 +3,20 @@ let autoRefreshInterval = null;
 let isAutoRefreshEnabled = false;
 let lastRealTimeCheck = null;
 
+// Version of the historical data on screen: refreshes ask only for rows after the cursor
+let dashboardCursor = null;
+let dashboardEtag = null;
+let dashboardRange = null;
+
+// Flask collector: /metrics for polling, /events/stream for pushed updates
+const COLLECTOR_URL = "http://10.101.1.50:5000";
+let liveSource = null;
+
 // Initialize dashboard
 document.addEventListener("DOMContentLoaded", function () {
   checkRealTimeStatus(); // Check live status first
   loadHistoricalData(); // Then load historical data
+  connectLiveUpdates(); // Then follow pushed updates, if the browser supports them
 
   // Time range change handler
   document.getElementById("timeRange").addEventListener("change", function () {
@@ -120,7 +130,7 @@ async function checkRealTimeStatus() {
 
     // const response = await fetch('http://127.0.0.1:8000/metrics');
 
-    const response = await fetch("http://10.101.1.50:5000/metrics", {
+    const response = await fetch(`${COLLECTOR_URL}/metrics`, {
       method: "GET",
       headers: {
         Accept: "application/json",
@@ -135,130 +145,249 @@ async function checkRealTimeStatus() {
     }
     const data = await response.json();
 
+    renderRealTimeStatus(data);
+  } catch (error) {
+    console.error("Error checking real-time status:", error);
+    showRealTimeStatusError();
+  }
+}
+
+function renderRealTimeStatus(data) {
+  try {
     const liveStatusContainer = document.getElementById("liveClusterStatus");
     liveStatusContainer.innerHTML = "";
 
     lastRealTimeCheck = new Date().toLocaleString();
 
-    // Check if the expected data structure exists
-    if (!data.postgres_cluster || !data.mysql_cluster) {
+    // One "<name>_cluster" entry per cluster in the collector's topology
+    const clusterKeys = Object.keys(data).filter((key) => key.endsWith("_cluster"));
+    if (clusterKeys.length === 0) {
       throw new Error("Invalid data structure received from server");
     }
 
-    // PostgreSQL Cluster
-    const pgStatus = data.postgres_cluster.status;
-    const pgItem = document.createElement("div");
-    pgItem.className = "cluster-status-card";
-    pgItem.innerHTML = `
-        <div class="real-time-status">
-            <div>
-                <div class="cluster-name">
-                    PostgreSQL Cluster
-                    <span class="status-indicator ${pgStatus}"></span>
-                </div>
-                <div class="last-check">Last checked: ${lastRealTimeCheck}</div>
-            </div>
-            <div class="status-item status-${pgStatus}">
-                ${pgStatus.toUpperCase()}
-            </div>
-        </div>
-        <div class="node-status-details">
-            <div class="node-status-item">
-                <span class="node-name">Master:</span>
-                <span class="node-status-badge status-${data.postgres_cluster.master_node.connection_status}">
-                    ${data.postgres_cluster.master_node.connection_status.toUpperCase()}
-                </span>
-            </div>
+    clusterKeys.forEach((clusterKey, index) => {
+      const cluster = data[clusterKey];
+      const name = clusterKey.slice(0, -"_cluster".length);
+      const roles = cluster.nodes || ["master", "slave1", "slave2"];
+      const item = document.createElement("div");
+      item.className = "cluster-status-card";
+      if (index > 0) {
+        item.style.marginTop = "15px";
+      }
+      const nodeItems = roles
+        .map((role) => {
+          const status = cluster[`${role}_node`].connection_status;
+          return `
             <div class="node-status-item">
-                <span class="node-name">Slave1:</span>
-                <span class="node-status-badge status-${data.postgres_cluster.slave1_node.connection_status}">
-                    ${data.postgres_cluster.slave1_node.connection_status.toUpperCase()}
-                </span>
-            </div>
-            <div class="node-status-item">
-                <span class="node-name">Slave2:</span>
-                <span class="node-status-badge status-${data.postgres_cluster.slave2_node.connection_status}">
-                    ${data.postgres_cluster.slave2_node.connection_status.toUpperCase()}
-                </span>
-            </div>
-        </div>
-    `;
-    liveStatusContainer.appendChild(pgItem);
-
-    // MySQL Cluster
-    const mysqlStatus = data.mysql_cluster.status;
-    const mysqlItem = document.createElement("div");
-    mysqlItem.className = "cluster-status-card";
-    mysqlItem.style.marginTop = "15px";
-        mysqlItem.innerHTML = `
+                <span class="node-name">${role.charAt(0).toUpperCase() + role.slice(1)}:</span>
+                <span class="node-status-badge status-${status}">${status.toUpperCase()}</span>
+            </div>`;
+        })
+        .join("");
+      item.innerHTML = `
         <div class="real-time-status">
             <div>
                 <div class="cluster-name">
-                    MySQL Cluster
-                    <span class="status-indicator ${mysqlStatus}"></span>
+                    ${clusterDisplayName(name, cluster.engine)}
+                    <span class="status-indicator ${cluster.status}"></span>
                 </div>
                 <div class="last-check">Last checked: ${lastRealTimeCheck}</div>
             </div>
-            <div class="status-item status-${mysqlStatus}">
-                ${mysqlStatus.toUpperCase()}
+            <div class="status-item status-${cluster.status}">
+                ${cluster.status.toUpperCase()}
             </div>
         </div>
-        <div class="node-status-details">
-            <div class="node-status-item">
-                <span class="node-name">Master:</span>
-                <span class="node-status-badge status-${data.mysql_cluster.master_node.connection_status}">${data.mysql_cluster.master_node.connection_status.toUpperCase()}</span>
-            </div>
-            <div class="node-status-item">
-                <span class="node-name">Slave1:</span>
-                <span class="node-status-badge status-${data.mysql_cluster.slave1_node.connection_status}">${data.mysql_cluster.slave1_node.connection_status.toUpperCase()}</span>
-            </div>
-            <div class="node-status-item">
-                <span class="node-name">Slave2:</span>
-                <span class="node-status-badge status-${data.mysql_cluster.slave2_node.connection_status}">${data.mysql_cluster.slave2_node.connection_status.toUpperCase()}</span>
-            </div>
+        <div class="node-status-details">${nodeItems}
         </div>
     `;
-
-    liveStatusContainer.appendChild(mysqlItem);
+      liveStatusContainer.appendChild(item);
+    });
 
     document.getElementById("realTimeStatusLoading").style.display = "none";
     document.getElementById("realTimeStatus").style.display = "block";
   } catch (error) {
-    console.error("Error checking real-time status:", error);
-    const liveStatusContainer = document.getElementById("liveClusterStatus");
-    liveStatusContainer.innerHTML = `
-                    <div class="connection-error">
-                        <h3>Connection Error</h3>
-                        <p>Unable to check live cluster status</p>
-                        <small>Check if the monitoring backend is running</small>
-                    </div>
-                `;
-    document.getElementById("realTimeStatusLoading").style.display = "none";
-    document.getElementById("realTimeStatus").style.display = "block";
+    console.error("Error rendering real-time status:", error);
+    showRealTimeStatusError();
   }
 }
 
-async function loadHistoricalData() {
-  const timeRange = document.getElementById("timeRange").value;
+function clusterDisplayName(name, engine) {
+  const engines = { postgres: "PostgreSQL", mysql: "MySQL" };
+  const label = engines[engine || name] || (engine || name);
+  // Default clusters are named after their engine; others show their own name too
+  return !engine || name === engine ? `${label} Cluster` : `${name} (${label})`;
+}
+
+function showRealTimeStatusError() {
+  const liveStatusContainer = document.getElementById("liveClusterStatus");
+  liveStatusContainer.innerHTML = `
+                  <div class="connection-error">
+                      <h3>Connection Error</h3>
+                      <p>Unable to check live cluster status</p>
+                      <small>Check if the monitoring backend is running</small>
+                  </div>
+              `;
+  document.getElementById("realTimeStatusLoading").style.display = "none";
+  document.getElementById("realTimeStatus").style.display = "block";
+}
 
-  await Promise.all([
-    loadClusterStatus(),
-    loadNodeStatus(timeRange),
-    loadClusterTrend(timeRange),
-    loadReplicationLag(timeRange),
-    loadConnectionTimeline(timeRange),
-    loadHistoricalEvents(timeRange),
-  ]);
+// Pushed updates from the collector: "snapshot" carries the live cluster status,
+// "cycle" means a poll cycle committed new history rows. EventSource reconnects by
+// itself; while it is down, auto refresh (if enabled) falls back to polling.
+function connectLiveUpdates() {
+  if (!window.EventSource) {
+    return;
+  }
+  liveSource = new EventSource(`${COLLECTOR_URL}/events/stream`);
+
+  liveSource.addEventListener("snapshot", (event) => {
+    renderRealTimeStatus(JSON.parse(event.data));
+  });
+  liveSource.addEventListener("cycle", () => {
+    loadHistoricalData(true);
+  });
+  liveSource.onopen = updateAutoRefreshStatus;
+  liveSource.onerror = updateAutoRefreshStatus;
 }
 
-async function loadClusterStatus() {
+function isLiveConnected() {
+  return liveSource !== null && liveSource.readyState === EventSource.OPEN;
+}
+
+function updateAutoRefreshStatus() {
+  const statusSpan = document.getElementById("autoRefreshStatus");
+  if (!isAutoRefreshEnabled) {
+    statusSpan.textContent = "OFF";
+  } else if (isLiveConnected()) {
+    statusSpan.textContent = "ON (live)";
+  } else {
+    statusSpan.textContent = "ON (30s)";
+  }
+}
+
+// One request per refresh: /api/dashboard returns every panel for the range.
+// Incremental refreshes send the last cursor and ETag: an unchanged dashboard
+// answers 304, otherwise only new lag/timeline rows come back and are appended.
+async function loadHistoricalData(incremental = false) {
+  const timeRange = document.getElementById("timeRange").value;
+  const budget = chartPointBudget();
+  const append =
+    incremental &&
+    dashboardCursor !== null &&
+    dashboardRange === timeRange &&
+    charts.replicationLag &&
+    charts.connectionTimeline;
+
+  let url = `/api/dashboard?range=${timeRange}&max_points=${budget}`;
+  const headers = {};
+  if (append) {
+    url += `&since=${dashboardCursor}`;
+    if (dashboardEtag) {
+      headers["If-None-Match"] = dashboardEtag;
+    }
+  } else {
+    showPanelLoading();
+  }
+
+  let data;
   try {
-    document.getElementById("clusterStatusLoading").style.display = "flex";
-    document.getElementById("clusterStatus").style.display = "none";
+    // no-store: revalidation is handled here, not by the browser cache
+    const response = await fetch(url, { headers, cache: "no-store" });
+    if (response.status === 304) {
+      return;
+    }
+    if (!response.ok) {
+      throw new Error(`HTTP ${response.status}`);
+    }
+    data = await response.json();
+    dashboardEtag = response.headers.get("ETag");
+  } catch (error) {
+    console.error("Error loading dashboard data:", error);
+    dashboardCursor = null;
+    showClusterStatusError();
+    showNodeStatusError();
+    showHistoricalEventsError();
+    return;
+  }
 
-    const response = await fetch("/api/cluster-summary");
-    const data = await response.json();
+  dashboardCursor = data.cursor;
+  dashboardRange = timeRange;
+
+  renderClusterStatus(data.cluster_summary);
+  renderNodeStatus(data.node_status, timeRange);
+  renderClusterTrend(data.cluster_trend, timeRange);
+  renderHistoricalEvents(data.historical_events);
+
+  if (!append) {
+    renderReplicationLag(data.replication_lag);
+    renderConnectionTimeline(data.connection_timeline);
+    return;
+  }
+
+  const appended =
+    appendReplicationLag(data.replication_lag, data.range_start, budget) &&
+    appendConnectionTimeline(data.connection_timeline, data.range_start);
+  if (!appended) {
+    // A new series appeared or the appended points outgrew the budget: reload in full
+    dashboardCursor = null;
+    await loadHistoricalData();
+  }
+}
+
+// Series are downsampled server-side to roughly one point per horizontal pixel
+function chartPointBudget() {
+  const canvas = document.getElementById("replicationLagChart");
+  const width = canvas ? canvas.clientWidth : 0;
+  return Math.max(200, Math.round(width * (window.devicePixelRatio || 1)));
+}
 
+function showPanelLoading() {
+  document.getElementById("clusterStatusLoading").style.display = "flex";
+  document.getElementById("clusterStatus").style.display = "none";
+  document.getElementById("nodeStatusLoading").style.display = "flex";
+  document.getElementById("nodeStatus").style.display = "none";
+  document.getElementById("eventsLoading").style.display = "flex";
+  document.getElementById("historicalEvents").style.display = "none";
+}
+
+function showClusterStatusError() {
+  const statusGrid = document.getElementById("clusterStatusGrid");
+  statusGrid.innerHTML = `
+                    <div class="connection-error">
+                        <h3>Error Loading Historical Data</h3>
+                        <p>Unable to load historical cluster status</p>
+                    </div>
+                `;
+  document.getElementById("clusterStatusLoading").style.display = "none";
+  document.getElementById("clusterStatus").style.display = "block";
+}
+
+function showNodeStatusError() {
+  document.getElementById("nodeStatusList").innerHTML =
+    '<div class="connection-error">Error loading node statistics</div>';
+  document.getElementById("nodeStatusLoading").style.display = "none";
+  document.getElementById("nodeStatus").style.display = "block";
+}
+
+function showHistoricalEventsError() {
+  document.getElementById("eventsList").innerHTML =
+    '<div class="connection-error">Error loading events</div>';
+  document.getElementById("eventsLoading").style.display = "none";
+  document.getElementById("historicalEvents").style.display = "block";
+}
+
+function clusterNodeLines(cluster) {
+  const nodes =
+    cluster.nodes && Object.keys(cluster.nodes).length > 0
+      ? cluster.nodes
+      : { master: cluster.master_status, slave1: cluster.slave1_status, slave2: cluster.slave2_status };
+  return Object.keys(nodes)
+    .map((role) => `${role.charAt(0).toUpperCase() + role.slice(1)}: ${nodes[role]}`)
+    .join("<br>");
+}
+
+function renderClusterStatus(data) {
+  try {
     const statusGrid = document.getElementById("clusterStatusGrid");
     statusGrid.innerHTML = "";
 
@@ -271,9 +400,7 @@ async function loadClusterStatus() {
                             <h3>${cluster.db_type.toUpperCase()} (Historical)</h3>
                             <div style="font-size: 1.2rem; font-weight: bold;">${cluster.status.toUpperCase()}</div>
                             <div style="font-size: 0.9rem; margin-top: 8px;">
-                                Master: ${cluster.master_status}<br>
-                                Slave1: ${cluster.slave1_status}<br>
-                                Slave2: ${cluster.slave2_status}
+                                ${clusterNodeLines(cluster)}
                             </div>
                             <div style="font-size: 0.8rem; margin-top: 8px; opacity: 0.8;">
                                 Last recorded: ${cluster.timestamp}
@@ -295,27 +422,13 @@ async function loadClusterStatus() {
     document.getElementById("clusterStatusLoading").style.display = "none";
     document.getElementById("clusterStatus").style.display = "block";
   } catch (error) {
-    console.error("Error loading historical cluster status:", error);
-    const statusGrid = document.getElementById("clusterStatusGrid");
-    statusGrid.innerHTML = `
-                    <div class="connection-error">
-                        <h3>Error Loading Historical Data</h3>
-                        <p>Unable to load historical cluster status</p>
-                    </div>
-                `;
-    document.getElementById("clusterStatusLoading").style.display = "none";
-    document.getElementById("clusterStatus").style.display = "block";
+    console.error("Error rendering historical cluster status:", error);
+    showClusterStatusError();
   }
 }
 
-async function loadNodeStatus(timeRange) {
+function renderNodeStatus(data, timeRange) {
   try {
-    document.getElementById("nodeStatusLoading").style.display = "flex";
-    document.getElementById("nodeStatus").style.display = "none";
-
-    const response = await fetch(`/api/node-status?range=${timeRange}`);
-    const data = await response.json();
-
     const nodeList = document.getElementById("nodeStatusList");
     nodeList.innerHTML = "";
 
@@ -354,25 +467,15 @@ async function loadNodeStatus(timeRange) {
     document.getElementById("nodeStatusLoading").style.display = "none";
     document.getElementById("nodeStatus").style.display = "block";
   } catch (error) {
-    console.error("Error loading node status:", error);
-    document.getElementById("nodeStatusList").innerHTML =
-      '<div class="connection-error">Error loading node statistics</div>';
-    document.getElementById("nodeStatusLoading").style.display = "none";
-    document.getElementById("nodeStatus").style.display = "block";
+    console.error("Error rendering node status:", error);
+    showNodeStatusError();
   }
 }
 
-async function loadClusterTrend(timeRange) {
+function renderClusterTrend(data, timeRange) {
   try {
-    const response = await fetch(`/api/cluster-trend?range=${timeRange}`);
-    const data = await response.json();
-
     const ctx = document.getElementById("clusterTrendChart").getContext("2d");
 
-    if (charts.clusterTrend) {
-      charts.clusterTrend.destroy();
-    }
-
     const datasets = [];
     const colors = {
       postgres: {
@@ -421,6 +524,21 @@ async function loadClusterTrend(timeRange) {
       });
     }
 
+    const title = `Historical Status Distribution (${timeRange})`;
+
+    if (charts.clusterTrend) {
+      const chart = charts.clusterTrend;
+      chart.data.labels = datasets.map((d) => d.label);
+      Object.assign(chart.data.datasets[0], {
+        data: datasets.map((d) => d.data[0]),
+        backgroundColor: datasets.map((d) => d.backgroundColor),
+        borderColor: datasets.map((d) => d.borderColor),
+      });
+      chart.options.plugins.title.text = title;
+      chart.update();
+      return;
+    }
+
     charts.clusterTrend = new Chart(ctx, {
       type: "doughnut",
       data: {
@@ -443,21 +561,18 @@ async function loadClusterTrend(timeRange) {
           },
           title: {
             display: true,
-            text: `Historical Status Distribution (${timeRange})`,
+            text: title,
           },
         },
       },
     });
   } catch (error) {
-    console.error("Error loading cluster trend:", error);
+    console.error("Error rendering cluster trend:", error);
   }
 }
 
-async function loadReplicationLag(timeRange) {
+function renderReplicationLag(data) {
   try {
-    const response = await fetch(`/api/replication-lag?range=${timeRange}`);
-    const data = await response.json();
-
     const ctx = document.getElementById("replicationLagChart").getContext("2d");
 
     if (charts.replicationLag) {
@@ -493,6 +608,7 @@ async function loadReplicationLag(timeRange) {
     Object.keys(groupedData).forEach((key) => {
       datasets.push({
         label: key.replace("_", " ").toUpperCase(),
+        nodeKey: key,
         data: groupedData[key],
         borderColor: colors[colorIndex % colors.length],
         backgroundColor: colors[colorIndex % colors.length] + "20",
@@ -549,15 +665,12 @@ async function loadReplicationLag(timeRange) {
       },
     });
   } catch (error) {
-    console.error("Error loading replication lag:", error);
+    console.error("Error rendering replication lag:", error);
   }
 }
 
-async function loadConnectionTimeline(timeRange) {
+function renderConnectionTimeline(data) {
   try {
-    const response = await fetch(`/api/connection-timeline?range=${timeRange}`);
-    const data = await response.json();
-
     const ctx = document
       .getElementById("connectionTimelineChart")
       .getContext("2d");
@@ -578,18 +691,16 @@ async function loadConnectionTimeline(timeRange) {
 
     if (data.timeline && Object.keys(data.timeline).length > 0) {
       Object.keys(data.timeline).forEach((nodeKey) => {
-        const nodeData = data.timeline[nodeKey];
-        const chartData = nodeData.map((item) => ({
-          x: item.timestamp,
-          y: item.status === "up" ? 1 : 0,
-        }));
+        const intervals = data.timeline[nodeKey];
 
         datasets.push({
           label: nodeKey.replace("_", " ").toUpperCase(),
-          data: chartData,
+          nodeKey: nodeKey,
+          intervals: intervals,
+          data: intervalPoints(intervals),
           borderColor: colors[nodeKey] || "#666",
           backgroundColor: (colors[nodeKey] || "#666") + "40",
-          stepped: true,
+          stepped: "after",
           fill: false,
           tension: 0,
         });
@@ -650,18 +761,85 @@ async function loadConnectionTimeline(timeRange) {
       },
     });
   } catch (error) {
-    console.error("Error loading connection timeline:", error);
+    console.error("Error rendering connection timeline:", error);
   }
 }
 
-async function loadHistoricalEvents(timeRange) {
-  try {
-    document.getElementById("eventsLoading").style.display = "flex";
-    document.getElementById("historicalEvents").style.display = "none";
+// Each interval holds one state from start to end; close the line at the last end
+function intervalPoints(intervals) {
+  const points = intervals.map((interval) => ({
+    x: interval.start,
+    y: interval.status === "up" ? 1 : 0,
+  }));
+  if (intervals.length > 0) {
+    const last = intervals[intervals.length - 1];
+    points.push({ x: last.end, y: last.status === "up" ? 1 : 0 });
+  }
+  return points;
+}
 
-    const response = await fetch(`/api/historical-events?range=${timeRange}`);
-    const data = await response.json();
+// Append delta rows to the existing charts; false means a full reload is needed
+function appendReplicationLag(data, rangeStart, budget) {
+  const chart = charts.replicationLag;
+  const byKey = {};
+  chart.data.datasets.forEach((dataset) => {
+    if (dataset.nodeKey) byKey[dataset.nodeKey] = dataset;
+  });
+
+  for (const item of data.replication_lag || []) {
+    const dataset = byKey[`${item.db_type}_${item.role}`];
+    if (!dataset) return false;
+    dataset.data.push({ x: item.timestamp, y: item.lag_seconds });
+  }
+
+  for (const dataset of Object.values(byKey)) {
+    // Timestamps are "YYYY-MM-DD HH:MM:SS", so string order is time order
+    const firstInRange = dataset.data.findIndex((point) => point.x >= rangeStart);
+    dataset.data.splice(0, firstInRange === -1 ? dataset.data.length : firstInRange);
+    if (dataset.data.length > budget * 2) return false;
+  }
+
+  chart.update("none");
+  return true;
+}
 
+function appendConnectionTimeline(data, rangeStart) {
+  const chart = charts.connectionTimeline;
+  const byKey = {};
+  chart.data.datasets.forEach((dataset) => {
+    if (dataset.nodeKey) byKey[dataset.nodeKey] = dataset;
+  });
+
+  for (const nodeKey of Object.keys(data.timeline || {})) {
+    const dataset = byKey[nodeKey];
+    if (!dataset) return false;
+    const intervals = dataset.intervals;
+    data.timeline[nodeKey].forEach((interval) => {
+      const last = intervals[intervals.length - 1];
+      if (last && last.status === interval.status) {
+        last.end = interval.end;
+        last.samples += interval.samples;
+      } else {
+        if (last) last.end = interval.start;
+        intervals.push({ ...interval });
+      }
+    });
+  }
+
+  for (const dataset of Object.values(byKey)) {
+    const intervals = dataset.intervals;
+    while (intervals.length > 1 && intervals[0].end < rangeStart) {
+      intervals.shift();
+    }
+    dataset.data = intervalPoints(intervals);
+  }
+
+  chart.update("none");
+  return true;
+}
+
+function renderHistoricalEvents(data) {
+  try {
     const eventsList = document.getElementById("eventsList");
     eventsList.innerHTML = "";
 
@@ -684,18 +862,15 @@ async function loadHistoricalEvents(timeRange) {
     document.getElementById("eventsLoading").style.display = "none";
     document.getElementById("historicalEvents").style.display = "block";
   } catch (error) {
-    console.error("Error loading historical events:", error);
-    document.getElementById("eventsList").innerHTML =
-      '<div class="connection-error">Error loading events</div>';
-    document.getElementById("eventsLoading").style.display = "none";
-    document.getElementById("historicalEvents").style.display = "block";
+    console.error("Error rendering historical events:", error);
+    showHistoricalEventsError();
   }
 }
 
 function refreshDashboard() {
   showRefreshIndicator();
   checkRealTimeStatus();
-  loadHistoricalData();
+  loadHistoricalData(true);
 }
 
 function showRefreshIndicator() {
@@ -707,19 +882,19 @@ function showRefreshIndicator() {
 }
 
 function toggleAutoRefresh() {
-  const statusSpan = document.getElementById("autoRefreshStatus");
-
   if (isAutoRefreshEnabled) {
     clearInterval(autoRefreshInterval);
     isAutoRefreshEnabled = false;
-    statusSpan.textContent = "OFF";
   } else {
     autoRefreshInterval = setInterval(() => {
-      refreshDashboard();
+      // Pushed updates already keep the dashboard current; poll only without them
+      if (!isLiveConnected()) {
+        refreshDashboard();
+      }
     }, 30000); // Refresh every 30 seconds
     isAutoRefreshEnabled = true;
-    statusSpan.textContent = "ON (30s)";
   }
+  updateAutoRefreshStatus();
 }
 
 // Cleanup on page unload
@@ -727,6 +902,9 @@ window.addEventListener("beforeunload", function () {
   if (autoRefreshInterval) {
     clearInterval(autoRefreshInterval);
   }
+  if (liveSource) {
+    liveSource.close();
+  }
 
   Object.values(charts).forEach((chart) => {
     if (chart) chart.destroy();
@@ -0,0 +1 @@
+"""Modules used by both the collector (backend/) and the dashboard API (frontend/)"""
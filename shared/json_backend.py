@@ -0,0 +1,40 @@
+import os
+import math
+import logging
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+logger = logging.getLogger(__name__)
+
+
+def pick_backend(preferred):
+    available = {"orjson": orjson is not None, "msgspec": msgspec is not None, "stdlib": True}
+    if preferred != "auto":
+        if available.get(preferred):
+            return preferred
+        logger.warning(f"JSON backend {preferred!r} is not installed, falling back")
+    return next(name for name in ("orjson", "msgspec", "stdlib") if available[name])
+
+
+def finite(obj):
+    """obj with NaN and infinite floats replaced by None: the null orjson and msgspec write for them"""
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+    if isinstance(obj, dict):
+        return {key: finite(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [finite(value) for value in obj]
+    return obj
+
+
+# JSON_BACKEND=auto picks the fastest installed encoder: orjson, then msgspec, then the stdlib.
+# Each app's serialization module encodes with the backend picked here.
+JSON_BACKEND = pick_backend(os.getenv("JSON_BACKEND", "auto"))
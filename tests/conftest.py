@@ -0,0 +1,61 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# The collector's and the dashboard API's modules are imported by name, as each app does;
+# the smoke tests serve them through the benchmark harness. The root holds the shared/ package.
+# Of the two serialization modules, the name resolves to the collector's (backend/ goes first).
+sys.path.insert(0, ROOT)
+for directory in ("benchmarks", "frontend", "backend"):
+    sys.path.insert(0, os.path.join(ROOT, directory))
+
+
+@pytest.fixture
+def writer():
+    from sqlite_writer import SQLiteWriter
+    writer = SQLiteWriter()
+    yield writer
+    writer.close()
+
+
+@pytest.fixture(scope="session")
+def loaded_collector(tmp_path_factory):
+    """backend/main_metric.py loaded once per session as the active instance, polling a fake fleet"""
+    import harness
+    from fake_databases import FakeFleet
+    fleet = FakeFleet(clusters=2, replicas=1, latency_ms=0, connect_ms=0).start()
+    data_dir = str(tmp_path_factory.mktemp("collector"))
+    topology_file = fleet.write_topology(os.path.join(data_dir, "fake-topology.json"))
+    environ = dict(os.environ)
+    try:
+        collector = harness.load_collector(data_dir, topology_file, POLL_JITTER=0)
+    finally:
+        os.environ.clear()
+        os.environ.update(environ)
+    yield collector, fleet
+    fleet.stop()
+
+
+@pytest.fixture
+def collector(loaded_collector, tmp_path):
+    """(main_metric, fake fleet) with empty databases and nothing remembered from earlier tests"""
+    from uptime_tracker import UptimeTracker
+    m, fleet = loaded_collector
+    m.METRICS_DB_FILE = os.path.join(tmp_path, "metrics.db")
+    m.DB_LOG_FILE = os.path.join(tmp_path, "db_log.sqlite")
+    m.init_logging_db()
+    m.init_metrics_db()
+    m.latest_results.clear()
+    m.latest_uptimes.clear()
+    m.node_transitions.reset()
+    m.cluster_transitions.reset()
+    m.uptime_tracker = UptimeTracker(m.load_uptime_history, max_gap=m.uptime_tracker.max_gap)
+    m.node_scheduler.sync([])
+    m.node_scheduler.sync(m.owned_topology().keys())
+    for node in fleet.nodes():
+        node.fail_rate = 0
+    for key in m.owned_topology().keys():
+        m.node_pool.discard(*key)
+    return m, fleet
@@ -0,0 +1,91 @@
+from adaptive_scheduler import AdaptiveScheduler, parse_interval_overrides
+
+PG = ("postgres", "master")
+MY = ("mysql", "slave1")
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def scheduler(clock, **settings):
+    return AdaptiveScheduler([PG, MY], base_interval=600, fast_interval=60, backoff_factor=2, max_backoff=500,
+                             lag_threshold=30, jitter=0, clock=clock, **settings)
+
+
+def row(scheduler, node):
+    return next(row for row in scheduler.schedule() if (row["db_type"], row["role"]) == node)
+
+
+def interval(scheduler, node):
+    return row(scheduler, node)["effective_interval_seconds"]
+
+
+def test_new_nodes_are_due_at_once_and_claimed_once():
+    clock = Clock()
+    jobs = scheduler(clock)
+    assert sorted(jobs.claim_due()) == sorted([PG, MY])
+    assert jobs.claim_due() == []
+
+
+def test_down_node_backs_off_exponentially_up_to_max_backoff():
+    clock = Clock()
+    jobs = scheduler(clock)
+    intervals = []
+    for _ in range(6):
+        jobs.claim_due()
+        jobs.record(PG, "down", None, "critical")
+        intervals.append(interval(jobs, PG))
+    assert intervals == [60, 120, 240, 480, 500, 500]
+    assert row(jobs, PG)["consecutive_failures"] == 6
+
+    jobs.record(PG, "up", None, "healthy")
+    assert interval(jobs, PG) == 600
+    assert row(jobs, PG)["consecutive_failures"] == 0
+
+
+def test_lagging_or_degraded_nodes_are_polled_fast():
+    clock = Clock()
+    jobs = scheduler(clock)
+    jobs.claim_due()
+    jobs.record(MY, "up", 45, "healthy")
+    jobs.record(PG, "up", None, "degraded")
+    assert interval(jobs, MY) == 60 and interval(jobs, PG) == 60
+    jobs.record(MY, "up", 2, "healthy")
+    assert interval(jobs, MY) == 600
+
+
+def test_nodes_are_due_again_after_their_interval():
+    clock = Clock()
+    jobs = scheduler(clock)
+    jobs.claim_due()
+    jobs.record(PG, "up", None, "healthy")
+    jobs.record(MY, "down", None, "degraded")
+    clock.now += 60
+    assert jobs.claim_due() == [MY]
+    clock.now += 540
+    assert jobs.claim_due() == [PG]
+
+
+def test_released_nodes_are_retried_at_the_fast_interval():
+    clock = Clock()
+    jobs = scheduler(clock)
+    jobs.release(jobs.claim_due())
+    assert interval(jobs, PG) == 60
+    clock.now += 60
+    assert sorted(jobs.claim_due()) == sorted([PG, MY])
+
+
+def test_interval_overrides():
+    clock = Clock()
+    overrides = parse_interval_overrides("postgres:master=120, mysql=300, bogus")
+    assert overrides == {("postgres", "master"): 120.0, ("mysql", None): 300.0}
+    jobs = scheduler(clock, overrides=overrides)
+    jobs.claim_due()
+    jobs.record(PG, "up", None, "healthy")
+    jobs.record(MY, "up", None, "healthy")
+    assert interval(jobs, PG) == 120 and interval(jobs, MY) == 300
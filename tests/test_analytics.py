@@ -0,0 +1,75 @@
+import os
+import time
+import sqlite3
+
+import numpy as np
+import pytest
+
+from migrations import migrate, METRICS_MIGRATIONS
+from sample_store import compact_metrics
+from analytics import held_seconds, outage_intervals, availability, lag_percentiles, read_nodes
+
+EPOCHS = np.array([0, 60, 120, 180, 240, 300])
+
+
+def test_samples_hold_until_the_next_one_at_most_max_gap():
+    assert held_seconds(np.array([0, 10000, 10030]), 10060, 600).tolist() == [600, 30, 30]
+
+
+def test_availability_is_time_weighted():
+    up = np.array([True, True, False, False, True, True])
+    stats = availability(EPOCHS, up, 0, 360, 3600)
+    assert stats["uptime"] == pytest.approx(2 / 3)
+    assert stats["downtime_seconds"] == 120
+    assert (stats["outages"], stats["failures"]) == (1, 1)
+    assert stats["mtbf_seconds"] == 240 and stats["mttr_seconds"] == 120
+    assert stats["coverage"] == 1.0
+
+
+def test_outages_at_the_edges_of_the_range():
+    up = np.array([False, True, True, True, False, False])
+    starts, ends, samples, ongoing, observed_start = outage_intervals(EPOCHS, up, 360)
+    assert starts.tolist() == [0, 240] and ends.tolist() == [60, 360]
+    assert samples.tolist() == [1, 2]
+    assert ongoing.tolist() == [False, True] and observed_start.tolist() == [False, True]
+    stats = availability(EPOCHS, up, 0, 360, 3600)
+    # The first outage began before the range, the second has not been repaired
+    assert stats["failures"] == 1 and stats["mttr_seconds"] is None and stats["longest_outage_seconds"] == 120
+
+
+def test_lag_percentiles_weight_each_sample_by_the_time_it_held():
+    # A lag spike polled often (adaptive polling) must not dominate the percentiles
+    epochs = np.array([0, 100, 105, 110])
+    lag = np.array([1.0, 50.0, 50.0, np.nan])
+    stats = lag_percentiles(epochs, lag, 200, 3600)
+    assert stats["samples"] == 3
+    assert stats["percentiles"] == {50: 1.0, 95: 50.0, 99: 50.0}
+    assert stats["mean"] == pytest.approx((100 * 1 + 10 * 50) / 110)
+    assert lag_percentiles(epochs, np.full(4, np.nan), 200, 3600) is None
+
+
+def test_packed_and_raw_samples_give_the_same_series(writer, tmp_path):
+    db_file = os.path.join(tmp_path, "metrics.db")
+    migrate(writer, db_file, METRICS_MIGRATIONS)
+    with writer.batch():
+        writer.executemany(db_file, """
+            INSERT INTO metrics (timestamp, db_type, role, host, port, connection_status, replication_lag_seconds)
+            VALUES (datetime('now', ?), 'pg', 'slave1', '10.0.0.2', 5432, ?, ?)
+        """, [(f"-{minutes} minutes", "down" if minutes % 420 == 0 else "up", None if minutes % 7 else minutes / 60)
+              for minutes in range(3 * 1440, -1, -30)])
+        writer.execute(db_file, "INSERT INTO node_current (db_type, role, host, port, connection_status, timestamp) "
+                                "VALUES ('pg', 'slave1', '10.0.0.2', 5432, 'up', CURRENT_TIMESTAMP)")
+
+    def series(epochs, up, lag, since, until):
+        return epochs.tolist(), up.tolist(), np.nan_to_num(lag, nan=-1).tolist(), availability(epochs, up, since, until, 3600)
+
+    def read():
+        conn = sqlite3.connect(db_file)
+        try:
+            return read_nodes(conn, "-7 days", series)
+        finally:
+            conn.close()
+    raw = read()
+    assert compact_metrics(writer, db_file, int(time.time()))["samples"] > 0
+    assert read() == raw
+    assert len(raw[0][2][0]) == 3 * 48 + 1
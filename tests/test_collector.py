@@ -0,0 +1,67 @@
+import sqlite3
+
+PRIMARY, REPLICA = ("postgres-0", "master"), ("postgres-0", "slave1")
+
+
+def rows(db_file, sql):
+    conn = sqlite3.connect(db_file)
+    try:
+        return conn.execute(sql).fetchall()
+    finally:
+        conn.close()
+
+
+def test_cluster_status_waits_until_every_node_was_polled(collector):
+    m, _ = collector
+    m.poll_and_save_metrics([PRIMARY])
+    assert rows(m.METRICS_DB_FILE, "SELECT db_type, status FROM cluster_status") == []
+    assert rows(m.DB_LOG_FILE, "SELECT event FROM events") == []
+    # A cluster the scheduler has not seen whole yet is not polled at the fast (degraded) interval
+    assert {row["role"]: row["state"] for row in m.node_scheduler.schedule()
+            if row["db_type"] == "postgres-0"} == {"master": "healthy", "slave1": "pending"}
+
+    m.poll_and_save_metrics([REPLICA])
+    assert rows(m.METRICS_DB_FILE, "SELECT db_type, status, kind FROM cluster_status") == [
+        ("postgres-0", "healthy", "start")]
+    assert rows(m.DB_LOG_FILE, "SELECT event FROM events") == []
+
+
+def test_node_down_at_first_sight_is_an_event(collector):
+    m, fleet = collector
+    fleet.clusters[0][2][1][1].fail_rate = 1      # postgres-0 slave1 refuses connections
+    m.poll_and_save_metrics([PRIMARY, REPLICA])
+    assert rows(m.DB_LOG_FILE, "SELECT role, status, kind FROM status_logs ORDER BY id") == [
+        ("master", "up", "start"), ("slave1", "down", "start")]
+    assert rows(m.DB_LOG_FILE, "SELECT event, severity FROM events") == [
+        ("postgres-0 slave1 (127.0.0.1) is down", "critical")]
+
+    fleet.clusters[0][2][1][1].fail_rate = 0
+    m.node_pool.discard(*REPLICA)
+    m.poll_and_save_metrics([REPLICA])
+    assert rows(m.DB_LOG_FILE, "SELECT event, severity FROM events ORDER BY id")[1:] == [
+        ("postgres-0 slave1 (127.0.0.1) is up again", "info"), ("postgres-0 cluster is healthy (was degraded)", "info")]
+
+
+def test_rolled_back_cycle_leaves_no_uptime_samples(collector, monkeypatch):
+    m, fleet = collector
+    m.poll_and_save_metrics([PRIMARY, REPLICA])
+    fleet.clusters[0][2][1][1].fail_rate = 1
+    m.node_pool.discard(*REPLICA)
+
+    def disk_full(*args):
+        raise OSError("disk full")
+    monkeypatch.setattr(m, "save_metrics_to_db", disk_full)
+    m.poll_and_save_metrics([REPLICA])
+    assert rows(m.DB_LOG_FILE, "SELECT status FROM status_logs WHERE role = 'slave1'") == [("up",)]
+    assert m.calculate_uptime(*REPLICA)["last_node_down_time"] == "Never"
+
+
+def test_history_rejects_bad_parameters(collector):
+    m, _ = collector
+    client = m.app.test_client()
+    for query in ("hours=0", "hours=-24", "hours=a", "limit=0", "format=xml"):
+        for route in ("/metrics/history", "/cluster/history"):
+            response = client.get(f"{route}?{query}")
+            assert response.status_code == 400, (route, query)
+            assert response.get_json()["status"] == "error"
+    assert client.get("/metrics/history?hours=1").status_code == 200
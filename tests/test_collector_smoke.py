@@ -0,0 +1,39 @@
+import json
+import http.client
+
+import pytest
+
+import harness
+from fake_databases import FakeFleet
+
+
+@pytest.fixture
+def fleet():
+    fleet = FakeFleet(clusters=2, replicas=1, latency_ms=1, connect_ms=0).start()
+    yield fleet
+    fleet.stop()
+
+
+def get(port, route):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+    try:
+        conn.request("GET", route)
+        response = conn.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        conn.close()
+
+
+def test_benchmark_collector_serves_live_metrics(fleet, tmp_path):
+    """The collector the load test runs is the active instance: it probes and serves /metrics"""
+    topology_file = fleet.write_topology(str(tmp_path / "fake-topology.json"))
+    port = harness.free_port()
+    server = harness.start_server("collector", str(tmp_path), port, topology_file)
+    try:
+        status, body = get(port, "/metrics")
+    finally:
+        server.terminate()
+        server.wait()
+    assert status == 200, body
+    assert body["snapshot"]["stale"] is False
+    assert sum(node.queries for node in fleet.nodes()) > 0
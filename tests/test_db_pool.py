@@ -0,0 +1,124 @@
+import time
+
+import pytest
+
+from db_pool import NodeConnectionPool, NodeUnavailable
+from fake_databases import FakeFleet
+
+
+@pytest.fixture(scope="module")
+def fleet():
+    fleet = FakeFleet(clusters=2, replicas=0, latency_ms=0, connect_ms=0).start()
+    yield fleet
+    fleet.stop()
+
+
+@pytest.fixture(params=["postgres", "mysql"])
+def node(request, fleet):
+    """(db_type, params, FakeNode) of the cluster primary running the given engine"""
+    name, engine, [(_, fake, port)] = next(cluster for cluster in fleet.clusters if cluster[1] == request.param)
+    fake.fail_rate = 0
+    fake.connections = 0
+    params = {"host": fleet.host, "port": port, "user": "test", "password": "test", "dbname": "test",
+              "engine": engine}
+    return name, params, fake
+
+
+def server_version(conn):
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT version()")
+        return cur.fetchall()[0][0]
+    finally:
+        cur.close()
+
+
+def test_connection_is_reused_across_runs(node):
+    db_type, params, fake = node
+    pool = NodeConnectionPool()
+    try:
+        for _ in range(3):
+            pool.run(db_type, "master", params, server_version)
+        assert fake.connections == 1
+        assert pool.status()[f"{db_type}_master"] == {
+            "idle_connections": 1, "consecutive_failures": 0, "retry_in_seconds": 0}
+    finally:
+        pool.close_all()
+
+
+def test_closed_idle_connection_is_replaced(node):
+    db_type, params, fake = node
+    pool = NodeConnectionPool()
+    try:
+        conn = pool.run(db_type, "master", params, lambda conn: conn)
+        conn.close()
+        pool.run(db_type, "master", params, server_version)
+        assert fake.connections == 2
+    finally:
+        pool.close_all()
+
+
+def test_failing_reused_connection_is_retried_once_on_a_fresh_one(node):
+    db_type, params, fake = node
+    pool = NodeConnectionPool()
+    seen = []
+
+    def fails_on_the_pooled_connection(conn):
+        seen.append(conn)
+        if len(seen) == 1:
+            raise OSError("server closed the connection unexpectedly")
+        return server_version(conn)
+
+    try:
+        pool.run(db_type, "master", params, server_version)
+        assert pool.run(db_type, "master", params, fails_on_the_pooled_connection)
+        assert fake.connections == 2
+        assert seen[0] is not seen[1]
+    finally:
+        pool.close_all()
+
+
+def test_failed_connect_backs_off_until_discarded(node):
+    db_type, params, fake = node
+    pool = NodeConnectionPool(connect_timeout=2, backoff_base=60)
+    try:
+        fake.fail_rate = 1
+        with pytest.raises(Exception) as refused:
+            pool.run(db_type, "master", params, server_version)
+        assert not isinstance(refused.value, NodeUnavailable)
+
+        # Inside the window the node fails fast, without another connect
+        fake.fail_rate = 0
+        with pytest.raises(NodeUnavailable):
+            pool.run(db_type, "master", params, server_version)
+        assert fake.connections == 0
+        status = pool.status()[f"{db_type}_master"]
+        assert status["consecutive_failures"] == 1
+        assert 55 < status["retry_in_seconds"] <= 60
+
+        pool.discard(db_type, "master")
+        assert pool.status() == {}
+        assert pool.run(db_type, "master", params, server_version)
+    finally:
+        pool.close_all()
+
+
+def test_backoff_doubles_up_to_the_maximum(node):
+    db_type, params, fake = node
+    pool = NodeConnectionPool(connect_timeout=2, backoff_base=0.2, backoff_max=0.3)
+    try:
+        fake.fail_rate = 1
+        for failures, window in ((1, 0.2), (2, 0.3), (3, 0.3)):
+            with pytest.raises(Exception):
+                pool.run(db_type, "master", params, server_version)
+            status = pool.status()[f"{db_type}_master"]
+            assert status["consecutive_failures"] == failures
+            assert window - 0.1 < status["retry_in_seconds"] <= window
+            time.sleep(window)
+
+        # A successful connect resets the count
+        fake.fail_rate = 0
+        pool.run(db_type, "master", params, server_version)
+        assert pool.status()[f"{db_type}_master"]["consecutive_failures"] == 0
+    finally:
+        pool.close_all()
@@ -0,0 +1,53 @@
+import math
+
+from downsample import lttb_indices, lttb, state_intervals, coarse_state_intervals
+
+
+def test_keeps_first_and_last_and_respects_the_threshold():
+    xs = list(range(1000))
+    ys = [math.sin(x / 50) for x in xs]
+    kept = lttb_indices(xs, ys, 100)
+    assert len(kept) == 100
+    assert kept[0] == 0 and kept[-1] == 999
+    assert kept == sorted(set(kept))
+
+
+def test_spike_survives_downsampling():
+    xs = list(range(500))
+    ys = [0.0] * 500
+    ys[257] = 300.0
+    assert 257 in lttb_indices(xs, ys, 20)
+
+
+def test_small_series_and_thresholds():
+    assert lttb_indices([0, 1, 2], [0, 1, 2], 5) == [0, 1, 2]
+    assert lttb_indices([0, 1, 2], [0, 1, 2], 0) == [0, 1, 2]
+    assert lttb_indices(list(range(10)), [0] * 10, 2) == [0, 9]
+    assert lttb_indices(list(range(10)), [0] * 10, 1) == [0]
+
+
+def test_lttb_returns_the_items():
+    points = [{"t": t, "lag": t % 7} for t in range(50)]
+    sampled = lttb(points, 10, x=lambda p: p["t"], y=lambda p: p["lag"])
+    assert len(sampled) == 10
+    assert sampled[0] is points[0] and sampled[-1] is points[-1]
+
+
+def test_state_intervals_tile_the_range():
+    samples = [("2025-01-01 00:00:00", "up"), ("2025-01-01 00:10:00", "up"),
+               ("2025-01-01 00:20:00", "down"), ("2025-01-01 00:30:00", "up")]
+    assert state_intervals(samples) == [
+        {"start": "2025-01-01 00:00:00", "end": "2025-01-01 00:20:00", "status": "up", "samples": 2},
+        {"start": "2025-01-01 00:20:00", "end": "2025-01-01 00:30:00", "status": "down", "samples": 1},
+        {"start": "2025-01-01 00:30:00", "end": "2025-01-01 00:30:00", "status": "up", "samples": 1},
+    ]
+
+
+def test_coarse_intervals_keep_outages():
+    # A node flapping every minute for an hour, with one down sample per five
+    samples = [(f"2025-01-01 00:{minute:02d}:00", "down" if minute % 5 == 2 else "up") for minute in range(60)]
+    coarse = coarse_state_intervals(samples, 4)
+    assert len(coarse) <= 4
+    assert {interval["status"] for interval in coarse} == {"down"}
+    assert sum(interval["samples"] for interval in coarse) == 60
+    assert coarse[0]["start"] == samples[0][0] and coarse[-1]["end"] == samples[-1][0]
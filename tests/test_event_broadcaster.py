@@ -0,0 +1,58 @@
+import json
+
+from event_broadcaster import EventBroadcaster
+
+
+def frames(stream, count):
+    return [next(stream) for _ in range(count)]
+
+
+def event(frame):
+    """(event type, data) of an SSE frame"""
+    fields = dict(line.split(": ", 1) for line in frame.decode().strip().split("\n"))
+    return fields["event"], json.loads(fields["data"])
+
+
+def test_new_subscriber_gets_the_latest_event_of_each_type():
+    events = EventBroadcaster()
+    events.publish("snapshot", {"n": 1})
+    events.publish("snapshot", {"n": 2})
+    events.publish("cycle", {"nodes": 6})
+    stream = events.stream()
+    assert frames(stream, 1) == [b"retry: 5000\n\n"]
+    assert [event(frame) for frame in frames(stream, 2)] == [("snapshot", {"n": 2}), ("cycle", {"nodes": 6})]
+    stream.close()
+
+
+def test_published_events_reach_every_subscriber_in_order():
+    events = EventBroadcaster()
+    streams = [events.stream() for _ in range(2)]
+    for stream in streams:
+        next(stream)                # the retry frame subscribes the client
+    events.publish("cycle", {"n": 1})
+    events.publish("cycle", {"n": 2})
+    for stream in streams:
+        assert [event(frame)[1] for frame in frames(stream, 2)] == [{"n": 1}, {"n": 2}]
+    assert events.status()["subscribers"] == 2
+    for stream in streams:
+        stream.close()
+    assert events.status()["subscribers"] == 0
+
+
+def test_slow_subscriber_loses_its_oldest_frames():
+    events = EventBroadcaster(max_queue=3)
+    stream = events.stream()
+    next(stream)
+    for n in range(5):
+        events.publish("cycle", {"n": n})
+    assert events.status()["dropped_frames"] == 2
+    assert [event(frame)[1]["n"] for frame in frames(stream, 3)] == [2, 3, 4]
+    stream.close()
+
+
+def test_idle_stream_sends_keepalives():
+    events = EventBroadcaster(keepalive_seconds=0.01)
+    stream = events.stream()
+    next(stream)
+    assert next(stream) == b": keepalive\n\n"
+    stream.close()
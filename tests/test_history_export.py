@@ -0,0 +1,87 @@
+import os
+import csv
+import io
+import json
+import itertools
+
+import pytest
+
+from migrations import migrate, METRICS_MIGRATIONS
+from history_export import history_query, open_rows, export_stream, with_packed_rows, normalize_timestamp
+
+ROWS = 25
+
+
+@pytest.fixture
+def metrics_db(writer, tmp_path):
+    db_file = os.path.join(tmp_path, "metrics.db")
+    migrate(writer, db_file, METRICS_MIGRATIONS)
+    writer.executemany(db_file, """
+        INSERT INTO metrics (timestamp, db_type, role, host, port, connection_status, cluster_creation_timestamp)
+        VALUES (datetime('now', ?), ?, 'master', '10.0.0.1', 5432, 'up', '2025-01-01T00:00:00+00:00')
+    """, [(f"-{i} minutes", "postgres" if i % 2 else "mysql") for i in range(ROWS)])
+    # Outside the one-hour window
+    writer.execute(db_file, """
+        INSERT INTO metrics (timestamp, db_type, role, host, port, connection_status)
+        VALUES (datetime('now', '-2 hours'), 'postgres', 'master', '10.0.0.1', 5432, 'up')
+    """)
+    return db_file
+
+
+def export(db_file, export_format, hours=1, filters=None, after_id=None, limit=None, batch_size=10):
+    sql, params = history_query("metrics", hours, filters or {}, after_id, limit)
+    columns, batches = open_rows(db_file, sql, params, batch_size=batch_size)
+    envelope = {"time_range_hours": hours, "after_id": after_id, "limit": limit}
+    return b"".join(part if isinstance(part, bytes) else part.encode()
+                    for part in export_stream(export_format, columns, batches, "metrics", envelope, limit))
+
+
+def test_rows_are_read_a_batch_at_a_time(metrics_db):
+    sql, params = history_query("metrics", 1, {}, None, None)
+    _, batches = open_rows(metrics_db, sql, params, batch_size=10)
+    assert [len(batch) for batch in batches] == [10, 10, 5]
+
+
+def test_json_export_is_newest_first_with_normalized_timestamps(metrics_db):
+    body = json.loads(export(metrics_db, "json"))
+    assert body["total_records"] == ROWS and body["next_after_id"] is None
+    ids = [row["id"] for row in body["metrics"]]
+    assert ids == sorted(ids, reverse=True)
+    assert body["metrics"][0]["cluster_creation_timestamp"] == "2025-01-01 00:00:00"
+    assert body["time_range_hours"] == 1
+
+
+def test_keyset_pages_cover_every_row_once(metrics_db):
+    seen, after_id = [], None
+    while True:
+        page = json.loads(export(metrics_db, "json", after_id=after_id, limit=7))
+        seen += [row["id"] for row in page["metrics"]]
+        after_id = page["next_after_id"]
+        if after_id is None:
+            break
+    assert len(seen) == len(set(seen)) == ROWS
+    assert seen == sorted(seen, reverse=True)
+
+
+def test_filters_ndjson_and_csv(metrics_db):
+    lines = export(metrics_db, "ndjson", filters={"db_type": "postgres", "role": None}).splitlines()
+    assert len(lines) == ROWS // 2
+    assert {json.loads(line)["db_type"] for line in lines} == {"postgres"}
+
+    rows = list(csv.reader(io.StringIO(export(metrics_db, "csv", limit=3).decode())))
+    assert rows[0][:2] == ["id", "timestamp"] and len(rows) == 4
+
+
+def test_packed_rows_continue_below_the_raw_ones():
+    columns = ["id", "timestamp"]
+    raw = iter([[(9, "2025-01-02 00:00:00"), (8, "2025-01-01 23:50:00")]])
+    requests = []
+
+    def packed_rows(before_id, remaining):
+        requests.append((before_id, remaining))
+        return itertools.islice([(7, "2025-01-01T23:40:00Z"), (6, "2025-01-01T23:30:00Z")], remaining)
+    rows = [row for batch in with_packed_rows(columns, raw, packed_rows, after_id=None, limit=3) for row in batch]
+    assert requests == [(8, 1)]
+    assert rows == [(9, "2025-01-02 00:00:00"), (8, "2025-01-01 23:50:00"), [7, "2025-01-01 23:40:00"]]
+    assert normalize_timestamp("2025-01-01T23:50:00Z") == "2025-01-01 23:50:00"
+    assert normalize_timestamp("Never") == "Never"
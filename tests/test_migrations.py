@@ -0,0 +1,110 @@
+import os
+import sqlite3
+
+import pytest
+
+from migrations import migrate, METRICS_MIGRATIONS, LOG_MIGRATIONS, PROBE_LOAD_COLUMNS
+
+# The schema the collector created before migrations existed (user_version 0)
+LEGACY_METRICS_SCHEMA = """
+    CREATE TABLE metrics (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+        db_type TEXT NOT NULL,
+        role TEXT NOT NULL,
+        host TEXT,
+        port INTEGER,
+        connection_status TEXT NOT NULL,
+        cluster_version TEXT,
+        cluster_creation_timestamp TEXT,
+        replication_lag_seconds REAL,
+        replication_io_running TEXT,
+        replication_sql_running TEXT,
+        uptime_percentage REAL,
+        last_node_down_time TEXT
+    );
+    CREATE TABLE cluster_status (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+        db_type TEXT NOT NULL,
+        status TEXT NOT NULL,
+        master_status TEXT,
+        slave1_status TEXT,
+        slave2_status TEXT
+    );
+    CREATE INDEX idx_metrics_timestamp ON metrics(timestamp);
+    CREATE INDEX idx_cluster_timestamp ON cluster_status(timestamp);
+    INSERT INTO metrics (timestamp, db_type, role, host, port, connection_status, replication_lag_seconds) VALUES
+        ('2025-01-01 00:00:00', 'postgres', 'master', '10.0.0.1', 5432, 'up', NULL),
+        ('2025-01-01 00:00:00', 'postgres', 'slave1', '10.0.0.2', 5432, 'up', 0.5),
+        ('2025-01-01 00:10:00', 'postgres', 'slave1', '10.0.0.2', 5432, 'down', NULL);
+    INSERT INTO cluster_status (timestamp, db_type, status, master_status, slave1_status, slave2_status) VALUES
+        ('2025-01-01 00:00:00', 'postgres', 'healthy', 'up', 'up', NULL),
+        ('2025-01-01 00:10:00', 'postgres', 'degraded', 'up', 'down', NULL);
+"""
+LEGACY_LOG_SCHEMA = """
+    CREATE TABLE status_logs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+        db_type TEXT,
+        role TEXT,
+        host TEXT,
+        status TEXT
+    );
+    INSERT INTO status_logs (timestamp, db_type, role, host, status) VALUES
+        ('2025-01-01 00:10:00', 'postgres', 'slave1', '10.0.0.2', 'down');
+"""
+
+
+def legacy_database(path, schema):
+    conn = sqlite3.connect(path)
+    conn.executescript(schema)
+    conn.close()
+    return path
+
+
+def columns(writer, db_file, table):
+    return [row[1] for row in writer.query(db_file, f"PRAGMA table_info({table})")]
+
+
+@pytest.fixture
+def metrics_db(tmp_path):
+    return legacy_database(os.path.join(tmp_path, "metrics.db"), LEGACY_METRICS_SCHEMA)
+
+
+def test_legacy_metrics_database_is_upgraded_in_place(writer, metrics_db):
+    migrate(writer, metrics_db, METRICS_MIGRATIONS)
+    assert writer.query(metrics_db, "PRAGMA user_version")[0][0] == METRICS_MIGRATIONS[-1][0]
+    assert writer.query(metrics_db, "PRAGMA auto_vacuum")[0][0] == 2
+    assert {"probe_latency_ms", *(column for column, _ in PROBE_LOAD_COLUMNS)} <= set(columns(writer, metrics_db, "metrics"))
+    assert "kind" in columns(writer, metrics_db, "cluster_status")
+    # History kept, latest-state and per-node tables backfilled from it
+    assert writer.query(metrics_db, "SELECT COUNT(*) FROM metrics")[0][0] == 3
+    assert writer.query(metrics_db, "SELECT db_type, role, connection_status FROM node_current ORDER BY role") == [
+        ("postgres", "master", "up"), ("postgres", "slave1", "down")]
+    assert writer.query(metrics_db, "SELECT db_type, status FROM cluster_current") == [("postgres", "degraded")]
+    assert writer.query(metrics_db, """
+        SELECT cluster_status_id, role, status FROM cluster_status_nodes ORDER BY cluster_status_id, role
+    """) == [(1, "master", "up"), (1, "slave1", "up"), (2, "master", "up"), (2, "slave1", "down")]
+    indexes = {row[1] for row in writer.query(metrics_db, "PRAGMA index_list(metrics)")}
+    assert {"idx_metrics_ts_cover", "idx_metrics_node_ts"} <= indexes and "idx_metrics_timestamp" not in indexes
+
+
+def test_migrations_resume_from_the_recorded_version(writer, metrics_db):
+    migrate(writer, metrics_db, METRICS_MIGRATIONS[:8])
+    assert writer.query(metrics_db, "PRAGMA user_version")[0][0] == 8
+    assert "connections" not in columns(writer, metrics_db, "metrics")
+    migrate(writer, metrics_db, METRICS_MIGRATIONS)
+    assert "connections" in columns(writer, metrics_db, "metrics")
+    # Applied migrations are not run again
+    migrate(writer, metrics_db, METRICS_MIGRATIONS)
+    assert writer.query(metrics_db, "SELECT COUNT(*) FROM node_current")[0][0] == 2
+
+
+def test_legacy_log_database_is_upgraded_in_place(writer, tmp_path):
+    log_db = legacy_database(os.path.join(tmp_path, "db_log.sqlite"), LEGACY_LOG_SCHEMA)
+    migrate(writer, log_db, LOG_MIGRATIONS)
+    assert writer.query(log_db, "PRAGMA user_version")[0][0] == LOG_MIGRATIONS[-1][0]
+    assert writer.query(log_db, "SELECT status, kind FROM status_logs") == [("down", None)]
+    assert writer.query(log_db, "SELECT COUNT(*) FROM events")[0][0] == 0
+    assert writer.query(log_db, "PRAGMA auto_vacuum")[0][0] == 2
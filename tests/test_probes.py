@@ -0,0 +1,65 @@
+import pytest
+
+import probes
+from db_pool import NodeConnectionPool
+from topology import Node
+from fake_databases import FakeFleet
+
+CORE = ("connection_status", "cluster_version", "cluster_creation_timestamp", "replication_lag_seconds")
+
+
+@pytest.fixture
+def fleet():
+    fleet = FakeFleet(clusters=2, replicas=1, latency_ms=0, connect_ms=0, lag_seconds=2).start()
+    probes._legacy_nodes.clear()
+    yield fleet
+    fleet.stop()
+    probes._legacy_nodes.clear()
+
+
+@pytest.fixture
+def pool():
+    pool = NodeConnectionPool(statement_timeout_ms=5000)
+    yield pool
+    pool.close_all()
+
+
+def fleet_nodes(fleet):
+    return [(Node(name, engine, role, fleet.host, port, "test", "test", "test", role == "master", None), fake)
+            for name, engine, nodes in fleet.clusters for role, fake, port in nodes]
+
+
+def test_extended_probe_gathers_load_and_replication_in_one_round_trip(fleet, pool):
+    for node, _ in fleet_nodes(fleet):
+        probes.get_db_metrics(node, pool)           # counter rates need a previous probe
+        metrics, _, _ = probes.get_db_metrics(node, pool)
+        assert metrics["connection_status"] == "up"
+        assert metrics["probe_statements"] == (1 if node.engine == "postgres" else 2)
+        for column in ("connections", "active_connections", "max_connections", "transactions_per_second",
+                       "cache_hit_ratio", "wal_position"):
+            assert metrics[column] is not None, (node, column)
+        # PostgreSQL has no server-wide statement counter
+        assert (metrics["queries_per_second"] is not None) == (node.engine == "mysql")
+        if node.primary:
+            assert metrics.get("replication_lag_seconds") is None
+        else:
+            assert metrics["replication_lag_seconds"] == pytest.approx(2, abs=1)
+            assert metrics["replication_lag_bytes"] > 0
+
+
+def test_refused_extended_probe_falls_back_to_the_legacy_queries(fleet, pool):
+    nodes = fleet_nodes(fleet)
+    extended = {node: probes.get_db_metrics(node, pool)[0] for node, _ in nodes}
+    probes._legacy_nodes.clear()
+    for _, fake in nodes:
+        fake.extended = False
+    for node, _ in nodes:
+        first, _, _ = probes.get_db_metrics(node, pool)
+        second, _, _ = probes.get_db_metrics(node, pool)
+        assert (node.cluster, node.role) in probes._legacy_nodes
+        # The refused statement is counted once; later probes go straight to the legacy queries
+        assert first["probe_statements"] == second["probe_statements"] + 1
+        assert first["connection_status"] == "up"
+        assert {column: first.get(column) is None for column in CORE} == \
+               {column: extended[node].get(column) is None for column in CORE}
+        assert first["cluster_version"] == extended[node]["cluster_version"]
@@ -0,0 +1,27 @@
+import os
+import sqlite3
+
+import pytest
+
+from migrations import migrate, METRICS_MIGRATIONS, LOG_MIGRATIONS
+from queries import ENDPOINT_QUERIES
+from check_query_plans import full_scans
+
+
+@pytest.fixture
+def databases(writer, tmp_path):
+    files = {"metrics": os.path.join(tmp_path, "metrics.db"), "log": os.path.join(tmp_path, "db_log.sqlite")}
+    migrate(writer, files["metrics"], METRICS_MIGRATIONS)
+    migrate(writer, files["log"], LOG_MIGRATIONS)
+    return files
+
+
+@pytest.mark.parametrize("endpoint", sorted(ENDPOINT_QUERIES))
+def test_endpoint_query_uses_an_index(databases, endpoint):
+    """No plan step scans a whole history table (metrics, cluster_status, status_logs, ...)"""
+    database, sql, params = ENDPOINT_QUERIES[endpoint]
+    conn = sqlite3.connect(databases[database])
+    try:
+        assert full_scans(conn, sql, params) == []
+    finally:
+        conn.close()
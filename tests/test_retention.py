@@ -0,0 +1,56 @@
+import os
+
+import pytest
+
+from migrations import migrate, METRICS_MIGRATIONS
+from retention import purge_in_batches, apply_retention, database_size
+
+PADDING = "x" * 500
+
+
+@pytest.fixture
+def metrics_db(writer, tmp_path):
+    db_file = os.path.join(tmp_path, "metrics.db")
+    migrate(writer, db_file, METRICS_MIGRATIONS)
+    with writer.batch():
+        writer.executemany(db_file, """
+            INSERT INTO metrics (timestamp, db_type, role, host, port, connection_status, last_node_down_time)
+            VALUES (datetime('now', ?), 'pg', 'master', '10.0.0.1', 5432, 'up', ?)
+        """, [(f"-{days} days", PADDING) for days in range(60) for _ in range(50)])
+    return db_file
+
+
+def count(writer, db_file):
+    return writer.query(db_file, "SELECT COUNT(*) FROM metrics")[0][0]
+
+
+def test_purge_deletes_in_batches(writer, metrics_db, monkeypatch):
+    statements = []
+    execute = writer.execute
+    monkeypatch.setattr(writer, "execute", lambda *args: statements.append(args) or execute(*args))
+    deleted = purge_in_batches(writer, metrics_db, "metrics", "id", "timestamp < datetime('now', ?)",
+                               ("-30 days",), batch_size=400, pause=0)
+    assert deleted == 29 * 50
+    assert len(statements) == 4             # 400 + 400 + 400 + 250
+    assert count(writer, metrics_db) == 31 * 50
+
+
+def test_retention_reclaims_the_freed_pages(writer, metrics_db):
+    assert writer.query(metrics_db, "PRAGMA auto_vacuum")[0][0] == 2     # incremental, set by a migration
+    size_before = database_size(writer, metrics_db)[0]
+    report = apply_retention(writer, [(metrics_db, "metrics", "id", "timestamp < datetime('now', ?)", ("-7 days",))],
+                             batch_size=1000, pause=0, vacuum_pages=50)
+    assert report["deleted_rows"] == {"metrics": 52 * 50}
+    assert count(writer, metrics_db) == 8 * 50
+    figures = report["files"][metrics_db]
+    assert figures["size_before_bytes"] == size_before
+    assert figures["size_after_bytes"] == database_size(writer, metrics_db)[0] < size_before
+    assert figures["reclaimed_bytes"] == size_before - figures["size_after_bytes"]
+    assert writer.query(metrics_db, "PRAGMA freelist_count")[0][0] == 0
+
+
+def test_nothing_to_purge(writer, metrics_db):
+    report = apply_retention(writer, [(metrics_db, "metrics", "id", "timestamp < datetime('now', ?)", ("-365 days",))],
+                             pause=0)
+    assert report["deleted_rows"] == {"metrics": 0}
+    assert report["files"][metrics_db]["reclaimed_bytes"] == 0
@@ -0,0 +1,69 @@
+import os
+import math
+
+import pytest
+
+from migrations import migrate, METRICS_MIGRATIONS
+from uptime_tracker import to_timestamp
+from sample_store import encode_column, decode_column, nullable, compact_metrics, history_rows, open_store
+
+DAY = 86400
+
+
+@pytest.mark.parametrize("codec, values", [
+    ("delta", [1000, 1600, 2200, 2200, 1900]),
+    ("int", [5432, None, -1, 0, 2 ** 62]),
+    ("text", ["2025-01-01T00:00:00+00:00", None, "Never"]),
+])
+def test_codec_round_trip(codec, values):
+    assert decode_column(codec, encode_column(codec, values), samples=len(values)) == values
+
+
+def test_float_column_keeps_nulls_as_nan():
+    decoded = decode_column("float", encode_column("float", [0.5, None, 12.0]), samples=3)
+    assert math.isnan(decoded[1])
+    assert nullable(decoded) == [0.5, None, 12.0]
+
+
+def test_dict_column_maps_strings_to_ids():
+    ids = {"up": 1, "down": 2}
+    blob = encode_column("dict", ["up", "up", None, "down"], ids)
+    assert decode_column("dict", blob, {1: "up", 2: "down"}, 4) == ["up", "up", None, "down"]
+
+
+@pytest.mark.parametrize("codec, nulls", [("int", [None, None]), ("text", [None, None]), ("dict", [None, None])])
+def test_null_blob_decodes_to_nulls(codec, nulls):
+    # A column added after the chunk was packed
+    assert decode_column(codec, None, {}, 2) == nulls
+    assert nullable(decode_column("float", None, samples=2)) == [None, None]
+
+
+def test_unknown_codec():
+    with pytest.raises(ValueError):
+        encode_column("zstd", [1])
+
+
+def test_compacted_rows_read_back_as_stored(writer, tmp_path):
+    db_file = os.path.join(tmp_path, "metrics.db")
+    migrate(writer, db_file, METRICS_MIGRATIONS)
+    start = 1_760_000_000 // DAY * DAY - 2 * DAY
+    for i in range(6):
+        writer.execute(db_file, """
+            INSERT INTO metrics (timestamp, db_type, role, host, port, connection_status, cluster_version,
+                                 replication_lag_seconds, uptime_percentage, connections)
+            VALUES (?, 'pg', 'slave1', '10.0.0.2', 5432, ?, 'PostgreSQL 16.4', ?, 99.5, ?)
+        """, (to_timestamp(start + i * DAY // 4), "up" if i != 3 else "down", None if i == 3 else i / 10, i))
+    columns = ["id", "timestamp", "db_type", "role", "connection_status", "replication_lag_seconds", "connections"]
+    raw = [tuple(row) for row in writer.query(db_file, f"SELECT {', '.join(columns)} FROM metrics ORDER BY id DESC")]
+
+    report = compact_metrics(writer, db_file, start + 2 * DAY)
+    assert report == {"chunks": 2, "samples": 6}
+    conn = open_store(db_file)
+    try:
+        assert list(history_rows(conn, columns, start, {})) == raw
+        assert list(history_rows(conn, columns, start, {}, before_id=raw[1][0], limit=2)) == raw[2:4]
+    finally:
+        conn.close()
+    # Packing again is a no-op
+    assert compact_metrics(writer, db_file, start + 2 * DAY) == {"chunks": 0, "samples": 0}
+    assert writer.query(db_file, "SELECT SUM(samples) FROM metric_chunks") == [(6,)]
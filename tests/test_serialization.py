@@ -0,0 +1,61 @@
+import os
+import datetime
+import importlib.util
+
+import pytest
+
+from shared.json_backend import orjson, msgspec, pick_backend
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load(app):
+    """An app's serialization module; both are named serialization, so each is loaded from its file"""
+    spec = importlib.util.spec_from_file_location(f"{app}_serialization", os.path.join(ROOT, app, "serialization.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+BACKENDS = [pytest.param(name, marks=pytest.mark.skipif(not installed, reason=f"{name} is not installed"))
+            for name, installed in (("orjson", orjson), ("msgspec", msgspec), ("stdlib", True))]
+PAYLOAD = {"node": "postgres-0", "lag": float("nan"), "limits": [1.5, float("inf"), float("-inf")], "ok": True}
+EXPECTED = b'{"node":"postgres-0","lag":null,"limits":[1.5,null,null],"ok":true}'
+
+
+@pytest.fixture(params=BACKENDS)
+def backend(request):
+    return request.param
+
+
+@pytest.mark.parametrize("app", ["backend", "frontend"])
+def test_non_finite_floats_are_null_with_every_backend(app, backend, monkeypatch):
+    serialization = load(app)
+    monkeypatch.setattr(serialization, "JSON_BACKEND", backend)
+    assert serialization.dumps(PAYLOAD) == EXPECTED
+
+
+def test_backend_dumps_same_output_with_every_backend(backend, monkeypatch):
+    serialization = load("backend")
+    monkeypatch.setattr(serialization, "JSON_BACKEND", backend)
+    payload = {"b": datetime.datetime(2025, 1, 2, 3, 4, 5), "a": [None, 2, "é"]}
+    assert serialization.dumps(payload) == '{"b":"2025-01-02T03:04:05","a":[null,2,"é"]}'.encode()
+    assert serialization.dumps(payload, sort_keys=True) == '{"a":[null,2,"é"],"b":"2025-01-02T03:04:05"}'.encode()
+
+
+def test_row_encoder_with_every_backend(backend, monkeypatch):
+    serialization = load("backend")
+    monkeypatch.setattr(serialization, "JSON_BACKEND", backend)
+    encoder = serialization.RowEncoder(["id", "host", "lag"])
+    rows = [(1, "10.0.0.1", 0.25), (2, "10.0.0.2", float("nan")), (3, None, None)]
+    assert encoder.objects(rows) == (b'{"id":1,"host":"10.0.0.1","lag":0.25},{"id":2,"host":"10.0.0.2","lag":null},'
+                                     b'{"id":3,"host":null,"lag":null}')
+    assert encoder.lines(rows[:1]) == b'{"id":1,"host":"10.0.0.1","lag":0.25}\n'
+    assert encoder.objects([]) == b""
+
+
+def test_pick_backend_falls_back_to_an_installed_one():
+    assert pick_backend("stdlib") == "stdlib"
+    assert pick_backend("simdjson") == pick_backend("auto")
+    if msgspec is None:
+        assert pick_backend("msgspec") == pick_backend("auto")
@@ -0,0 +1,22 @@
+from sharding import HashRing
+
+KEYS = [f"postgres-{i}" for i in range(2000)]
+
+
+def test_owner_is_stable():
+    ring, again = HashRing(["a", "b", "c"]), HashRing(["c", "b", "a"])
+    assert all(ring.owner(key) == again.owner(key) for key in KEYS)
+
+
+def test_keys_spread_over_every_shard():
+    shards = HashRing(["a", "b", "c", "d"]).assign(KEYS)
+    assert sorted(shards) == ["a", "b", "c", "d"]
+    assert sum(map(len, shards.values())) == len(KEYS)
+    assert all(len(items) > len(KEYS) / 4 / 2 for items in shards.values())
+
+
+def test_adding_a_shard_moves_only_its_keys():
+    before, after = HashRing(["a", "b", "c"]), HashRing(["a", "b", "c", "d"])
+    moved = [key for key in KEYS if before.owner(key) != after.owner(key)]
+    assert all(after.owner(key) == "d" for key in moved)
+    assert len(moved) < len(KEYS) / 4 * 1.5
@@ -0,0 +1,72 @@
+import time
+import threading
+
+import pytest
+
+from snapshot_cache import SnapshotCache
+
+
+class Loader:
+    def __init__(self, delay=0):
+        self.calls = 0
+        self.delay = delay
+        self.fail = False
+
+    def __call__(self):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.fail:
+            raise OSError("probe failed")
+        return {"snapshot": self.calls}
+
+
+def test_served_from_memory_until_the_ttl_expires():
+    loader = Loader()
+    cache = SnapshotCache(loader, ttl=0.2)
+    assert cache.peek() is None
+    snapshot, meta = cache.get()
+    assert snapshot == {"snapshot": 1} and meta["stale"] is False and meta["ttl_seconds"] == 0.2
+    assert cache.get()[0] == {"snapshot": 1}
+    time.sleep(0.25)
+    assert cache.peek()[1]["stale"] is True
+    assert cache.get()[0] == {"snapshot": 2}
+    assert loader.calls == 2
+
+
+def test_concurrent_misses_share_one_refresh():
+    loader = Loader(delay=0.2)
+    cache = SnapshotCache(loader, ttl=60)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get()[0])) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert loader.calls == 1
+    assert results == [{"snapshot": 1}] * 8
+
+
+def test_failed_refresh_serves_the_previous_snapshot():
+    loader = Loader()
+    cache = SnapshotCache(loader, ttl=0)
+    cache.get()
+    loader.fail = True
+    snapshot, meta = cache.get()
+    assert snapshot == {"snapshot": 1} and meta["stale"] is True
+
+
+def test_failure_without_a_snapshot_raises():
+    loader = Loader()
+    loader.fail = True
+    with pytest.raises(OSError):
+        SnapshotCache(loader, ttl=60).get()
+
+
+def test_set_replaces_the_snapshot_and_notifies():
+    updates = []
+    loader = Loader()
+    cache = SnapshotCache(loader, ttl=60, on_update=lambda snapshot, meta: updates.append(snapshot))
+    cache.set({"snapshot": "from a cycle"})
+    assert cache.get()[0] == {"snapshot": "from a cycle"}
+    assert loader.calls == 0
+    assert updates == [{"snapshot": "from a cycle"}]
@@ -0,0 +1,52 @@
+import os
+import sqlite3
+
+import pytest
+
+
+@pytest.fixture
+def files(writer, tmp_path):
+    files = [os.path.join(tmp_path, "metrics.db"), os.path.join(tmp_path, "db_log.sqlite")]
+    for db_file in files:
+        writer.execute(db_file, "CREATE TABLE samples (id INTEGER PRIMARY KEY, value TEXT)")
+    return files
+
+
+def stored(db_file):
+    """Rows as another connection sees them: only committed writes"""
+    conn = sqlite3.connect(db_file)
+    try:
+        return [value for value, in conn.execute("SELECT value FROM samples ORDER BY id")]
+    finally:
+        conn.close()
+
+
+def test_writes_outside_a_batch_commit_at_once(writer, files):
+    cursor = writer.execute(files[0], "INSERT INTO samples (value) VALUES (?)", ("a",))
+    assert cursor.lastrowid == 1
+    writer.executemany(files[0], "INSERT INTO samples (value) VALUES (?)", [("b",), ("c",)])
+    assert stored(files[0]) == ["a", "b", "c"]
+    assert writer.query(files[0], "PRAGMA journal_mode") == [("wal",)]
+
+
+def test_batch_commits_every_file_when_the_block_exits(writer, files):
+    with writer.batch():
+        writer.execute(files[0], "INSERT INTO samples (value) VALUES ('metrics')")
+        with writer.batch():        # nested: still one transaction
+            writer.execute(files[1], "INSERT INTO samples (value) VALUES ('log')")
+        assert stored(files[0]) == [] and stored(files[1]) == []
+        assert writer.query(files[0], "SELECT value FROM samples") == [("metrics",)]
+    assert stored(files[0]) == ["metrics"] and stored(files[1]) == ["log"]
+
+
+def test_batch_rolls_back_every_file_on_error(writer, files):
+    with pytest.raises(RuntimeError):
+        with writer.batch():
+            writer.execute(files[0], "INSERT INTO samples (value) VALUES ('metrics')")
+            writer.execute(files[1], "INSERT INTO samples (value) VALUES ('log')")
+            raise RuntimeError("probe results were incomplete")
+    assert stored(files[0]) == [] and stored(files[1]) == []
+    # The writer is usable afterwards
+    with writer.batch():
+        writer.execute(files[0], "INSERT INTO samples (value) VALUES ('next')")
+    assert stored(files[0]) == ["next"]
@@ -0,0 +1,79 @@
+import os
+import json
+
+import pytest
+
+from db_config import DB_CONFIG
+from topology import TopologyRegistry, build_topology
+
+
+def cluster(**settings):
+    return {"name": "orders", "engine": "postgres", "nodes": [
+        {"role": "master", "host": "db1"},
+        {"role": "slave1", "host": "db2", "port": "5433", "poll_interval_seconds": 30},
+    ], **settings}
+
+
+def write(path, document):
+    with open(path, "w") as f:
+        f.write(document if isinstance(document, str) else json.dumps(document))
+    # Reload notices a change by mtime and size; make sure an edit within the same tick counts
+    os.utime(path, ns=(os.stat(path).st_atime_ns, os.stat(path).st_mtime_ns + 1_000_000))
+    return str(path)
+
+
+def test_node_settings_override_the_cluster_ones():
+    topology = build_topology({"clusters": [cluster(poll_interval_seconds=15)]})
+    master, slave = topology.node(("orders", "master")), topology.node(("orders", "slave1"))
+    assert (master.port, master.poll_interval) == (5432, 15)
+    assert (slave.port, slave.poll_interval) == (5433, 30)
+
+
+@pytest.mark.parametrize("interval", [0, -5, "10", True, float("nan"), float("inf"), [10]])
+def test_poll_interval_must_be_a_positive_number(interval):
+    with pytest.raises(ValueError, match="poll_interval_seconds"):
+        build_topology({"clusters": [cluster(poll_interval_seconds=interval)]})
+    spec = cluster()
+    spec["nodes"][1]["poll_interval_seconds"] = interval
+    with pytest.raises(ValueError, match="'slave1': poll_interval_seconds"):
+        build_topology({"clusters": [spec]})
+
+
+@pytest.mark.parametrize("port", [0, 70000, "abc", None, 5432.5, True])
+def test_port_must_be_a_valid_port_number(port):
+    spec = cluster()
+    spec["nodes"][0]["port"] = port
+    with pytest.raises(ValueError, match="port"):
+        build_topology({"clusters": [spec]})
+
+
+@pytest.mark.parametrize("document", [[], {"clusters": ["orders"]}, {"clusters": [{"name": "orders", "nodes": [1]}]}])
+def test_documents_of_the_wrong_shape_are_rejected(document):
+    with pytest.raises(ValueError):
+        build_topology(document)
+
+
+@pytest.mark.parametrize("document", ["{not json", {"clusters": [cluster(poll_interval_seconds=0)]}])
+def test_invalid_file_at_startup_falls_back_to_db_config(tmp_path, document):
+    path = write(tmp_path / "topology.json", document)
+    registry = TopologyRegistry(path, DB_CONFIG)
+    assert sorted(registry.current().clusters) == ["mysql", "postgres"]
+    status = registry.status()
+    assert status["source"] == "db_config.py"
+    assert status["last_error"]
+
+    # Fixing the file is picked up by the next reload
+    write(path, {"clusters": [cluster()]})
+    assert registry.reload()
+    assert list(registry.current().clusters) == ["orders"]
+    assert registry.status()["source"] == path
+    assert registry.status()["last_error"] is None
+
+
+def test_invalid_file_on_reload_keeps_the_current_topology(tmp_path):
+    path = write(tmp_path / "topology.json", {"clusters": [cluster()]})
+    registry = TopologyRegistry(path, DB_CONFIG)
+    write(path, {"clusters": [cluster(poll_interval_seconds=-1)]})
+    assert not registry.reload()
+    assert list(registry.current().clusters) == ["orders"]
+    assert "poll_interval_seconds" in registry.status()["last_error"]
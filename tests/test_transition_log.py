@@ -0,0 +1,39 @@
+from transition_log import TransitionLog, CHANGE, HEARTBEAT, START
+
+
+def test_first_sample_starts_then_only_changes_are_stored():
+    log = TransitionLog(3600)
+    assert log.check("node", "up", 0) == (START, None)
+    assert log.check("node", "up", 600) == (None, "up")
+    assert log.check("node", "down", 1200) == (CHANGE, "up")
+    assert log.check("node", "down", 1800) == (None, "down")
+
+
+def test_heartbeat_after_heartbeat_seconds_without_a_change():
+    log = TransitionLog(3600)
+    log.check("node", "up", 0)
+    assert log.check("node", "up", 3599) == (None, "up")
+    assert log.check("node", "up", 3600) == (HEARTBEAT, "up")
+    assert log.check("node", "up", 7199) == (None, "up")
+
+
+def test_change_across_a_restart_is_recognised():
+    log = TransitionLog(3600, loader=lambda: {"a": "up", "b": "down"})
+    assert log.check("a", "down", 0) == (CHANGE, "up")
+    assert log.check("b", "down", 0) == (START, "down")
+    assert log.check("c", "up", 0) == (START, None)
+
+
+def test_reset_reloads_the_stored_states():
+    stored = {"a": "up"}
+    log = TransitionLog(3600, loader=lambda: stored)
+    log.check("a", "up", 0)
+    stored["a"] = "down"
+    log.reset()
+    assert log.check("a", "up", 10) == (CHANGE, "down")
+
+
+def test_failing_loader_starts_every_key():
+    def loader():
+        raise OSError("database is locked")
+    assert TransitionLog(3600, loader=loader).check("a", "up", 0) == (START, None)
@@ -0,0 +1,64 @@
+import time
+
+import pytest
+
+from uptime_tracker import UptimeTracker, to_epoch, to_timestamp
+
+NOW = 1_760_000_000
+
+
+@pytest.fixture(autouse=True)
+def frozen_clock(monkeypatch):
+    monkeypatch.setattr(time, "time", lambda: NOW)
+
+
+def test_uptime_is_weighted_by_how_long_each_state_lasted():
+    tracker = UptimeTracker()
+    tracker.record("pg", "master", "up", NOW - 3600)
+    tracker.record("pg", "master", "down", NOW - 1800)
+    tracker.record("pg", "master", "up", NOW - 900)
+    data = tracker.uptime_data("pg", "master", "1h")
+    assert data["uptime_percentage"] == "75.00%"
+    assert data["uptime_windows"] == {"1h": "75.00%", "24h": "75.00%", "7d": "75.00%"}
+    assert data["last_node_down_time"] == to_timestamp(NOW - 1800)
+
+
+def test_gaps_longer_than_max_gap_count_for_neither_state():
+    tracker = UptimeTracker(max_gap=3600)
+    tracker.record("pg", "master", "up", NOW - 7200)
+    tracker.record("pg", "master", "down", NOW - 600)
+    windows = tracker.uptime_data("pg", "master", "24h")["uptime_windows"]
+    assert windows["1h"] == "0.00%"
+    assert windows["24h"] == "85.71%"      # 3600s up, 600s down, the gap left out
+
+
+def test_single_sample_and_unknown_node():
+    tracker = UptimeTracker()
+    tracker.record("pg", "master", "up", NOW)
+    assert tracker.uptime_data("pg", "master", "1h")["uptime_percentage"] == "100.00%"
+    assert tracker.uptime_data("pg", "master", "1h")["last_node_down_time"] == "Never"
+    assert tracker.uptime_data("pg", "slave1", "1h")["uptime_percentage"] == "No data"
+
+
+def test_warmed_from_the_status_log():
+    samples = [(to_timestamp(NOW - 3600), "pg", "master", "down"), (to_timestamp(NOW - 2700), "pg", "master", "up")]
+    last_down = {("pg", "master"): to_timestamp(NOW - 90000)}
+    tracker = UptimeTracker(loader=lambda: (samples, last_down))
+    assert tracker.uptime_data("pg", "master", "1h")["uptime_percentage"] == "75.00%"
+    # The newer down sample in the log wins over the older last_down row
+    assert tracker.uptime_data("pg", "master", "1h")["last_node_down_time"] == to_timestamp(NOW - 3600)
+
+
+def test_timestamps_round_trip_as_utc():
+    assert to_epoch(to_timestamp(NOW)) == NOW
+
+
+def test_reset_rewarms_from_the_status_log():
+    samples = [(to_timestamp(NOW - 600), "pg", "master", "up")]
+    tracker = UptimeTracker(loader=lambda: (samples, {}))
+    tracker.record("pg", "master", "down", NOW - 300)
+    assert tracker.uptime_data("pg", "master", "1h")["uptime_percentage"] == "50.00%"
+    tracker.reset()
+    assert tracker.uptime_data("pg", "master", "1h") == {
+        "uptime_percentage": "100.00%", "last_node_down_time": "Never",
+        "uptime_windows": {"1h": "100.00%", "24h": "100.00%", "7d": "100.00%"}}